@@ -3,6 +3,7 @@ import logging
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 
@@ -27,9 +28,23 @@ class User(AbstractUser):
     @property
     def actor(self):
         """
-        Create or return the Actor object for this user
+        Create or return the Actor object for this user.
+        The Actor is kept on the User object so it is resolved at most once
+        per request, and the Actor uuid is kept in the cache so new User
+        objects for the same user can build the Actor without a query.
         """
-        return Actor.objects.get_or_create(user=self)[0]
+        if not hasattr(self, "_actor"):
+            cache_key = "actor-uuid-%s" % self.pk
+            actor_uuid = cache.get(cache_key)
+            if actor_uuid is None:
+                self._actor = Actor.objects.get_or_create(user=self)[0]
+                cache.set(cache_key, self._actor.uuid, None)
+            else:
+                self._actor = Actor.from_db(
+                    Actor.objects.db, ["uuid", "user_id"], [actor_uuid, self.pk]
+                )
+                self._actor.user = self
+        return self._actor
 
     def save(self, **kwargs):
         if self._state.adding:
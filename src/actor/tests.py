@@ -1 +1,21 @@
-# Create your tests here.
+from django.test import TestCase
+
+from .factories import UserFactory
+from .models import Actor, User
+
+
+class ActorTestCase(TestCase):
+    """ Test the Actor of a User """
+
+    def setUp(self):
+        """ The setUp method is run before each test """
+        self.user = UserFactory()
+
+    def test_user_actor_cached(self):
+        """ Assert that User.actor only queries the database once """
+        actor = Actor.objects.get(user=self.user)
+        # a fresh User object finds the Actor uuid in the cache
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.actor, actor)
+            self.assertEqual(user.actor.user, user)
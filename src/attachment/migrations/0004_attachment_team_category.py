@@ -0,0 +1,52 @@
+# Generated by Django 2.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from utils.denormalize import populate_gfk_team_and_category
+
+
+def populate_team_and_category(apps, schema_editor):
+    populate_gfk_team_and_category(apps, "attachment", "attachment")
+    # comments on attachments can be done now
+    populate_gfk_team_and_category(apps, "comment", "comment")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("team", "0003_auto_20191213_0944"),
+        ("comment", "0005_comment_team_category"),
+        ("attachment", "0003_auto_20191213_0944"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Category this Attachment belongs to, if any (denormalized from the attachment_object).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="attachment",
+            name="team",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Team this Attachment belongs to, if any (denormalized from the attachment_object).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+        migrations.RunPython(populate_team_and_category, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.8 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("attachment", "0005_attachment_object_id_uuid")]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="sha256",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="The SHA-256 hex digest of this file, computed on upload.",
+                max_length=64,
+            ),
+        )
+    ]
@@ -1,12 +1,17 @@
+import logging
+
+from django.conf import settings
 from django.db import models
-from guardian.shortcuts import assign_perm
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
-from django.urls import reverse_lazy
 
 
 from utils.models import UUIDBaseModel
+from utils.urlcache import cached_reverse
 from utils.uploads import get_attachment_path
+from .thumbnails import THUMBNAIL_ERRORS, generate_thumbnails, has_thumbnails
+
+logger = logging.getLogger("socialrating.%s" % __name__)
 
 
 class Attachment(UUIDBaseModel):
@@ -15,6 +20,14 @@ class Attachment(UUIDBaseModel):
     All attachments belong to a Review.
     """
 
+    class Meta(UUIDBaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["content_type", "object_id", "created"],
+                name="attachment_gfk_idx",
+            )
+        ]
+
     actor = models.ForeignKey(
         "actor.Actor",
         on_delete=models.PROTECT,
@@ -29,12 +42,32 @@ class Attachment(UUIDBaseModel):
         help_text="The Django content_type of the model for the object this Event relates to.",
     )
 
-    object_id = models.CharField(
-        max_length=36, help_text="The PK/UUID of the object this Event relates to."
+    object_id = models.UUIDField(
+        help_text="The UUID of the object this Attachment relates to."
     )
 
     attachment_object = GenericForeignKey("content_type", "object_id")
 
+    team = models.ForeignKey(
+        "team.Team",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Team this Attachment belongs to, if any (denormalized from the attachment_object).",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Category this Attachment belongs to, if any (denormalized from the attachment_object).",
+    )
+
     attachment = models.FileField(help_text="The file", upload_to=get_attachment_path)
 
     mimetype = models.CharField(
@@ -44,11 +77,35 @@ class Attachment(UUIDBaseModel):
 
     size = models.IntegerField(help_text="The size in bytes of this file")
 
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="The SHA-256 hex digest of this file, computed on upload.",
+    )
+
     description = models.CharField(
         max_length=255, help_text="The description for this attachment.", blank=True
     )
 
     breadcrumb_list_name = "Attachments"
+    owner_field = "actor"
+
+    # keep the attachment_count on the attached object, Category and Team up to date
+    counter_caches = [
+        ("attachment_object", "attachment_count"),
+        ("category", "attachment_count"),
+        ("team", "attachment_count"),
+    ]
+
+    # - All team members may view an Attachment
+    # - The Attachment uploader may change the Attachment
+    # - The Attachment uploader or a team admin may delete the Attachment
+    team_permissions = {
+        "view_attachment": ["member"],
+        "change_attachment": ["owner"],
+        "delete_attachment": ["owner", "admin"],
+    }
 
     @property
     def breadcrumb_detail_name(self):
@@ -60,23 +117,25 @@ class Attachment(UUIDBaseModel):
         kwargs["attachment_uuid"] = self.uuid
         return kwargs
 
+    @property
+    def object_url_namespace(self):
+        return self.attachment_object.object_url_namespace + ":attachment"
+
     def get_url(self, action):
         """
-        This method resolves the requested action of the Attachment object
+        This method resolves the requested action of the Attachment object,
+        the list url has no attachment_uuid
         """
-        kwargs = self.attachment_object.detail_url_kwargs
-        url = f"{self.attachment_object.object_url_namespace}:attachment"
-        if action != "list":
-            kwargs.update({"attachment_uuid": self.uuid})
-        url += f":{action}"
-        return reverse_lazy(url, kwargs=kwargs)
+        if action == "list" and "list" not in self.url_cache:
+            self.url_cache["list"] = cached_reverse(
+                self.object_url_namespace + ":list",
+                kwargs=self.attachment_object.detail_url_kwargs,
+            )
+        return super().get_url(action)
 
     def get_list_url(self):
         return self.get_url("list")
 
-    def get_absolute_url(self):
-        return self.get_url("detail")
-
     def get_settings_url(self):
         return self.get_url("settings")
 
@@ -89,24 +148,21 @@ class Attachment(UUIDBaseModel):
     def get_file_url(self):
         return self.get_url("file")
 
-    @property
-    def team(self):
-        return self.attachment_object.team
-
-    def grant_permissions(self):
-        """
-        - All team members may view an Attachment
-        - The Attachment uploader may change the Attachment
-        - The Attachment uploader or a team admin may delete the Attachment
-        """
-        assign_perm("attachment.view_attachment", self.team.group, self)
-        assign_perm("attachment.change_attachment", self.actor.user, self)
-        assign_perm("attachment.delete_attachment", self.actor.user, self)
-        assign_perm("attachment.delete_attachment", self.team.admingroup, self)
-
     def save(self, **kwargs):
         """
-        Save Attachment and grant permissions
+        Set the denormalized team and category from the attachment_object,
+        and make the thumbnails for new images
         """
+        adding = self._state.adding
+        if adding:
+            (
+                self.team_id,
+                self.category_id,
+            ) = self.attachment_object.get_team_and_category_ids()
         super().save(**kwargs)
-        self.grant_permissions()
+        if adding and settings.ATTACHMENT_THUMBNAILS_ON_UPLOAD and has_thumbnails(self):
+            try:
+                generate_thumbnails(self)
+            except THUMBNAIL_ERRORS:
+                # the thumbnails will be made on the first request instead
+                logger.exception("Unable to make thumbnails for %s" % self)
@@ -0,0 +1,214 @@
+"""
+Backends for serving Attachment files.
+
+AttachmentFileView checks the permissions and then hands the file to the
+backend configured in settings.ATTACHMENT_FILE_BACKEND:
+
+- DjangoFileBackend streams the file from the storage in chunks, with
+  support for conditional requests (ETag/Last-Modified) and single HTTP
+  Range requests. Nothing is read into memory in one go.
+- XAccelRedirectBackend returns an empty response with an X-Accel-Redirect
+  header, and nginx does the actual transfer from an internal location
+  (see settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX).
+- XSendfileBackend does the same with an X-Sendfile header, for Apache
+  mod_xsendfile and lighttpd.
+"""
+import logging
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+range_re = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_file_backend():
+    """
+    Return an instance of the backend in settings.ATTACHMENT_FILE_BACKEND
+    """
+    return import_string(
+        getattr(
+            settings, "ATTACHMENT_FILE_BACKEND", "attachment.serving.DjangoFileBackend"
+        )
+    )()
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header for a file of size bytes. Returns a (first, last)
+    tuple of byte positions (inclusive), None if the header should be
+    ignored, or False if the range can't be satisfied. Only single ranges
+    are supported, multiple ranges are ignored and the whole file is sent.
+    """
+    match = range_re.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # a suffix range like bytes=-500 means the last 500 bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            # no bytes to send, not even for an empty file
+            return False
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        return False
+    return first, last
+
+
+def file_chunks(storage, name, first, last, chunk_size):
+    """
+    Yield the bytes from first to last (inclusive) of the file in chunks
+    """
+    remaining = last - first + 1
+    with storage.open(name, "rb") as f:
+        f.seek(first)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class FileBackend:
+    """
+    Base class for the file serving backends. The backends serve the file
+    of an Attachment, or another file in the same storage like a
+    thumbnail when a name is given.
+    """
+
+    def get_etag(self, attachment, name, size):
+        """
+        The files of an Attachment never change, so the uuid,
+        filename and size will do
+        """
+        return quote_etag(
+            "%s-%s-%s" % (attachment.uuid.hex, os.path.basename(name), size)
+        )
+
+    def get_last_modified(self, attachment):
+        return int(attachment.created.timestamp())
+
+    def serve(self, request, attachment, content_type, name=None):
+        """
+        Return a response for the file of the Attachment
+        """
+        raise NotImplementedError
+
+    def finalize(self, response, name):
+        """
+        Add the headers all backends send
+        """
+        response["Content-Disposition"] = "inline; filename*=UTF-8''%s" % quote(
+            os.path.basename(name)
+        )
+        response["X-Content-Type-Options"] = "nosniff"
+        return response
+
+
+class DjangoFileBackend(FileBackend):
+    """
+    Stream the file from Django, with Range and conditional request support
+    """
+
+    chunk_size = 64 * 1024
+
+    def serve(self, request, attachment, content_type, name=None):
+        storage = attachment.attachment.storage
+        name = name or attachment.attachment.name
+        size = storage.size(name)
+        etag = self.get_etag(attachment, name, size)
+        last_modified = self.get_last_modified(attachment)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            byterange = None
+            if "HTTP_RANGE" in request.META and self.range_allowed(
+                request, etag, last_modified
+            ):
+                byterange = parse_range(request.META["HTTP_RANGE"], size)
+            response = self.get_file_response(
+                storage, name, size, content_type, byterange
+            )
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        return self.finalize(response, name)
+
+    def get_file_response(self, storage, name, size, content_type, byterange):
+        """
+        Return a response with the whole file, or the (first, last) byterange
+        of it, or a 416 response if byterange is False
+        """
+        if byterange is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */%s" % size
+            return response
+
+        if byterange is None:
+            # the whole file, FileResponse streams it in chunks
+            response = FileResponse(storage.open(name, "rb"), content_type=content_type)
+            response["Content-Length"] = size
+            return response
+
+        first, last = byterange
+        response = StreamingHttpResponse(
+            file_chunks(storage, name, first, last, self.chunk_size),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = "bytes %s-%s/%s" % (first, last, size)
+        response["Content-Length"] = last - first + 1
+        return response
+
+    def range_allowed(self, request, etag, last_modified):
+        """
+        Only honour the Range header if an If-Range header matches
+        the current ETag or Last-Modified, or if there is no If-Range
+        """
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range:
+            return True
+        return if_range in (etag, http_date(last_modified))
+
+
+class XAccelRedirectBackend(FileBackend):
+    """
+    Let nginx serve the file. The storage path of the file is appended to
+    settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX, which must be an internal
+    location in nginx pointing at MEDIA_ROOT.
+    """
+
+    header = "X-Accel-Redirect"
+
+    def get_location(self, attachment, name):
+        return settings.ATTACHMENT_ACCEL_REDIRECT_PREFIX + quote(name)
+
+    def serve(self, request, attachment, content_type, name=None):
+        name = name or attachment.attachment.name
+        response = HttpResponse(content_type=content_type)
+        response[self.header] = self.get_location(attachment, name)
+        return self.finalize(response, name)
+
+
+class XSendfileBackend(XAccelRedirectBackend):
+    """
+    Let Apache (mod_xsendfile) or lighttpd serve the file from its
+    path on disk. Only works with the local filesystem storage.
+    """
+
+    header = "X-Sendfile"
+
+    def get_location(self, attachment, name):
+        return attachment.attachment.storage.path(name)
@@ -1 +1,180 @@
-# Create your tests here.
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from review.tests import ReviewViewTestCase
+from .models import Attachment
+from .serving import parse_range
+from .utils import save_upload
+
+
+class AttachmentFileViewTest(ReviewViewTestCase):
+    """ Test AttachmentFileView and the file serving backends """
+
+    def setUp(self):
+        """ Create an Attachment for the Review in a temporary MEDIA_ROOT """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        super().setUp()
+        self.data = b"0123456789" * 10
+        self.attachment = Attachment.objects.create(
+            attachment_object=self.review,
+            actor=self.review.actor,
+            attachment=ContentFile(self.data, name="test.txt"),
+            mimetype="text/plain",
+            size=len(self.data),
+        )
+        self.file_url = self.attachment.get_file_url()
+        self.client.force_login(self.review.actor.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_parse_range(self):
+        """ Assert that Range headers are parsed """
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=95-200", 100), (95, 99))
+        self.assertEqual(parse_range("bytes=100-", 100), False)
+        self.assertEqual(parse_range("bytes=-10", 0), False)
+        self.assertEqual(parse_range("bytes=0-", 0), False)
+        self.assertEqual(parse_range("bytes=0-1,5-6", 100), None)
+
+    def test_attachment_file(self):
+        """ Assert that the whole file is streamed with an ETag """
+        response = self.client.get(self.file_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        self.assertEqual(response["Content-Length"], str(len(self.data)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+        # the ETag can be used for a conditional request
+        response = self.client.get(self.file_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_attachment_file_range(self):
+        """ Assert that Range requests return the requested bytes """
+        response = self.client.get(self.file_url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[10:20])
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+
+        response = self.client.get(self.file_url, HTTP_RANGE="bytes=500-")
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(
+        ATTACHMENT_FILE_BACKEND="attachment.serving.XAccelRedirectBackend",
+        ATTACHMENT_ACCEL_REDIRECT_PREFIX="/protected-media/",
+    )
+    def test_attachment_file_accel_redirect(self):
+        """ Assert that nginx is told to serve the file """
+        response = self.client.get(self.file_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/%s" % self.attachment.attachment.name,
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_attachment_file_nonmember(self):
+        """ Assert that non-members can not get the file """
+        self.client.force_login(self.team1_member)
+        response = self.client.get(self.file_url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_attachment_thumbnail_nonimage(self):
+        """ Assert that a thumbnail of a non-image is a cacheable svg icon """
+        response = self.client.get(self.file_url + "?thumbnail=small")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        self.assertIn("max-age=", response["Cache-Control"])
+
+    def test_attachment_decompression_bomb(self):
+        """ Assert that an image above Image.MAX_IMAGE_PIXELS is saved and served without thumbnails """
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64)).save(buffer, "PNG")
+        upload = SimpleUploadedFile("bomb.png", buffer.getvalue())
+        attachment = Attachment(attachment_object=self.review, actor=self.review.actor)
+        # Pillow refuses images with more than twice MAX_IMAGE_PIXELS
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 64 * 64 // 4):
+            with override_settings(ATTACHMENT_THUMBNAILS_ON_UPLOAD=True):
+                save_upload(attachment, upload)
+                attachment.save()
+            self.assertEqual(attachment.mimetype, "image/png")
+            response = self.client.get(attachment.get_file_url() + "?thumbnail=small")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+
+    def test_save_upload(self):
+        """ Assert that uploads are hashed and sized while they are written """
+        data = b"%PDF-1.4\n" + b"x" * 200000
+        memory = SimpleUploadedFile("test.pdf", data)
+        temporary = TemporaryUploadedFile("test.pdf", "", len(data), None)
+        temporary.write(data)
+        for upload in [memory, temporary]:
+            attachment = Attachment(
+                attachment_object=self.review, actor=self.review.actor
+            )
+            save_upload(attachment, upload)
+            attachment.save()
+            attachment.refresh_from_db()
+            self.assertEqual(attachment.mimetype, "application/pdf")
+            self.assertEqual(attachment.size, len(data))
+            self.assertEqual(attachment.sha256, hashlib.sha256(data).hexdigest())
+            with attachment.attachment.open("rb") as f:
+                self.assertEqual(f.read(), data)
+
+
+class AttachmentListViewTest(ReviewViewTestCase):
+    """ Test AttachmentListView """
+
+    def setUp(self):
+        """ Create Attachments for the Review in a temporary MEDIA_ROOT """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        super().setUp()
+        self.add_attachment()
+        self.attachment_list_url = self.review.attachments.first().get_list_url()
+        self.client.force_login(self.review.actor.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def add_attachment(self):
+        return Attachment.objects.create(
+            attachment_object=self.review,
+            actor=self.review.actor,
+            attachment=ContentFile(b"test", name="test.txt"),
+            mimetype="text/plain",
+            size=4,
+        )
+
+    def test_attachment_list_query_count(self):
+        """ Assert that the number of queries does not grow with the number of attachments """
+        # warm up caches like ContentType lookups
+        self.client.get(self.attachment_list_url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.attachment_list_url)
+        for i in range(3):
+            self.add_attachment()
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.attachment_list_url)
+        self.assertEqual(response.status_code, 200)
+        for attachment in self.review.attachments.all():
+            self.assertContains(response, attachment.get_file_url())
+        self.assertEqual(len(before), len(after))
@@ -0,0 +1,113 @@
+"""
+Thumbnails for image Attachments.
+
+Thumbnails are resized JPEG and WebP variants of the image in each of the
+sizes in settings.ATTACHMENT_THUMBNAIL_SIZES. They are stored next to the
+original file, like attachments/<uuid>/thumbnails/medium.webp, and made
+when the Attachment is uploaded (if ATTACHMENT_THUMBNAILS_ON_UPLOAD is set),
+by the generate-thumbnails management command, or when the thumbnail is
+first requested.
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+# the image types Pillow can read
+THUMBNAIL_MIMETYPES = [
+    "image/bmp",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/tiff",
+    "image/webp",
+]
+
+# the errors to expect when making thumbnails of broken or oversized images,
+# a DecompressionBombError is not an OSError
+THUMBNAIL_ERRORS = (OSError, Image.DecompressionBombError)
+
+# format: (Pillow format name, file extension, mimetype)
+THUMBNAIL_FORMATS = {
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "webp": ("WEBP", "webp", "image/webp"),
+}
+
+
+def has_thumbnails(attachment):
+    """
+    Return True if we can make thumbnails of the Attachment
+    """
+    return attachment.mimetype in THUMBNAIL_MIMETYPES
+
+
+def get_thumbnail_name(attachment, size, fmt):
+    """
+    Return the storage name of a thumbnail, in a thumbnails
+    directory next to the original file
+    """
+    return os.path.join(
+        os.path.dirname(attachment.attachment.name),
+        "thumbnails",
+        "%s.%s" % (size, THUMBNAIL_FORMATS[fmt][1]),
+    )
+
+
+def get_thumbnail_format(request):
+    """
+    Return "webp" if the client accepts WebP images, otherwise "jpeg"
+    """
+    if "image/webp" in request.META.get("HTTP_ACCEPT", ""):
+        return "webp"
+    return "jpeg"
+
+
+def generate_thumbnails(attachment, sizes=None, overwrite=True):
+    """
+    Make the thumbnails of the Attachment in all sizes (or the given sizes)
+    and formats, reading and decoding the original only once. Returns a
+    list of the names of the thumbnails written.
+    """
+    storage = attachment.attachment.storage
+    sizes = sizes or list(settings.ATTACHMENT_THUMBNAIL_SIZES)
+    written = []
+    with storage.open(attachment.attachment.name, "rb") as f:
+        image = Image.open(f)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    for size in sizes:
+        pixels = settings.ATTACHMENT_THUMBNAIL_SIZES[size]
+        thumbnail = image.copy()
+        thumbnail.thumbnail((pixels, pixels), Image.LANCZOS)
+        for fmt, (pil_format, _, _) in THUMBNAIL_FORMATS.items():
+            name = get_thumbnail_name(attachment, size, fmt)
+            if storage.exists(name):
+                if not overwrite:
+                    continue
+                # delete first, or the storage saves under another name
+                storage.delete(name)
+            variant = thumbnail
+            if pil_format == "JPEG" and variant.mode != "RGB":
+                # JPEG has no transparency
+                variant = variant.convert("RGB")
+            buffer = io.BytesIO()
+            variant.save(buffer, pil_format, quality=85)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    logger.debug("made %s thumbnails for %s" % (len(written), attachment))
+    return written
+
+
+def get_thumbnail(attachment, size, fmt):
+    """
+    Return the storage name of the thumbnail, making it first if needed
+    """
+    name = get_thumbnail_name(attachment, size, fmt)
+    if not attachment.attachment.storage.exists(name):
+        generate_thumbnails(attachment, sizes=[size], overwrite=False)
+    return name
@@ -1,23 +1,71 @@
+import hashlib
+import logging
+
 import magic
 
-from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import File
 
 from .models import Attachment
 
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+# libmagic only needs the start of the file to detect the type
+MIMETYPE_SNIFF_BYTES = 2048
+
+
+def get_mimetype(upload):
+    """
+    Detect the mimetype of the uploaded file from its leading bytes,
+    and rewind the file so it can be saved afterwards
+    """
+    upload.seek(0)
+    mimetype = magic.from_buffer(upload.read(MIMETYPE_SNIFF_BYTES), mime=True)
+    upload.seek(0)
+    return mimetype
+
+
+class HashingFile(File):
+    """
+    Wrap an uploaded file and compute the SHA-256 and size of the data
+    while the storage reads it in chunks, so the file is only read once
+    and never held in memory as a whole.
+    """
+
+    def __init__(self, file, name=None):
+        super().__init__(file, name)
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def chunks(self, chunk_size=None):
+        for chunk in super().chunks(chunk_size):
+            self.sha256.update(chunk)
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+def save_upload(attachment, upload):
+    """
+    Write the uploaded file to the storage of the Attachment in one chunked
+    pass, and set the mimetype, size and sha256 of the Attachment. The
+    Attachment itself is not saved.
+    """
+    attachment.mimetype = get_mimetype(upload)
+    # wrapping the upload also stops FileSystemStorage from moving a
+    # temporary upload into place without reading it through chunks()
+    content = HashingFile(upload, name=upload.name)
+    attachment.attachment.save(upload.name, content, save=False)
+    attachment.size = content.bytes_read
+    attachment.sha256 = content.sha256.hexdigest()
+    return attachment
+
 
 def save_form_attachments(form, fieldname, gfk_object):
     """
     Loop over any uploaded files and create an Attachment object for each
     """
     files = form.files.getlist("attachments")
-    for attachment in files:
-        mimetype = magic.from_buffer(attachment.read(), mime=True)
-        saved = Attachment.objects.create(
-            actor=gfk_object.actor,
-            content_type=ContentType.objects.get_for_model(gfk_object),
-            object_id=gfk_object.pk,
-            attachment=attachment,
-            mimetype=mimetype,
-            size=attachment.size,
-        )
-        print("saved attachment %s" % saved)
+    for upload in files:
+        attachment = Attachment(attachment_object=gfk_object, actor=gfk_object.actor)
+        save_upload(attachment, upload)
+        attachment.save()
+        logger.debug("saved attachment %s" % attachment)
@@ -1,16 +1,29 @@
-import magic
+import logging
 
+from django.conf import settings
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.shortcuts import redirect
 from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.contrib import messages
 
 from utils.svgthumbnail import svgthumbnail
 from utils.mixins import SRViewMixin, SRListViewMixin
 
 from .models import Attachment
+from .serving import get_file_backend
+from .thumbnails import (
+    THUMBNAIL_ERRORS,
+    THUMBNAIL_FORMATS,
+    get_thumbnail,
+    get_thumbnail_format,
+    has_thumbnails,
+)
+from .utils import save_upload
+
+logger = logging.getLogger("socialrating.%s" % __name__)
 
 
 class AttachmentListView(SRListViewMixin, ListView):
@@ -32,6 +45,17 @@ class AttachmentListView(SRListViewMixin, ListView):
         self.checker.prefetch_perms(attachments)
         return attachments
 
+    def get_context_data(self, **kwargs):
+        """
+        All the attachments belong to the gfk_object, which was loaded with
+        its parents for the url, so use it for the attachment urls instead
+        of loading the attachment_object again for each attachment
+        """
+        context = super().get_context_data(**kwargs)
+        for attachment in context["object_list"]:
+            attachment.attachment_object = self.gfk_object
+        return context
+
 
 class AttachmentCreateView(SRViewMixin, CreateView):
     """
@@ -53,9 +77,8 @@ class AttachmentCreateView(SRViewMixin, CreateView):
     def form_valid(self, form):
         attachment = form.save(commit=False)
         attachment.actor = self.request.user.actor
-        attachment.mimetype = magic.from_buffer(attachment.attachment.read(), mime=True)
-        attachment.size = attachment.attachment.size
         attachment.attachment_object = self.gfk_object
+        save_upload(attachment, form.cleaned_data["attachment"])
         attachment.save()
 
         messages.success(self.request, "Saved new attachment")
@@ -81,9 +104,10 @@ class AttachmentSettingsView(SRViewMixin, DetailView):
 class AttachmentFileView(SRViewMixin, DetailView):
     """
     This view returns a http response with the contents of the file
-    and the proper mimetype.
+    and the proper mimetype, using the file serving backend in
+    settings.ATTACHMENT_FILE_BACKEND (see attachment.serving) after
+    the permission check.
     It can also return a thumbnail instead of the actual file.
-    TODO: Make the webserver serve the files
     """
 
     model = Attachment
@@ -91,16 +115,49 @@ class AttachmentFileView(SRViewMixin, DetailView):
     permission_required = "attachment.view_attachment"
 
     def get(self, request, *args, **kwargs):
-        if "thumbnail" in request.GET and self.attachment.mimetype[0:6] != "image/":
+        if "thumbnail" in request.GET:
+            return self.get_thumbnail_response(request)
+        return get_file_backend().serve(
+            request, self.attachment, self.attachment.mimetype
+        )
+
+    def get_thumbnail_response(self, request):
+        """
+        Return a resized thumbnail for images in the requested size
+        (like ?thumbnail=small), an svg "icon" for other files
+        """
+        size = request.GET["thumbnail"]
+        if size not in settings.ATTACHMENT_THUMBNAIL_SIZES:
+            size = settings.ATTACHMENT_THUMBNAIL_DEFAULT_SIZE
+        response = None
+        if has_thumbnails(self.attachment):
+            fmt = get_thumbnail_format(request)
+            try:
+                name = get_thumbnail(self.attachment, size, fmt)
+            except THUMBNAIL_ERRORS:
+                logger.exception("Unable to make thumbnail for %s" % self.attachment)
+            else:
+                response = get_file_backend().serve(
+                    request, self.attachment, THUMBNAIL_FORMATS[fmt][2], name=name
+                )
+                patch_vary_headers(response, ["Accept"])
+        elif self.attachment.mimetype[0:6] == "image/":
+            # an image we can't resize, like svg, use the original
+            response = get_file_backend().serve(
+                request, self.attachment, self.attachment.mimetype
+            )
+        if response is None:
             # thumbnail of non-image requested, return svg "icon"
             response = HttpResponse(content_type="image/svg+xml")
             response.write(svgthumbnail(self.attachment.mimetype))
-        else:
-            # no thumbnail requested, or mimetype is an image, just return the file
-            response = HttpResponse(content_type=self.attachment.mimetype)
-            response.write(self.attachment.attachment.read())
 
-        # all good
+        # thumbnails never change, let the browser keep them
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=settings.ATTACHMENT_THUMBNAIL_MAX_AGE,
+            immutable=True,
+        )
         return response
 
 
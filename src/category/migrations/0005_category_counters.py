@@ -0,0 +1,70 @@
+# Generated by Django 2.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_category_counters(apps, schema_editor):
+    populate_counters(
+        apps,
+        "category",
+        "category",
+        [
+            ("attachment_count", "attachment.Attachment", "category"),
+            ("comment_count", "comment.Comment", "category"),
+            ("review_count", "review.Review", "category"),
+            ("vote_count", "vote.Vote", "category"),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("review", "0004_review_team_category"),
+        ("vote", "0004_vote_team_category"),
+        ("comment", "0005_comment_team_category"),
+        ("attachment", "0004_attachment_team_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="attachment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Attachments in this Category.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments in this Category.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Reviews in this Category.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="vote_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Votes in this Category.",
+            ),
+        ),
+        migrations.RunPython(populate_category_counters, migrations.RunPython.noop),
+    ]
@@ -2,9 +2,6 @@ import eav
 import logging
 
 from django.db import models
-from django.urls import reverse_lazy
-from django.contrib.contenttypes.models import ContentType
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 from .eavconfig import CategoryEavConfig
@@ -60,10 +57,41 @@ class Category(UUIDBaseModel):
         blank=True,
     )
 
+    review_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Reviews in this Category."
+    )
+
+    vote_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Votes in this Category."
+    )
+
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Comments in this Category."
+    )
+
+    attachment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="The number of Attachments in this Category.",
+    )
+
     filterfield = "team"
     filtervalue = "team"
     breadcrumb_list_name = "Categories"
 
+    # - All team members may view a Category
+    # - Admins may update and delete a Category
+    # - All team members may create new Items in the Category
+    # - Admins may create Facts and Ratings for the Category
+    team_permissions = {
+        "view_category": ["member"],
+        "change_category": ["admin"],
+        "delete_category": ["admin"],
+        "add_item": ["member"],
+        "add_fact": ["admin"],
+        "add_rating": ["admin"],
+    }
+
     def __str__(self):
         return self.name
 
@@ -72,34 +100,7 @@ class Category(UUIDBaseModel):
         return {"team_slug": self.team.slug, "category_slug": self.slug}
 
     object_url_namespace = "team:category"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may view a Category
-        - Admins may update a Category
-        - Admins may delete a Category
-        - All team members may create new Items in the Category
-        - Admins may create Facts for the Category
-        - Admins may create Ratings for the Category
-        """
-        assign_perm("category.view_category", self.team.group, self)
-        assign_perm("category.change_category", self.team.admingroup, self)
-        assign_perm("category.delete_category", self.team.admingroup, self)
-        assign_perm("category.add_item", self.team.group, self)
-        assign_perm("category.add_fact", self.team.admingroup, self)
-        assign_perm("category.add_rating", self.team.admingroup, self)
-
-    def save(self, **kwargs):
-        """
-        Save the Fact and grant permissions.
-        """
-        super().save(**kwargs)
-        self.grant_permissions()
+    url_select_related = "team"
 
     def create_fact_slug(self, fact_name):
         """
@@ -108,31 +109,31 @@ class Category(UUIDBaseModel):
         """
         return eav.fields.EavSlugField.create_slug_from_name(fact_name)
 
-    @property
-    def review_count(self):
-        from review.models import Review
-
-        return Review.objects.filter(item__category=self).count()
-
-    @property
-    def vote_count(self):
-        from vote.models import Vote
-
-        return Vote.objects.filter(review__item__category=self).count()
-
-    @property
-    def attachment_count(self):
+    def get_average_votes(self, items=None, only_latest=True):
         """
-        Return the number of attachments for all Items belonging to this Category
+        Get the average Votes for all Items and Ratings in this Category
+        in a single query, optionally limited to the given Items.
+        Returns a dict with (item uuid, rating uuid) tuples as keys and
+        (average, count) tuples like Item.get_average_vote() as values.
+        Ratings without Votes are left out, like VoteQuerySet.get_averages().
         """
-        from attachment.models import Attachment
-
-        return Attachment.objects.filter(
-            content_type=ContentType.objects.get(app_label="item", model="item"),
-            object_id__in=[
-                str(x) for x in self.items.all().values_list("uuid", flat=True)
-            ],
-        ).count()
+        from vote.models import VoteAggregate
+
+        count_field = "latest_vote_count" if only_latest else "vote_count"
+        aggregates = VoteAggregate.objects.filter(
+            item__category=self, **{count_field + "__gt": 0}
+        )
+        if items is not None:
+            aggregates = aggregates.filter(item__in=items)
+        return {
+            (aggregate.item_id, aggregate.rating_id): aggregate.get_average(
+                only_latest=only_latest
+            )
+            for aggregate in aggregates
+        }
+
+    def get_team_and_category_ids(self):
+        return self.team_id, self.pk
 
 
 # register Category model with django-eav2
@@ -1,6 +1,9 @@
 import factory
 
+from django.core.management import call_command
 from django.urls import reverse
+from guardian.models import GroupObjectPermission
+from guardian.shortcuts import assign_perm
 
 from context.tests import ContextViewTestCase
 from .factories import CategoryFactory
@@ -223,3 +226,29 @@ class CategoryDeleteViewTest(CategoryViewTestCase):
         self.assertNotContains(response, self.team2_category3.name)
         # do we have the success message?
         self.assertContains(response, "Category has been deleted")
+
+
+class CategoryPrunePermissionsTest(CategoryViewTestCase):
+    """ Test the prune-team-permissions management command """
+
+    def test_prune_keeps_other_team_grants(self):
+        """ Assert that only grants to the own team groups are pruned """
+        category = self.team2_category3
+        assign_perm("category.view_category", self.team2.group, category)
+        assign_perm("category.change_category", self.team2.admingroup, category)
+        # change_category is an admin rule, the member group grant is not covered
+        assign_perm("category.change_category", self.team2.group, category)
+        # a grant to another team is not covered by any rule
+        assign_perm("category.view_category", self.team1.group, category)
+        call_command("prune-team-permissions")
+        self.assertEqual(
+            set(
+                GroupObjectPermission.objects.filter(
+                    object_pk=str(category.pk)
+                ).values_list("group_id", "permission__codename")
+            ),
+            {
+                (self.team2.group.pk, "change_category"),
+                (self.team1.group.pk, "view_category"),
+            },
+        )
@@ -0,0 +1,71 @@
+# Generated by Django 2.2.8 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+PATH_SEGMENT_LENGTH = 19
+
+
+def populate_comment_paths(apps, schema_editor):
+    """
+    Set path and depth for all existing Comments, one level of the reply tree at a time
+    """
+    Comment = apps.get_model("comment", "Comment")
+    parents = {}
+    level = Comment.objects.filter(reply_to__isnull=True)
+    depth = 0
+    while level.exists():
+        paths = {}
+        for comment in level.only("uuid", "created", "reply_to"):
+            comment.path = parents.get(comment.reply_to_id, "") + "%013x%s" % (
+                int(comment.created.timestamp() * 1000000),
+                comment.uuid.hex[: PATH_SEGMENT_LENGTH - 13],
+            )
+            comment.depth = depth
+            paths[comment.uuid] = comment.path
+            Comment.objects.filter(uuid=comment.uuid).update(
+                path=comment.path, depth=depth
+            )
+        parents = paths
+        level = Comment.objects.filter(reply_to__in=list(paths.keys()))
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("comment", "0003_auto_20191213_0944")]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments this Comment is nested under.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="The materialized path of this Comment in the reply tree.",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_comment_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["content_type", "object_id", "path"], name="comment_tree_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["path"], name="comment_path_idx", opclasses=["text_pattern_ops"]
+            ),
+        ),
+    ]
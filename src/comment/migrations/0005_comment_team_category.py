@@ -0,0 +1,51 @@
+# Generated by Django 2.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from utils.denormalize import populate_gfk_team_and_category
+
+
+def populate_team_and_category(apps, schema_editor):
+    populate_gfk_team_and_category(apps, "comment", "comment")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("team", "0003_auto_20191213_0944"),
+        ("review", "0004_review_team_category"),
+        ("vote", "0004_vote_team_category"),
+        ("comment", "0004_comment_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Category this Comment belongs to, if any (denormalized from the comment_object).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="team",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Team this Comment belongs to, if any (denormalized from the comment_object).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+        migrations.RunPython(populate_team_and_category, migrations.RunPython.noop),
+    ]
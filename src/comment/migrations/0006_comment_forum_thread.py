@@ -0,0 +1,95 @@
+# Generated by Django 2.2.8 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+import django.db.models.deletion
+
+
+def populate_forum_and_thread(apps, schema_editor):
+    """
+    Set thread and forum on Comments in Threads, and then on Comments
+    on those Comments, one level at a time until nothing changes
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Comment = apps.get_model("comment", "Comment")
+    Thread = apps.get_model("thread", "Thread")
+
+    thread_ct = ContentType.objects.filter(app_label="thread", model="thread").first()
+    if thread_ct is None:
+        return
+    for thread in Thread.objects.only("uuid", "forum"):
+        Comment.objects.filter(content_type=thread_ct, object_id=str(thread.pk)).update(
+            thread_id=thread.pk, forum_id=thread.forum_id
+        )
+
+    comment_ct = ContentType.objects.filter(
+        app_label="comment", model="comment"
+    ).first()
+    while True:
+        parents = Comment.objects.filter(
+            uuid=Cast(models.OuterRef("object_id"), models.UUIDField())
+        )
+        done = (
+            Comment.objects.filter(thread__isnull=False)
+            .annotate(uuid_text=Cast("uuid", models.CharField()))
+            .values("uuid_text")
+        )
+        updated = Comment.objects.filter(
+            content_type=comment_ct, thread__isnull=True, object_id__in=done
+        ).update(
+            thread_id=models.Subquery(parents.values("thread")[:1]),
+            forum_id=models.Subquery(parents.values("forum")[:1]),
+        )
+        if not updated:
+            return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0004_forum_thread_count"),
+        ("thread", "0004_thread_comment_count"),
+        ("comment", "0005_comment_team_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="forum",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Forum this Comment is posted in, if any (denormalized from the Thread).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="forum.Forum",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="thread",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The Thread this Comment is posted in, if any (denormalized from the comment_object).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="thread.Thread",
+            ),
+        ),
+        migrations.RunPython(populate_forum_and_thread, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["forum", "actor"], name="comment_forum_actor_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["thread", "created"], name="comment_thread_latest_idx"
+            ),
+        ),
+    ]
@@ -1,19 +1,82 @@
 from django.db import models
-from django.urls import reverse_lazy
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
-from guardian.shortcuts import assign_perm
 
-from utils.models import UUIDBaseModel
+from utils.models import UUIDBaseModel, count_subquery
+
+# the length of each Comment in Comment.path
+PATH_SEGMENT_LENGTH = 19
+
+
+class CommentQuerySet(models.QuerySet):
+    def conversation(self, obj):
+        """
+        Return all Comments on the object, including all replies,
+        in display order (depth first, oldest first)
+        """
+        return self.filter(
+            content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk
+        ).order_by("path")
+
+    def subtree(self, comment):
+        """
+        Return the Comment and all replies to it (recursively) in display order
+        """
+        return self.filter(
+            content_type_id=comment.content_type_id,
+            object_id=comment.object_id,
+            path__startswith=comment.path,
+        ).order_by("path")
+
+    def with_reply_counts(self):
+        """
+        Annotate reply_count with the number of replies (recursively)
+        """
+        return self.annotate(
+            reply_count=count_subquery(
+                Comment.objects.filter(
+                    content_type_id=models.OuterRef("content_type_id"),
+                    object_id=models.OuterRef("object_id"),
+                    path__startswith=models.OuterRef("path"),
+                ).exclude(pk=models.OuterRef("pk")),
+                "content_type",
+            )
+        )
 
 
 class Comment(UUIDBaseModel):
     """
     The Comment model contains all comments. A Comment either has a reply_to, or it
     has a GFK to the object the Comment is about (like an Item or Attachment or forum Thread)
+
+    Replies are indexed with a materialized path: path is the path of the
+    Comment replied to plus a fixed length segment made from the created
+    timestamp and uuid of this Comment. Ordering by path gives the whole
+    conversation in display order, and a subtree is a path prefix.
     """
 
+    class Meta(UUIDBaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["content_type", "object_id", "created"], name="comment_gfk_idx"
+            ),
+            models.Index(
+                fields=["content_type", "object_id", "path"], name="comment_tree_idx"
+            ),
+            models.Index(
+                fields=["path"], name="comment_path_idx", opclasses=["text_pattern_ops"]
+            ),
+            # for Forum.authors
+            models.Index(fields=["forum", "actor"], name="comment_forum_actor_idx"),
+            # for the latest Comment in each Thread
+            models.Index(
+                fields=["thread", "created"], name="comment_thread_latest_idx"
+            ),
+        ]
+
+    objects = CommentQuerySet.as_manager()
+
     content_type = models.ForeignKey(
         ContentType,
         on_delete=models.PROTECT,
@@ -21,8 +84,8 @@ class Comment(UUIDBaseModel):
         help_text="The Django content_type of the model for the object this Comment relates to.",
     )
 
-    object_id = models.CharField(
-        max_length=36, help_text="The PK/UUID of the object this Comment relates to."
+    object_id = models.UUIDField(
+        help_text="The UUID of the object this Comment relates to."
     )
 
     comment_object = GenericForeignKey("content_type", "object_id")
@@ -49,63 +112,183 @@ class Comment(UUIDBaseModel):
         help_text="The body of this Comment. Markdown is supported."
     )
 
+    team = models.ForeignKey(
+        "team.Team",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Team this Comment belongs to, if any (denormalized from the comment_object).",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Category this Comment belongs to, if any (denormalized from the comment_object).",
+    )
+
+    forum = models.ForeignKey(
+        "forum.Forum",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Forum this Comment is posted in, if any (denormalized from the Thread).",
+    )
+
+    thread = models.ForeignKey(
+        "thread.Thread",
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="The Thread this Comment is posted in, if any (denormalized from the comment_object).",
+    )
+
+    path = models.TextField(
+        editable=False,
+        blank=True,
+        help_text="The materialized path of this Comment in the reply tree.",
+    )
+
+    depth = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="The number of Comments this Comment is nested under.",
+    )
+
     breadcrumb_list_name = "Comments"
+    owner_field = "actor"
+
+    # keep the comment_count on the commented object, Category, Team,
+    # Thread and Forum up to date
+    counter_caches = [
+        ("comment_object", "comment_count"),
+        ("category", "comment_count"),
+        ("team", "comment_count"),
+        ("thread", "comment_count"),
+        ("forum", "comment_count"),
+    ]
+
+    # - All team members may view a Comment
+    # - Author may update a Comment
+    # - Admins and author may delete a Comment
+    # - All team members may create new Comments as replies to this comment
+    team_permissions = {
+        "view_comment": ["member"],
+        "change_comment": ["owner"],
+        "delete_comment": ["owner", "admin"],
+        "add_comment": ["member"],
+    }
 
     def clean(self):
         if self.reply_to and self.comment_object != self.reply_to.comment_object:
             raise ValidationError("Cannot add a reply for a different comment_object")
 
-    @property
-    def object_url_namespace(self):
-        return self.comment_object.object_url_namespace + ":comment"
-
-    @property
-    def detail_url_kwargs(self):
-        kwargs = self.comment_object.detail_url_kwargs
-        kwargs["comment_uuid"] = self.uuid
-        return kwargs
-
-    @property
-    def breadcrumb_detail_name(self):
-        return self.subject[0:50]
+    def get_path_segment(self):
+        """
+        Return the path segment for this Comment, sorting by created timestamp
+        """
+        return "%013x%s" % (
+            int(self.created.timestamp() * 1000000),
+            self.uuid.hex[: PATH_SEGMENT_LENGTH - 13],
+        )
 
-    def grant_permissions(self):
+    def get_thread_and_forum_ids(self):
         """
-        - All team members may view a Comment
-        - Author may update a Comment
-        - Admins and author may delete a Comment
-        - All team members may create new Comments as replies to this comment
+        Return a tuple of the ids of the Thread and Forum this Comment is
+        posted in, or (None, None) if it is not in a forum Thread.
         """
-        assign_perm("comment.view_comment", self.team.group, self)
-        assign_perm("comment.change_comment", self.actor.user, self)
-        assign_perm("comment.delete_comment", self.team.admingroup, self)
-        assign_perm("comment.delete_comment", self.actor.user, self)
-        assign_perm("comment.add_comment", self.team.group, self)
+        obj = self.comment_object
+        if isinstance(obj, Comment):
+            return obj.thread_id, obj.forum_id
+        if obj._meta.label_lower == "thread.thread":
+            return obj.pk, obj.forum_id
+        return None, None
 
     def save(self, **kwargs):
         """
-        Save the Comment and grant permissions.
+        Set the path and depth for new Comments before saving, and the
+        denormalized team, category, thread and forum from the comment_object
         """
+        if self._state.adding:
+            (
+                self.team_id,
+                self.category_id,
+            ) = self.comment_object.get_team_and_category_ids()
+            self.thread_id, self.forum_id = self.get_thread_and_forum_ids()
+        if not self.path:
+            if self.reply_to:
+                self.path = self.reply_to.path + self.get_path_segment()
+                self.depth = self.reply_to.depth + 1
+            else:
+                self.path = self.get_path_segment()
+                self.depth = 0
         super().save(**kwargs)
-        self.grant_permissions()
 
-    @property
-    def team(self):
-        return self.comment_object.team
+    def get_descendants(self):
+        """
+        Return all replies to this Comment (recursively) in display order
+        """
+        return Comment.objects.subtree(self).exclude(pk=self.pk)
+
+    def get_reply_count(self):
+        """
+        Return the number of replies to this Comment (recursively)
+        """
+        if hasattr(self, "reply_count"):
+            return self.reply_count
+        return self.get_descendants().count()
+
+    def get_replies(self):
+        """
+        Return the direct replies to this Comment, from the list
+        set by build_tree() if possible
+        """
+        if hasattr(self, "tree_replies"):
+            return self.tree_replies
+        return self.replies.order_by("path")
 
-    def get_url(self, urlname):
+    @staticmethod
+    def build_tree(comments):
         """
-        This method resolves the requested urlname of the Comment object
+        Take a list of Comments in path order (like from conversation() or
+        subtree()) and set tree_replies on each, so a whole conversation can
+        be rendered from one query. Returns the Comments which have no parent
+        in the list.
         """
+        roots = []
+        by_path = {}
+        for comment in comments:
+            comment.tree_replies = []
+            parent = by_path.get(comment.path[:-PATH_SEGMENT_LENGTH])
+            if parent is None:
+                roots.append(comment)
+            else:
+                parent.tree_replies.append(comment)
+            by_path[comment.path] = comment
+        return roots
+
+    @property
+    def object_url_namespace(self):
+        return self.comment_object.object_url_namespace + ":comment"
+
+    @property
+    def detail_url_kwargs(self):
         kwargs = self.comment_object.detail_url_kwargs
-        kwargs.update({"comment_uuid": self.uuid})
-        return reverse_lazy(
-            self.comment_object.object_url_namespace + ":comment:" + urlname,
-            kwargs=kwargs,
-        )
+        kwargs["comment_uuid"] = self.uuid
+        return kwargs
 
-    def get_absolute_url(self):
-        return self.get_url("detail")
+    @property
+    def breadcrumb_detail_name(self):
+        return self.subject[0:50]
 
     def get_settings_url(self):
         return self.get_url("settings")
@@ -17,11 +17,20 @@ class CommentListView(SRListViewMixin, ListView):
 
     def get_queryset(self, **kwargs):
         """
-        We have a GenericRelation called "comments"
+        Return the whole conversation for the gfk object in display order,
+        so one page of comments including replies is one query
         """
-        comments = self.gfk_object.comments.filter(reply_to__isnull=True)
-        self.checker.prefetch_perms(comments)
-        return comments
+        return Comment.objects.conversation(self.gfk_object).select_related(
+            "actor__user"
+        )
+
+    def get_context_data(self, **kwargs):
+        """
+        Build the reply tree for the comments on this page
+        """
+        context = super().get_context_data(**kwargs)
+        context["comment_list"] = Comment.build_tree(context["object_list"])
+        return context
 
 
 class CommentCreateView(SRViewMixin, CreateView):
@@ -59,6 +68,18 @@ class CommentDetailView(SRViewMixin, DetailView):
     pk_url_kwarg = "comment_uuid"
     permission_required = "comment.view_comment"
 
+    def get_context_data(self, **kwargs):
+        """
+        Get the comment and all replies in one query and build the reply tree
+        """
+        context = super().get_context_data(**kwargs)
+        comments = list(
+            Comment.objects.subtree(self.object).select_related("actor__user")
+        )
+        self.checker.prefetch_perms(comments)
+        context["comment"] = Comment.build_tree(comments)[0]
+        return context
+
 
 class CommentSettingsView(SRViewMixin, DetailView):
     model = Comment
@@ -1,8 +1,6 @@
 import logging
 
 from django.db import models
-from django.urls import reverse_lazy
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 
@@ -46,6 +44,14 @@ class Context(UUIDBaseModel):
     filtervalue = "team"
     breadcrumb_list_name = "Contexts"
 
+    # - All team members may view a Context
+    # - Admin members may change and delete a Context
+    team_permissions = {
+        "view_context": ["member"],
+        "change_context": ["admin"],
+        "delete_context": ["admin"],
+    }
+
     def __str__(self):
         return self.name
 
@@ -54,25 +60,4 @@ class Context(UUIDBaseModel):
         return {"team_slug": self.team.slug, "context_slug": self.slug}
 
     object_url_namespace = "team:context"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may view a Context
-        - Admin members may change a Context
-        - Admin members may delete a Context
-        """
-        assign_perm("context.view_context", self.team.group, self)
-        assign_perm("context.change_context", self.team.admingroup, self)
-        assign_perm("context.delete_context", self.team.admingroup, self)
-
-    def save(self, **kwargs):
-        """
-        Save Context and grant permissions
-        """
-        super().save(**kwargs)
-        self.grant_permissions()
+    url_select_related = "team"
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from utils.denormalize import populate_gfk_team_and_category
+
+
+def populate_team_and_category(apps, schema_editor):
+    populate_gfk_team_and_category(apps, "event", "event")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("team", "0003_auto_20191213_0944"),
+        ("attachment", "0004_attachment_team_category"),
+        ("event", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The Category the object belongs to, if any (denormalized from the object).",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="team",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The Team the object belongs to, if any (denormalized from the object).",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+        migrations.RunPython(populate_team_and_category, migrations.RunPython.noop),
+    ]
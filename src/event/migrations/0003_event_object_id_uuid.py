@@ -0,0 +1,29 @@
+# Generated by Django 2.2.8 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Convert object_id from a CharField(36) to a native uuid column. On
+    PostgreSQL the existing values are converted in place with a
+    USING object_id::uuid cast.
+    """
+
+    dependencies = [("event", "0002_event_team_category")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="event",
+            name="object_id",
+            field=models.UUIDField(
+                help_text="The UUID of the object this Event relates to."
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["content_type", "object_id", "timestamp"], name="event_gfk_idx"
+            ),
+        ),
+    ]
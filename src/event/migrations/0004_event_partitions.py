@@ -0,0 +1,61 @@
+# Generated by Django 2.2.8 on 2026-10-18 18:00
+
+from django.conf import settings
+from django.db import migrations
+
+from event.partitions import is_partitioned, partition_table, unpartition_table
+
+
+def partition_events(apps, schema_editor):
+    """
+    Convert the Event table to a table partitioned by month on timestamp,
+    see event.partitions. Only on PostgreSQL.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Event = apps.get_model("event", "Event")
+    with schema_editor.connection.cursor() as cursor:
+        partition_table(
+            cursor,
+            Event._meta.db_table,
+            getattr(settings, "EVENT_PARTITION_MONTHS_AHEAD", 3),
+        )
+    create_indexes(schema_editor, Event)
+
+
+def unpartition_events(apps, schema_editor):
+    """
+    Convert the partitioned Event table back to a plain table
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Event = apps.get_model("event", "Event")
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor, Event._meta.db_table):
+            return
+        unpartition_table(cursor, Event._meta.db_table)
+    create_indexes(schema_editor, Event)
+
+
+def create_indexes(schema_editor, Event):
+    """
+    The indexes and foreign keys were dropped with the old table,
+    create them again with the same names as Django would
+    """
+    for field in Event._meta.local_fields:
+        if field.remote_field:
+            schema_editor.execute(schema_editor._create_index_sql(Event, [field]))
+            schema_editor.execute(
+                schema_editor._create_fk_sql(
+                    Event, field, "_fk_%(to_table)s_%(to_column)s"
+                )
+            )
+    for index in Event._meta.indexes:
+        schema_editor.add_index(Event, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("event", "0003_event_object_id_uuid")]
+
+    operations = [migrations.RunPython(partition_events, unpartition_events)]
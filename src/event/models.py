@@ -14,6 +14,13 @@ class Event(models.Model):
     - a GenericForeignKey to the object the event relates to
     """
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["content_type", "object_id", "timestamp"], name="event_gfk_idx",
+            )
+        ]
+
     uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     content_type = models.ForeignKey(
@@ -23,8 +30,8 @@ class Event(models.Model):
         help_text="The Django content_type of the model for the object this Event relates to.",
     )
 
-    object_id = models.CharField(
-        max_length=36, help_text="The PK/UUID of the object this Event relates to."
+    object_id = models.UUIDField(
+        help_text="The UUID of the object this Event relates to."
     )
 
     event_object = GenericForeignKey("content_type", "object_id")
@@ -45,6 +52,24 @@ class Event(models.Model):
         help_text="The Actor who caused this event.",
     )
 
+    team = models.ForeignKey(
+        "team.Team",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        help_text="The Team the object belongs to, if any (denormalized from the object).",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        help_text="The Category the object belongs to, if any (denormalized from the object).",
+    )
+
     timestamp = models.DateTimeField(
         default=timezone.now, help_text="The date and time when this Event happened."
     )
@@ -0,0 +1,234 @@
+"""
+Monthly partitioning of the Event table on PostgreSQL (11 or later).
+
+The Event table is partitioned by range on timestamp, with one partition per
+month named like event_event_y2026m10, plus a default partition which takes
+any Event outside the monthly partitions. The partition key must be part of
+the primary key, so the primary key of the table is (uuid, timestamp).
+PostgreSQL can't enforce a unique uuid across partitions, Django still treats
+uuid as the pk and relies on the random uuid4 default to keep it unique.
+
+The archive-events management command creates the partitions for the coming
+months, and archives and drops the partitions which are older than the
+retention period. Dropping a partition is instant no matter how many Events
+it holds, and queries with a timestamp range only look at the partitions
+they need.
+"""
+import datetime
+import gzip
+import logging
+import os
+import re
+
+from django.utils import timezone
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+def month_start(dt):
+    """
+    Return the first day of the month of the date or datetime
+    """
+    return datetime.date(dt.year, dt.month, 1)
+
+
+def add_months(month, months):
+    """
+    Return the first day of the month which is months after the month
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """
+    Return the name of the partition for the month
+    """
+    return "%s_y%04dm%02d" % (table, month.year, month.month)
+
+
+def default_partition_name(table):
+    return "%s_default" % table
+
+
+def month_bound(month):
+    """
+    Return a partition bound literal for the start of the month in UTC.
+    Partition bounds must be literals, and the month is a date, so
+    formatting it into the sql is safe.
+    """
+    return "'%s 00:00:00+00'" % month.isoformat()
+
+
+def is_partitioned(cursor, table):
+    """
+    Return True if the table is a partitioned table
+    """
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+        [table],
+    )
+    return cursor.fetchone()[0]
+
+
+def get_partitions(cursor, table):
+    """
+    Return a sorted list of (month, partition name) tuples for the
+    monthly partitions of the table. The default partition is not included.
+    """
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s
+        """,
+        [table],
+    )
+    pattern = re.compile(r"^%s_y(\d{4})m(\d{2})$" % re.escape(table))
+    partitions = []
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((month, name))
+    return sorted(partitions)
+
+
+def create_partition(cursor, table, month):
+    """
+    Create the partition for the month if it doesn't exist. Events for the
+    month which ended up in the default partition are moved to the new
+    partition, so it can be attached.
+    """
+    name = partition_name(table, month)
+    if name in [partition for _, partition in get_partitions(cursor, table)]:
+        return False
+    start, end = month_bound(month), month_bound(add_months(month, 1))
+    default = default_partition_name(table)
+    cursor.execute(
+        "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        % (name, table)
+    )
+    cursor.execute(
+        "WITH moved AS (DELETE FROM %s WHERE timestamp >= %s AND timestamp < %s RETURNING *) "
+        "INSERT INTO %s SELECT * FROM moved" % (default, start, end, name)
+    )
+    cursor.execute(
+        "ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%s) TO (%s)"
+        % (table, name, start, end)
+    )
+    logger.info("created partition %s" % name)
+    return True
+
+
+def create_partitions(cursor, table, first_month, last_month):
+    """
+    Create the partitions for all months from first_month to last_month,
+    return the number of partitions created
+    """
+    created = 0
+    month = month_start(first_month)
+    while month <= last_month:
+        created += create_partition(cursor, table, month)
+        month = add_months(month, 1)
+    return created
+
+
+def copy_to_file(cursor, query, path):
+    """
+    Stream the result of the query to a gzipped csv file with COPY, without
+    loading the rows into memory. The file is written under a temporary
+    name and renamed when it is complete.
+    """
+    tmppath = "%s.tmp" % path
+    with gzip.open(tmppath, "wb") as f:
+        cursor.copy_expert("COPY (%s) TO STDOUT WITH (FORMAT csv, HEADER)" % query, f)
+    os.rename(tmppath, path)
+
+
+def archive_partition(cursor, table, name, archive_dir=None):
+    """
+    Archive the partition to a gzipped csv file in archive_dir (if given),
+    then detach and drop it. Returns the path of the archive, if any.
+    """
+    path = None
+    if archive_dir:
+        path = os.path.join(archive_dir, "%s.csv.gz" % name)
+        copy_to_file(cursor, "SELECT * FROM %s" % name, path)
+    cursor.execute("ALTER TABLE %s DETACH PARTITION %s" % (table, name))
+    cursor.execute("DROP TABLE %s" % name)
+    logger.info("dropped partition %s" % name)
+    return path
+
+
+def archive_rows_before(cursor, table, cutoff, archive_dir=None):
+    """
+    Archive and delete the Events before cutoff which are not in a monthly
+    partition, like old Events in the default partition, or all old Events
+    when the table is not partitioned. Returns the number of deleted Events.
+    """
+    if is_partitioned(cursor, table):
+        source = default_partition_name(table)
+    else:
+        source = table
+    where = "timestamp < %s" % month_bound(cutoff)
+    if archive_dir:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM %s WHERE %s)" % (source, where))
+        if not cursor.fetchone()[0]:
+            return 0
+        path = os.path.join(
+            archive_dir,
+            "%s_before_%s_%s.csv.gz"
+            % (source, cutoff.isoformat(), timezone.now().strftime("%Y%m%d%H%M%S")),
+        )
+        copy_to_file(cursor, "SELECT * FROM %s WHERE %s" % (source, where), path)
+    cursor.execute("DELETE FROM %s WHERE %s" % (source, where))
+    return cursor.rowcount
+
+
+def partition_table(cursor, table, months_ahead):
+    """
+    Convert the existing (unpartitioned) table to a partitioned table with
+    monthly partitions for all existing Events and the months_ahead coming
+    months, and a default partition. Used by the migration. The indexes
+    and foreign keys are created on the partitioned table afterwards by
+    the caller.
+    """
+    old = "%s_unpartitioned" % table
+    cursor.execute("ALTER TABLE %s RENAME TO %s" % (table, old))
+    cursor.execute(
+        "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (timestamp)" % (table, old)
+    )
+    cursor.execute(
+        "CREATE TABLE %s PARTITION OF %s DEFAULT"
+        % (default_partition_name(table), table)
+    )
+    cursor.execute("SELECT MIN(timestamp) FROM %s" % old)
+    first = cursor.fetchone()[0] or timezone.now()
+    now = month_start(timezone.now())
+    create_partitions(cursor, table, month_start(first), add_months(now, months_ahead))
+    cursor.execute("INSERT INTO %s SELECT * FROM %s" % (table, old))
+    cursor.execute("DROP TABLE %s" % old)
+    # the old primary key index name is free now
+    cursor.execute("ALTER TABLE %s ADD PRIMARY KEY (uuid, timestamp)" % table)
+
+
+def unpartition_table(cursor, table):
+    """
+    Convert the partitioned table back to a plain table with uuid as the
+    primary key, with all the Events from all partitions. Used to reverse
+    the migration. The indexes and foreign keys are created on the table
+    afterwards by the caller.
+    """
+    old = "%s_partitioned" % table
+    cursor.execute("ALTER TABLE %s RENAME TO %s" % (table, old))
+    cursor.execute(
+        "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        % (table, old)
+    )
+    cursor.execute("INSERT INTO %s SELECT * FROM %s" % (table, old))
+    # dropping the partitioned table drops all partitions too
+    cursor.execute("DROP TABLE %s" % old)
+    cursor.execute("ALTER TABLE %s ADD PRIMARY KEY (uuid)" % table)
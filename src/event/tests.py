@@ -1 +1,124 @@
-# Create your tests here.
+import datetime
+import os
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from actor.factories import UserFactory
+from review.tests import ReviewViewTestCase
+from team.models import Team
+from .models import Event
+from .partitions import (
+    add_months,
+    archive_partition,
+    create_partition,
+    get_partitions,
+    is_partitioned,
+    month_start,
+    partition_name,
+    partition_table,
+    unpartition_table,
+)
+
+
+class EventWriterTestCase(TransactionTestCase):
+    """ Test the buffered Event writer, this needs real transaction commits """
+
+    def setUp(self):
+        """ The setUp method is run before each test """
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+        self.team_data = {"name": "TestTeam 1", "description": "A test team 1"}
+
+    def test_events_written_in_one_query(self):
+        """ Assert that the Events for a request are written with one INSERT """
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(path=reverse("team:create"), data=self.team_data)
+        team = Team.objects.get(name=self.team_data["name"])
+
+        inserts = [
+            q["sql"]
+            for q in context.captured_queries
+            if q["sql"].startswith('INSERT INTO "event_event"')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+        # both the Team and the founders Membership have a CREATE Event
+        self.assertTrue(team.events.filter(event_type=Event.CREATE).exists())
+        self.assertTrue(
+            team.memberships.first().events.filter(event_type=Event.CREATE).exists()
+        )
+
+    def test_delete_event(self):
+        """ Assert that deleting an object records a DELETE Event """
+        self.client.post(path=reverse("team:create"), data=self.team_data)
+        membership = Team.objects.get(name=self.team_data["name"]).memberships.first()
+        uuid = membership.uuid
+        membership.delete()
+        self.assertTrue(
+            Event.objects.filter(object_id=uuid, event_type=Event.DELETE).exists()
+        )
+
+
+class EventListViewTest(ReviewViewTestCase):
+    """ Test EventListView """
+
+    def test_event_list_member(self):
+        """ Assert that a team member without view_event permission sees no Events """
+        Event.objects.create(
+            event_object=self.review,
+            event_type=Event.UPDATE,
+            actor=self.review.actor,
+            team=self.review.team,
+        )
+        self.client.force_login(self.team2_member)
+        response = self.client.get(
+            reverse(
+                "team:category:item:review:event:list",
+                kwargs=self.review.detail_url_kwargs,
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["event_list"]), [])
+
+
+class EventPartitionTestCase(TestCase):
+    """ Test the monthly partitions of the Event table """
+
+    def test_add_months(self):
+        """ Assert that months are added across years """
+        month = month_start(datetime.date(2026, 11, 17))
+        self.assertEqual(month, datetime.date(2026, 11, 1))
+        self.assertEqual(add_months(month, 2), datetime.date(2027, 1, 1))
+        self.assertEqual(add_months(month, -11), datetime.date(2025, 12, 1))
+
+    def test_archive_partition(self):
+        """ Assert that an old partition can be created, archived and dropped """
+        table = Event._meta.db_table
+        month = add_months(month_start(datetime.date.today()), -36)
+        name = partition_name(table, month)
+        with connection.cursor() as cursor:
+            self.assertTrue(is_partitioned(cursor, table))
+            self.assertIn(
+                month_start(datetime.date.today()),
+                [month for month, _ in get_partitions(cursor, table)],
+            )
+            self.assertTrue(create_partition(cursor, table, month))
+            self.assertFalse(create_partition(cursor, table, month))
+            self.assertIn((month, name), get_partitions(cursor, table))
+            with tempfile.TemporaryDirectory() as archive_dir:
+                path = archive_partition(cursor, table, name, archive_dir)
+                self.assertTrue(os.path.exists(path))
+            self.assertNotIn((month, name), get_partitions(cursor, table))
+
+    def test_unpartition_table(self):
+        """ Assert that the table can be converted back to a plain table and partitioned again """
+        table = Event._meta.db_table
+        with connection.cursor() as cursor:
+            unpartition_table(cursor, table)
+            self.assertFalse(is_partitioned(cursor, table))
+            partition_table(cursor, table, 3)
+            self.assertTrue(is_partitioned(cursor, table))
@@ -1,3 +1,4 @@
+from django.contrib.contenttypes.models import ContentType
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from utils.mixins import SRViewMixin, SRListViewMixin
@@ -11,6 +12,24 @@ class EventListView(SRListViewMixin, ListView):
     template_name = "event_list.html"
     permission_required = "event.view_event"
 
+    def get_queryset(self, **kwargs):
+        """
+        Only list the Events for the object, newest first. This uses the
+        (content_type, object_id, timestamp) index in each Event partition.
+        The Events are filtered on top of super().get_queryset() so only
+        Events the user has view permission for are listed.
+        """
+        return (
+            super()
+            .get_queryset()
+            .filter(
+                content_type=ContentType.objects.get_for_model(self.gfk_object),
+                object_id=self.gfk_object.pk,
+            )
+            .select_related("actor")
+            .order_by("-timestamp")
+        )
+
 
 class EventDetailView(SRViewMixin, DetailView):
     model = Event
@@ -0,0 +1,154 @@
+"""
+Buffered writing of audit log Events.
+
+EventModel.save() and .delete() call record_event() instead of creating the
+Event right away. The Event is passed through transaction.on_commit() so
+Events for writes which are rolled back are discarded along with them.
+Committed Events are collected in a thread local buffer, and
+EventBufferMiddleware opens a buffer for each request which is written with
+a single bulk_create() when the request is done. Outside of a request or a
+buffered_events() block Events are written as soon as they are committed.
+
+With settings.EVENT_WRITER_BACKGROUND = True the buffered Events are handed
+to a background thread which does the bulk_create(), moving the audit log
+writes off the request path entirely.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+
+from .models import Event
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+event_local = threading.local()
+
+
+def get_event_buffer():
+    """
+    Return the list of Events buffered in this thread, or None if
+    we are not buffering at the moment
+    """
+    return getattr(event_local, "buffer", None)
+
+
+def write_events(events):
+    """
+    Write a list of Events, either here and now or in the background thread
+    """
+    if not events:
+        return
+    if getattr(settings, "EVENT_WRITER_BACKGROUND", False):
+        EventWriterThread.get_thread().queue.put(events)
+    else:
+        Event.objects.bulk_create(events)
+
+
+def commit_event(event):
+    """
+    Called when the transaction the Event belongs to has been committed
+    """
+    buffer = get_event_buffer()
+    if buffer is None:
+        write_events([event])
+    else:
+        buffer.append(event)
+
+
+def record_event(event_type, obj, actor, object_id=None):
+    """
+    Record an Event for the object, to be written when the current
+    transaction commits and the buffer (if any) is flushed.
+    """
+    team_id, category_id = obj.get_team_and_category_ids()
+    if event_type == Event.DELETE:
+        # a deleted Team or Category can't be referenced by its own Event
+        team_id, category_id = [
+            None if pk == object_id else pk for pk in (team_id, category_id)
+        ]
+    event = Event(
+        event_type=event_type,
+        actor=actor,
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=object_id or obj.pk,
+        team_id=team_id,
+        category_id=category_id,
+    )
+    transaction.on_commit(lambda: commit_event(event))
+    return event
+
+
+@contextmanager
+def buffered_events():
+    """
+    Buffer all Events committed inside the block and write them with one
+    bulk_create() when the block is done. Nested blocks share the outer buffer.
+    """
+    if get_event_buffer() is not None:
+        yield get_event_buffer()
+        return
+    event_local.buffer = []
+    try:
+        yield event_local.buffer
+    finally:
+        events = event_local.buffer
+        event_local.buffer = None
+        # the Events in the buffer are all committed, so
+        # write them even if the block raised an exception
+        write_events(events)
+
+
+class EventBufferMiddleware:
+    """
+    Buffer the Events for each request and write them when the request is done
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_events():
+            return self.get_response(request)
+
+
+class EventWriterThread(threading.Thread):
+    """
+    A daemon thread which writes lists of Events from a queue.
+    Pending Events are written before the process exits.
+    """
+
+    lock = threading.Lock()
+    thread = None
+
+    def __init__(self):
+        super().__init__(name="EventWriterThread", daemon=True)
+        self.queue = queue.Queue()
+
+    @classmethod
+    def get_thread(cls):
+        """
+        Return the running EventWriterThread, start it if needed
+        """
+        with cls.lock:
+            if cls.thread is None or not cls.thread.is_alive():
+                cls.thread = cls()
+                cls.thread.start()
+                atexit.register(cls.thread.queue.join)
+            return cls.thread
+
+    def run(self):
+        while True:
+            events = self.queue.get()
+            try:
+                Event.objects.bulk_create(events)
+            except Exception:
+                logger.exception("Unable to write %s Events" % len(events))
+            finally:
+                close_old_connections()
+                self.queue.task_done()
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class FactConfig(AppConfig):
     name = "fact"
+
+    def ready(self):
+        from .models import Fact, remove_fact_values
+
+        post_delete.connect(
+            remove_fact_values, sender=Fact, dispatch_uid="remove_fact_values"
+        )
@@ -1,7 +1,11 @@
-from django.urls import reverse_lazy
+from django.core.cache import cache
 from django.db import models
+from django.utils import timezone
 from eav.models import Attribute
-from guardian.shortcuts import assign_perm
+from category.models import Category
+from item.models import Item
+from utils.permissions import bulk_assign_perms
+from utils.urlcache import cached_reverse
 
 
 class Fact(Attribute):
@@ -47,9 +51,10 @@ class Fact(Attribute):
         }
 
     object_url_namespace = "team:category:fact"
+    url_select_related = "category__team"
 
     def get_absolute_url(self):
-        return reverse_lazy(
+        return cached_reverse(
             self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
         )
 
@@ -59,13 +64,92 @@ class Fact(Attribute):
         - Admins may update a Fact
         - Admins may delete a Fact
         """
-        assign_perm("fact.view_fact", self.team.group, self)
-        assign_perm("fact.change_fact", self.team.admingroup, self)
-        assign_perm("fact.delete_fact", self.team.admingroup, self)
+        bulk_assign_perms(
+            self,
+            [
+                ("fact.view_fact", self.team.group),
+                ("fact.change_fact", self.team.admingroup),
+                ("fact.delete_fact", self.team.admingroup),
+            ],
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the Category and slug as loaded from the database so save()
+        knows if permissions need to be granted again and if the values in
+        Item.fact_values need to be renamed.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.category_id
+        instance._loaded_slug = instance.slug
+        return instance
 
     def save(self, **kwargs):
         """
-        Grant permissions after super() saving
+        Grant permissions after super() saving, but only for new Facts
+        or Facts which moved to another Category (and maybe Team).
+        Rename the values in Item.fact_values when the slug changed.
         """
+        grant = self._state.adding or self.category_id != getattr(
+            self, "_loaded_category_id", None
+        )
+        loaded_slug = getattr(self, "_loaded_slug", None)
         super().save(**kwargs)
-        self.grant_permissions()
+        if grant:
+            self.grant_permissions()
+        if loaded_slug and loaded_slug != self.slug:
+            Item.objects.filter(category_id=self._loaded_category_id).rename_fact_value(
+                loaded_slug, self.slug
+            )
+        self._loaded_slug = self.slug
+        self.touch_categories(
+            self.category_id, getattr(self, "_loaded_category_id", None)
+        )
+        self._loaded_category_id = self.category_id
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.touch_categories(self.category_id)
+        return result
+
+    @staticmethod
+    def touch_categories(*category_ids):
+        """
+        Bump the updated timestamp of the Categories so the cached
+        lists of Facts from get_category_facts() are no longer used
+        """
+        Category.objects.filter(pk__in=[pk for pk in category_ids if pk]).update(
+            updated=timezone.now()
+        )
+
+
+def remove_fact_values(sender, instance, **kwargs):
+    """
+    post_delete receiver removing the values of the deleted Fact from
+    Item.fact_values, also for Facts deleted by a cascade.
+    Connected in FactConfig.ready()
+    """
+    Item.objects.filter(category_id=instance.category_id).remove_fact_value(
+        instance.slug
+    )
+
+
+def get_category_facts(category):
+    """
+    Return a list of the Facts of the Category in display order, with the
+    object_category and its Team loaded, for building Item forms. The list
+    is cached with the updated timestamp of the Category in the key, which
+    is bumped whenever a Fact is saved or deleted, so every process sees
+    the change without any cache invalidation.
+    """
+    cache_key = "category-facts-%s-%s" % (category.pk, category.updated.timestamp())
+    facts = cache.get(cache_key)
+    if facts is None:
+        facts = list(
+            Fact.objects.filter(category=category)
+            .select_related("object_category__team")
+            .order_by("display_order")
+        )
+        cache.set(cache_key, facts, 60 * 60 * 24)
+    return facts
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_forum_counters(apps, schema_editor):
+    populate_counters(
+        apps, "forum", "forum", [("thread_count", "thread.Thread", "forum"),],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0003_auto_20191213_0944"),
+        ("thread", "0003_auto_20191213_0944"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forum",
+            name="thread_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Threads in this Forum.",
+            ),
+        ),
+        migrations.RunPython(populate_forum_counters, migrations.RunPython.noop),
+    ]
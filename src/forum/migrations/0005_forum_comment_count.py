@@ -0,0 +1,32 @@
+# Generated by Django 2.2.8 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_forum_counters(apps, schema_editor):
+    populate_counters(
+        apps, "forum", "forum", [("comment_count", "comment.Comment", "forum")]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0004_forum_thread_count"),
+        ("comment", "0006_comment_forum_thread"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forum",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments in this Forum.",
+            ),
+        ),
+        migrations.RunPython(populate_forum_counters, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,6 @@
 from django.db import models
-from django.urls import reverse_lazy
-from django.contrib.contenttypes.models import ContentType
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
-from thread.models import Thread
 
 
 class Forum(UUIDBaseModel):
@@ -39,58 +35,44 @@ class Forum(UUIDBaseModel):
         help_text="Uncheck to disallow creation of new Threads in this Forum.",
     )
 
+    thread_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Threads in this Forum."
+    )
+
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Comments in this Forum."
+    )
+
     filterfield = "team"
     filtervalue = "team"
     breadcrumb_list_name = "Forums"
 
+    # - All team members may view a Forum
+    # - Admins may update and delete a Forum
+    # - All team members may create new Threads in the Forum
+    team_permissions = {
+        "view_forum": ["member"],
+        "change_forum": ["admin"],
+        "delete_forum": ["admin"],
+        "add_thread": ["member"],
+    }
+
     @property
     def detail_url_kwargs(self):
         return {"team_slug": self.team.slug, "forum_slug": self.slug}
 
     object_url_namespace = "team:forum"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may view a Forum
-        - Admins may update a Forum
-        - Admins may delete a Forum
-        - All team members may create new Threads in the Forum
-        """
-        assign_perm("forum.view_forum", self.team.group, self)
-        assign_perm("forum.change_forum", self.team.admingroup, self)
-        assign_perm("forum.delete_forum", self.team.admingroup, self)
-        assign_perm("forum.add_thread", self.team.group, self)
-
-    def save(self, **kwargs):
-        """
-        Save the Forum and grant permissions.
-        """
-        super().save(**kwargs)
-        self.grant_permissions()
+    url_select_related = "team"
 
     @property
     def comments(self):
         """
         Return a queryset of all the Comments in all Threads in
-        this Forum
+        this Forum, using the denormalized forum field on Comment
         """
         from comment.models import Comment
 
-        return Comment.objects.filter(
-            # get all Comments which relate to a Thread object
-            commented_object_ct=ContentType.objects.get(
-                app_label="forum", model="thread"
-            ),
-            # where the Forum of the Thread is the current Forum
-            commented_object_uuid__in=Thread.objects.filter(forum=self).values_list(
-                "uuid", flat=True
-            ),
-        )
+        return Comment.objects.filter(forum=self)
 
     @property
     def authors(self):
@@ -100,6 +82,4 @@ class Forum(UUIDBaseModel):
         """
         from actor.models import Actor
 
-        return Actor.objects.filter(
-            uuid__in=self.comments.values_list("actor__uuid", flat=True)
-        )
+        return Actor.objects.filter(uuid__in=self.comments.values("actor"))
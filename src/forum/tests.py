@@ -1 +1,64 @@
-# Create your tests here.
+from comment.models import Comment
+from team.tests import TeamViewTestCase
+from thread.models import Thread
+from .models import Forum
+
+
+class ForumCommentsTest(TeamViewTestCase):
+    """ Test the Comments and authors of a Forum """
+
+    def setUp(self):
+        """ Create a Forum with a Thread """
+        super().setUp()
+        self.forum = Forum.objects.create(
+            team=self.team1, name="General", description="General discussion"
+        )
+        self.thread = Thread.objects.create(
+            forum=self.forum, actor=self.team1_admin.actor, subject="Hello"
+        )
+
+    def test_forum_comments(self):
+        """ Assert that Comments in Threads, replies and Comments on Comments are found """
+        first = Comment.objects.create(
+            comment_object=self.thread,
+            actor=self.team1_admin.actor,
+            subject="1",
+            body="1",
+        )
+        reply = Comment.objects.create(
+            comment_object=self.thread,
+            reply_to=first,
+            actor=self.team1_member.actor,
+            subject="2",
+            body="2",
+        )
+        nested = Comment.objects.create(
+            comment_object=first, actor=self.common_member.actor, subject="3", body="3"
+        )
+        # a Comment on the Team is not in the Forum
+        Comment.objects.create(
+            comment_object=self.team1,
+            actor=self.team1_member.actor,
+            subject="4",
+            body="4",
+        )
+
+        self.assertEqual(set(self.forum.comments), {first, reply, nested})
+        self.assertEqual(
+            set(self.forum.authors),
+            {
+                self.team1_admin.actor,
+                self.team1_member.actor,
+                self.common_member.actor,
+            },
+        )
+        self.assertEqual(nested.thread, self.thread)
+
+        forum = Forum.objects.get(pk=self.forum.pk)
+        self.assertEqual(forum.thread_count, 1)
+        self.assertEqual(forum.comment_count, 3)
+
+        with self.assertNumQueries(1):
+            threads = Thread.add_latest_comments([self.thread])
+        self.assertEqual(threads[0].latest_comment, nested)
+        self.assertEqual(Thread.objects.get(pk=self.thread.pk).comment_count, 3)
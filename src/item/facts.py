@@ -0,0 +1,150 @@
+"""
+Typed Fact values on Items.
+
+django-eav2 stores each Fact value as a Value row, so filtering or sorting
+Items by Facts means a join on the Value table for each condition. Items keep
+a copy of their Fact values in the fact_values JSONB column, keyed by Fact
+slug, which is refreshed whenever the Item is saved, and renamed or removed
+when the Fact is. The column has a GIN index, so ?f_<fact slug>=<value>
+filters in ItemListView are containment (@>) lookups answered by the index,
+and ?order=<fact slug> sorts on the jsonb values, which compare numbers as
+numbers and strings as strings. The filter parameters are prefixed with
+FILTER_PREFIX so Fact slugs can't clash with other parameters like page.
+
+Only Facts with scalar datatypes are copied, point, area and enum Facts are
+left out. Point and area Facts are copied to the ItemLocation table instead,
+which has GiST indexes for bounding box and radius queries.
+"""
+import math
+
+from django.db.models import Func
+
+# the datatypes copied to fact_values, and the ones which can be filtered on
+FACT_VALUE_DATATYPES = ["text", "int", "float", "bool", "date", "object"]
+FILTER_DATATYPES = ["text", "int", "float", "bool", "object"]
+# the datatypes copied to ItemLocation
+LOCATION_DATATYPES = ["point", "area"]
+
+# the prefix of the query string parameters which filter on Fact values
+FILTER_PREFIX = "f_"
+
+TRUE_STRINGS = ["1", "true", "yes", "on"]
+FALSE_STRINGS = ["0", "false", "no", "off"]
+
+
+class JSONBDeleteKey(Func):
+    """
+    Remove a key from a jsonb column, like fact_values - 'colour'
+    """
+
+    arg_joiner = " - "
+    template = "%(expressions)s"
+
+
+class JSONBRenameKey(Func):
+    """
+    Rename a key of a jsonb column, like
+    (fact_values - 'colour') || jsonb_build_object('color', fact_values -> 'colour')
+    Only use it on rows which have the key, or the new key is added with null.
+    """
+
+    def as_sql(self, compiler, connection):
+        column, old, new = [
+            compiler.compile(expression) for expression in self.source_expressions
+        ]
+        sql = "(%s - %s) || jsonb_build_object(%s, %s -> %s)" % (
+            column[0],
+            old[0],
+            new[0],
+            column[0],
+            old[0],
+        )
+        return sql, column[1] + old[1] + new[1] + column[1] + old[1]
+
+
+def get_fact_value(datatype, value):
+    """
+    Return the JSON value of an eav Value row, or None if the datatype is
+    not copied to fact_values. Works with historical models in migrations
+    too, so it only uses the value_* fields.
+    """
+    if datatype not in FACT_VALUE_DATATYPES:
+        return None
+    if datatype == "object":
+        # the uuid of the related object
+        return str(value.generic_value_id) if value.generic_value_id else None
+    if datatype == "date":
+        return value.value_date.isoformat() if value.value_date else None
+    return getattr(value, "value_%s" % datatype)
+
+
+def get_fact_values(values):
+    """
+    Return the fact_values dict for the eav Value rows of an Item.
+    The rows must have the attribute loaded with select_related().
+    """
+    result = {}
+    for value in values:
+        fact_value = get_fact_value(value.attribute.datatype, value)
+        if fact_value is not None:
+            result[value.attribute.slug] = fact_value
+    return result
+
+
+def get_relation_targets(values):
+    """
+    Return a list of (Fact pk, Item pk) tuples for the object Fact values
+    in the eav Value rows of an Item, for the ItemRelation table. Object
+    Facts always point to Items in the object_category of the Fact.
+    """
+    return [
+        (value.attribute_id, value.generic_value_id)
+        for value in values
+        if value.attribute.datatype == "object" and value.generic_value_id
+    ]
+
+
+def get_locations(values):
+    """
+    Return a list of (Fact pk, geometry, point) tuples for the point and
+    area Fact values in the eav Value rows of an Item, for the ItemLocation
+    table. The point of an area is a point on its surface. All geometries
+    are returned in WGS84 (srid 4326) like the maps use.
+    """
+    locations = []
+    for value in values:
+        if value.attribute.datatype not in LOCATION_DATATYPES:
+            continue
+        geometry = getattr(value, "value_%s" % value.attribute.datatype)
+        if not geometry:
+            continue
+        if geometry.srid and geometry.srid != 4326:
+            geometry = geometry.transform(4326, clone=True)
+        point = geometry if geometry.geom_type == "Point" else geometry.point_on_surface
+        locations.append((value.attribute_id, geometry, point))
+    return locations
+
+
+def parse_fact_value(datatype, string):
+    """
+    Convert a value from the query string to the JSON value stored in
+    fact_values for the datatype. Raises ValueError for invalid values
+    (including nan and inf, which JSON can't represent) and for datatypes
+    which can't be filtered on.
+    """
+    if datatype not in FILTER_DATATYPES:
+        raise ValueError("Filtering on %s Facts is not supported" % datatype)
+    if datatype == "int":
+        return int(string)
+    if datatype == "float":
+        value = float(string)
+        if not math.isfinite(value):
+            raise ValueError("Invalid float value %s" % string)
+        return value
+    if datatype == "bool":
+        if string.lower() in TRUE_STRINGS:
+            return True
+        if string.lower() in FALSE_STRINGS:
+            return False
+        raise ValueError("Invalid boolean value %s" % string)
+    return string
@@ -1,9 +1,100 @@
+from copy import deepcopy
+
+from django import forms
+from django.contrib.admin.widgets import AdminSplitDateTime
+from django.core.exceptions import ValidationError
 from eav.forms import BaseDynamicEntityForm
 
+from fact.models import get_category_facts
+from utils.urlcache import cached_reverse
 from .models import Item
 
 
+class ItemAutocompleteWidget(forms.Select):
+    """
+    A select for object Facts which only renders the selected Item as an
+    option. Other Items are searched with the autocomplete view of the
+    Category by item-autocomplete.js, so rendering the form never loads
+    all the Items of a Category.
+    """
+
+    class Media:
+        js = ["js/item-autocomplete.js"]
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs={"data-autocomplete-url": url, **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        choices = [("", "---------")]
+        selected = [v for v in value if v]
+        if selected:
+            try:
+                items = self.choices.queryset.filter(pk__in=selected)
+                choices += [(str(item.pk), str(item)) for item in items]
+            except ValidationError:
+                # not a valid uuid, nothing is selected
+                pass
+        all_choices, self.choices = self.choices, choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+
+
 class ItemForm(BaseDynamicEntityForm):
     class Meta:
         model = Item
         fields = ["name", "description", "tags"]
+
+    def _build_dynamic_fields(self):
+        """
+        Build the Fact fields from the cached list of Facts for the Category,
+        with the current values loaded in one query, instead of the queries
+        django-eav2 makes for every Fact. Object Facts get an autocomplete
+        select limited to the Items in the object_category of the Fact.
+        """
+        self.fields = deepcopy(self.base_fields)
+        values = {}
+        if self.instance.pk:
+            values = Item.add_eav_values([self.instance])[0].eav_values
+
+        for fact in get_category_facts(self.instance.category):
+            value = values.get(fact.slug)
+            defaults = {
+                "label": fact.name.capitalize(),
+                "required": fact.required,
+                "help_text": fact.help_text,
+                "validators": fact.get_validators(),
+            }
+            if fact.datatype == fact.TYPE_OBJECT:
+                category = fact.object_category
+                if not category:
+                    continue
+                self.fields[fact.slug] = forms.ModelChoiceField(
+                    queryset=Item.objects.filter(category=category),
+                    widget=ItemAutocompleteWidget(
+                        cached_reverse(
+                            "team:category:item:autocomplete",
+                            kwargs={
+                                "team_slug": category.team.slug,
+                                "category_slug": category.slug,
+                            },
+                        )
+                    ),
+                    **defaults
+                )
+            else:
+                if fact.datatype == fact.TYPE_ENUM:
+                    choices = [("", "-----")] + list(
+                        fact.get_choices().values_list("id", "value")
+                    )
+                    defaults["choices"] = choices
+                    if value:
+                        defaults["initial"] = value.pk
+                elif fact.datatype == fact.TYPE_DATE:
+                    defaults["widget"] = AdminSplitDateTime
+                self.fields[fact.slug] = self.FIELD_CLASSES[fact.datatype](**defaults)
+
+            # fill initial data if the Fact has a value
+            if value is not None and fact.datatype != fact.TYPE_ENUM:
+                self.initial[fact.slug] = value
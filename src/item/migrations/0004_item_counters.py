@@ -0,0 +1,59 @@
+# Generated by Django 2.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_item_counters(apps, schema_editor):
+    populate_counters(
+        apps,
+        "item",
+        "item",
+        [
+            ("attachment_count", "attachment.Attachment", None),
+            ("comment_count", "comment.Comment", None),
+            ("review_count", "review.Review", "item"),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("item", "0003_auto_20191213_0944"),
+        ("review", "0004_review_team_category"),
+        ("comment", "0005_comment_team_category"),
+        ("attachment", "0004_attachment_team_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="attachment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Attachments for this Item.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments on this Item.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Reviews of this Item.",
+            ),
+        ),
+        migrations.RunPython(populate_item_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.8 on 2026-10-18 20:00
+
+import itertools
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from item.facts import get_fact_values
+
+
+def populate_fact_values(apps, schema_editor):
+    """
+    Copy the existing EAV Values of all Items to fact_values
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Item = apps.get_model("item", "Item")
+    Value = apps.get_model("eav", "Value")
+    content_type = ContentType.objects.filter(app_label="item", model="item").first()
+    if not content_type:
+        # no Items yet
+        return
+    values = (
+        Value.objects.filter(entity_ct=content_type)
+        .select_related("attribute")
+        .order_by("entity_id")
+    )
+    for entity_id, rows in itertools.groupby(
+        values.iterator(), key=lambda value: value.entity_id
+    ):
+        Item.objects.filter(pk=entity_id).update(fact_values=get_fact_values(rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("eav", "0012_auto_20191027_1858"),
+        ("item", "0004_item_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="fact_values",
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="The values of the Facts of this Item keyed by Fact slug, copied from the EAV Values for filtering and sorting.",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["fact_values"],
+                name="item_fact_values_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        migrations.RunPython(populate_fact_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 2.2.8 on 2026-10-18 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_item_relations(apps, schema_editor):
+    """
+    Create ItemRelations for the existing object Fact values
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Item = apps.get_model("item", "Item")
+    ItemRelation = apps.get_model("item", "ItemRelation")
+    Value = apps.get_model("eav", "Value")
+    content_type = ContentType.objects.filter(app_label="item", model="item").first()
+    if not content_type:
+        # no Items yet
+        return
+    values = Value.objects.filter(
+        entity_ct=content_type,
+        attribute__datatype="object",
+        generic_value_id__isnull=False,
+        # only values pointing at Items which still exist
+        generic_value_id__in=Item.objects.values("pk"),
+    ).values_list("entity_id", "attribute_id", "generic_value_id")
+    ItemRelation.objects.bulk_create(
+        (
+            ItemRelation(source_id=source, fact_id=fact, target_id=target)
+            for source, fact, target in values.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("eav", "0012_auto_20191027_1858"),
+        ("fact", "0001_initial"),
+        ("item", "0005_item_fact_values"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemRelation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fact",
+                    models.ForeignKey(
+                        help_text="The object Fact.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="item_relations",
+                        to="fact.Fact",
+                    ),
+                ),
+                (
+                    "source",
+                    models.ForeignKey(
+                        help_text="The Item which has the object Fact value.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbound_relations",
+                        to="item.Item",
+                    ),
+                ),
+                (
+                    "target",
+                    models.ForeignKey(
+                        help_text="The Item the object Fact value points to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbound_relations",
+                        to="item.Item",
+                    ),
+                ),
+            ],
+            options={"unique_together": {("source", "fact")}},
+        ),
+        migrations.AddIndex(
+            model_name="itemrelation",
+            index=models.Index(
+                fields=["target", "fact"], name="itemrelation_target_idx"
+            ),
+        ),
+        migrations.RunPython(populate_item_relations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 2.2.8 on 2026-10-18 22:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+from item.facts import get_locations
+
+
+def populate_item_locations(apps, schema_editor):
+    """
+    Create ItemLocations for the existing point and area Fact values
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Item = apps.get_model("item", "Item")
+    ItemLocation = apps.get_model("item", "ItemLocation")
+    Value = apps.get_model("eav", "Value")
+    content_type = ContentType.objects.filter(app_label="item", model="item").first()
+    if not content_type:
+        # no Items yet
+        return
+    categories = dict(Item.objects.values_list("pk", "category_id"))
+    values = Value.objects.filter(
+        entity_ct=content_type, attribute__datatype__in=["point", "area"]
+    ).select_related("attribute")
+    ItemLocation.objects.bulk_create(
+        (
+            ItemLocation(
+                item_id=value.entity_id,
+                fact_id=fact_id,
+                category_id=categories[value.entity_id],
+                geometry=geometry,
+                point=point,
+            )
+            for value in values.iterator()
+            if value.entity_id in categories
+            for fact_id, geometry, point in get_locations([value])
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0005_category_counters"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("eav", "0012_auto_20191027_1858"),
+        ("fact", "0001_initial"),
+        ("item", "0006_itemrelation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemLocation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "geometry",
+                    django.contrib.gis.db.models.fields.GeometryField(
+                        help_text="The point or area in WGS84 (srid 4326).", srid=4326
+                    ),
+                ),
+                (
+                    "point",
+                    django.contrib.gis.db.models.fields.PointField(
+                        help_text="The point, or a point on the surface of the area, used for markers and distances.",
+                        srid=4326,
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        help_text="The Category of the Item (denormalized from the Item).",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="category.Category",
+                    ),
+                ),
+                (
+                    "fact",
+                    models.ForeignKey(
+                        help_text="The point or area Fact.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="item_locations",
+                        to="fact.Fact",
+                    ),
+                ),
+                (
+                    "item",
+                    models.ForeignKey(
+                        help_text="The Item this location belongs to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="locations",
+                        to="item.Item",
+                    ),
+                ),
+            ],
+            options={"unique_together": {("item", "fact")}},
+        ),
+        migrations.RunPython(populate_item_locations, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,100 @@
 import eav
 import logging
+import math
 
-from django.db import models
-from django.urls import reverse_lazy
-from guardian.shortcuts import assign_perm
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.gis.db.models import GeometryField, PointField
+from django.contrib.gis.db.models.aggregates import Collect
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.fields.jsonb import KeyTransform
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction
+from django.db.models import Q
+from eav.models import Value
 
 from utils.models import UUIDBaseModel
-from vote.models import Vote
+from vote.models import Vote, VoteAggregate
 from .eavconfig import ItemEavConfig
+from .facts import (
+    FILTER_PREFIX,
+    JSONBDeleteKey,
+    JSONBRenameKey,
+    get_fact_values,
+    get_locations,
+    get_relation_targets,
+    parse_fact_value,
+)
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 
 
+class ItemQuerySet(models.QuerySet):
+    def for_list(self):
+        """
+        Return Items with the Category and its Facts and Ratings
+        loaded up front, ready for the item list template.
+        The counts shown in the list are counter cache fields on the Item.
+        """
+        return self.select_related("category", "category__team").prefetch_related(
+            "category__facts", "category__ratings"
+        )
+
+    def filter_facts(self, facts, params):
+        """
+        Filter on the values given for any of the Facts in params (like
+        request.GET, with the Fact slug prefixed by FILTER_PREFIX), with a
+        single containment lookup on fact_values.
+        Returns no Items if a value is invalid for the Fact datatype.
+        """
+        contains = {}
+        for fact in facts:
+            param = FILTER_PREFIX + fact.slug
+            if param not in params:
+                continue
+            try:
+                contains[fact.slug] = parse_fact_value(fact.datatype, params[param])
+            except ValueError:
+                return self.none()
+        if not contains:
+            return self
+        return self.filter(fact_values__contains=contains)
+
+    def order_by_fact(self, fact, descending=False):
+        """
+        Sort the Items by the value of the Fact, Items without a value last
+        """
+        value = KeyTransform(fact.slug, "fact_values")
+        if descending:
+            return self.order_by(value.desc(nulls_last=True), "name")
+        return self.order_by(value.asc(nulls_last=True), "name")
+
+    def remove_fact_value(self, slug):
+        """
+        Remove the value of a deleted Fact from fact_values
+        """
+        return self.update(
+            fact_values=JSONBDeleteKey(
+                models.F("fact_values"), models.Value(slug), output_field=JSONField()
+            )
+        )
+
+    def rename_fact_value(self, old_slug, new_slug):
+        """
+        Move the value of a Fact which changed its slug in fact_values
+        """
+        return self.filter(fact_values__has_key=old_slug).update(
+            fact_values=JSONBRenameKey(
+                models.F("fact_values"),
+                models.Value(old_slug),
+                models.Value(new_slug),
+                output_field=JSONField(),
+            )
+        )
+
+
 class Item(UUIDBaseModel):
     """
     An Item is a thing/place/event based on a Category.
@@ -21,6 +104,13 @@ class Item(UUIDBaseModel):
     class Meta(UUIDBaseModel.Meta):
         ordering = ["name"]
         unique_together = [["name", "category"], ["slug", "category"]]
+        indexes = [
+            GinIndex(
+                fields=["fact_values"],
+                name="item_fact_values_gin",
+                opclasses=["jsonb_path_ops"],
+            )
+        ]
         permissions = (
             ("add_review", "Add Review belonging to this Item"),
             ("add_comment", "Add Comment about this Item"),
@@ -48,9 +138,43 @@ class Item(UUIDBaseModel):
         help_text="The slug for this Item. Must be unique within the Category.",
     )
 
+    review_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Reviews of this Item."
+    )
+
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Comments on this Item."
+    )
+
+    attachment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Attachments for this Item."
+    )
+
+    fact_values = JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="The values of the Facts of this Item keyed by Fact slug, copied from the EAV Values for filtering and sorting.",
+    )
+
+    objects = ItemQuerySet.as_manager()
+
     filterfield = "category"
     filtervalue = "category"
     breadcrumb_list_name = "Items"
+    team_field = "category__team"
+
+    # - All team members may see and change an Item
+    # - Only team admins may delete an Item
+    # - All team members may add Reviews, Attachments and Comments
+    team_permissions = {
+        "view_item": ["member"],
+        "change_item": ["member"],
+        "delete_item": ["admin"],
+        "add_review": ["member"],
+        "add_attachment": ["member"],
+        "add_comment": ["member"],
+    }
 
     @property
     def team(self):
@@ -59,6 +183,48 @@ class Item(UUIDBaseModel):
     def __str__(self):
         return self.name
 
+    def save(self, **kwargs):
+        """
+        Save the Item, then copy the EAV Values which django-eav2 saved
+        in its post_save signal handler to fact_values and ItemRelations
+        """
+        super().save(**kwargs)
+        self.refresh_fact_values()
+
+    def refresh_fact_values(self):
+        """
+        Update fact_values, the outbound ItemRelations and
+        the ItemLocations from the EAV Values of this Item
+        """
+        values = list(
+            Value.objects.filter(
+                entity_ct=ContentType.objects.get_for_model(self), entity_id=self.pk
+            ).select_related("attribute")
+        )
+        self.fact_values = get_fact_values(values)
+        with transaction.atomic():
+            Item.objects.filter(pk=self.pk).update(fact_values=self.fact_values)
+            self.outbound_relations.all().delete()
+            ItemRelation.objects.bulk_create(
+                [
+                    ItemRelation(source=self, fact_id=fact_id, target_id=target_id)
+                    for fact_id, target_id in get_relation_targets(values)
+                ]
+            )
+            self.locations.all().delete()
+            ItemLocation.objects.bulk_create(
+                [
+                    ItemLocation(
+                        item=self,
+                        fact_id=fact_id,
+                        category_id=self.category_id,
+                        geometry=geometry,
+                        point=point,
+                    )
+                    for fact_id, geometry, point in get_locations(values)
+                ]
+            )
+
     @property
     def detail_url_kwargs(self):
         return {
@@ -68,77 +234,39 @@ class Item(UUIDBaseModel):
         }
 
     object_url_namespace = "team:category:item"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may see an Item
-        - All team members may change an Item
-        - Only team admins may delete an Item
-        - Also grant add_review permissions to all team members
-        - Also grant add_attachment permissions to all team members
-        - Also grant add_commment permissions to all team members
-        """
-        assign_perm("item.view_item", self.team.group, self)
-        assign_perm("item.change_item", self.team.group, self)
-        assign_perm("item.delete_item", self.team.admingroup, self)
-        assign_perm("item.add_review", self.team.group, self)
-        assign_perm("item.add_attachment", self.team.group, self)
-        assign_perm("item.add_comment", self.team.group, self)
-
-    def save(self, **kwargs):
-        """
-        Save the Item and grant permissions
-        """
-        super().save(**kwargs)
-        self.grant_permissions()
+    url_select_related = "category__team"
 
     def get_average_vote(self, rating, only_latest=True):
         """
         Get the average Vote for a given Rating for this Item.
         By default only the latest Vote from each Actor is considered.
         Set only_latest=False to include multiple Votes from each actor.
+        The numbers are read from the VoteAggregate for the Item and Rating,
+        which is maintained whenever a Vote is saved or deleted.
         """
-        votes = Vote.objects.filter(review__item=self, rating=rating).order_by()
-        logger.debug(
-            "Found %s votes to consider for item %s" % (votes.count(), self.name)
-        )
-        if only_latest:
-            actors = votes.distinct("review__actor").values_list(
-                "review__actor", flat=True
-            )
-            voteids = []
-            for actor in actors:
-                voteids.append(
-                    Vote.objects.filter(
-                        review__item=self, rating=rating, review__actor=actor
-                    )
-                    .latest()
-                    .uuid
-                )
-            votes = Vote.objects.filter(uuid__in=voteids)
-
-        logger.debug(
-            "Found %s votes to consider for item %s" % (votes.count(), self.name)
-        )
-
-        if not votes:
+        if only_latest and hasattr(self, "average_votes"):
+            # we have precomputed averages, see add_rating_summaries()
+            return self.average_votes.get(rating.pk, (None, 0))
+        aggregate = VoteAggregate.objects.filter(item=self, rating=rating).first()
+        if not aggregate:
             return (None, 0)
-
-        # return a rounded average, manually because:
-        # aggregate() + distinct(fields) not implemented.
-        # TODO: check if this was added in 2.2 maybe?
-        sum = 0
-        for vote in votes.values_list("vote", flat=True):
-            sum += vote
-        result = (round(sum / votes.count(), 2), votes.count())
+        result = aggregate.get_average(only_latest=only_latest)
         logger.debug("returning %s %s" % result)
         return result
 
+    def get_average_votes(self, only_latest=True):
+        """
+        Get the average Votes for all Ratings for this Item in a single query.
+        Returns a dict with Rating uuids as keys and the same
+        (average, count) tuples as get_average_vote() as values.
+        Ratings without Votes are left out, like Category.get_average_votes().
+        """
+        count_field = "latest_vote_count" if only_latest else "vote_count"
+        return {
+            aggregate.rating_id: aggregate.get_average(only_latest=only_latest)
+            for aggregate in self.vote_aggregates.filter(**{count_field + "__gt": 0})
+        }
+
     def get_actor_vote(self, rating, actor, only_latest=True):
         """
         Get the average Vote for a given Rating for this Actor
@@ -146,25 +274,121 @@ class Item(UUIDBaseModel):
         By default only the latest Vote is considered.
         Set only_latest=False to include all Votes.
         """
+        if only_latest and actor.pk in getattr(self, "actor_votes", {}):
+            # we have precomputed votes, see add_rating_summaries()
+            return self.actor_votes[actor.pk].get(rating.pk)
+
         votes = Vote.objects.filter(
             review__item=self, rating=rating, review__actor=actor
         )
 
-        if only_latest and votes:
+        if only_latest:
             # just return the value of the latest vote directly
-            return votes.latest("created").vote
+            return votes.order_by("-created").values_list("vote", flat=True).first()
 
-        if not votes:
+        # return a rounded average
+        result = votes.aggregate(average=models.Avg("vote"))["average"]
+        if result is None:
             # nothing to do here
             return None
+        return round(result, 2)
 
-        # return a rounded average, manually because:
-        # aggregate() + distinct(fields) not implemented.
-        # TODO: check if this was added in 2.2 maybe?
-        sum = 0
-        for vote in votes.values_list("vote", flat=True):
-            sum += vote
-        return round(sum / votes.count(), 2)
+    @classmethod
+    def add_rating_summaries(cls, items, actor=None):
+        """
+        Get the average Votes for all Ratings for all the Items, and the
+        latest Votes made by actor, in one query each. The results are
+        attached to each Item as average_votes and actor_votes, which
+        get_average_vote() and get_actor_vote() use when they exist.
+        Returns the Items as a list.
+        """
+        items = list(items)
+        for item in items:
+            item.average_votes = {}
+            if actor:
+                item.actor_votes = {actor.pk: {}}
+        itemdict = {item.pk: item for item in items}
+
+        for aggregate in VoteAggregate.objects.filter(
+            item__in=items, latest_vote_count__gt=0
+        ):
+            itemdict[aggregate.item_id].average_votes[
+                aggregate.rating_id
+            ] = aggregate.get_average()
+
+        if actor:
+            votes = (
+                Vote.objects.filter(review__item__in=items, review__actor=actor)
+                .latest_per_actor()
+                .values_list("review__item", "rating", "vote")
+            )
+            for item_id, rating_id, vote in votes:
+                itemdict[item_id].actor_votes[actor.pk][rating_id] = vote
+        return items
+
+    @classmethod
+    def add_eav_values(cls, items):
+        """
+        Get the EAV Values of all the Items in one query, with the Facts
+        (EAV Attributes) joined in. The values are attached to each Item
+        as eav_values, a dict of Fact slug to value, which the
+        get_eav_value template filter uses when it exists. Values of
+        enum Facts are joined in too, values of object Facts are fetched
+        with one extra query per content type.
+        Returns the Items as a list.
+        """
+        items = list(items)
+        for item in items:
+            item.eav_values = {}
+        itemdict = {item.pk: item for item in items}
+        if not itemdict:
+            return items
+
+        values = (
+            Value.objects.filter(
+                entity_ct=ContentType.objects.get_for_model(cls),
+                entity_id__in=itemdict.keys(),
+            )
+            .select_related("attribute", "value_enum")
+            .prefetch_related("value_object")
+        )
+        for value in values:
+            itemdict[value.entity_id].eav_values[value.attribute.slug] = value.value
+        return items
+
+    @classmethod
+    def add_related_items(cls, items):
+        """
+        Get the related Items of all the Items in one query, both the Items
+        they point to with object Facts (outbound) and the Items which point
+        to them (inbound). The results are attached to each Item as
+        related_items, a dict with "outbound" and "inbound" dicts of
+        Fact to a list of Items. Returns the Items as a list.
+        """
+        items = list(items)
+        for item in items:
+            item.related_items = {"outbound": {}, "inbound": {}}
+        itemdict = {item.pk: item for item in items}
+        if not itemdict:
+            return items
+
+        relations = (
+            ItemRelation.objects.filter(
+                Q(source__in=itemdict.keys()) | Q(target__in=itemdict.keys())
+            )
+            .select_related("fact", "source__category__team", "target__category__team")
+            .order_by("fact__name", "source__name", "target__name")
+        )
+        for relation in relations:
+            if relation.source_id in itemdict:
+                itemdict[relation.source_id].related_items["outbound"].setdefault(
+                    relation.fact, []
+                ).append(relation.target)
+            if relation.target_id in itemdict:
+                itemdict[relation.target_id].related_items["inbound"].setdefault(
+                    relation.fact, []
+                ).append(relation.source)
+        return items
 
     @property
     def facts(self):
@@ -183,5 +407,131 @@ class Item(UUIDBaseModel):
         return self.reviews.all()[:10]
 
 
+class ItemRelation(models.Model):
+    """
+    An ItemRelation links an Item to the Item it points to with an
+    object Fact. It is a copy of the object Fact values in the EAV table,
+    indexed in both directions, maintained by Item.refresh_fact_values().
+    """
+
+    class Meta:
+        unique_together = [("source", "fact")]
+        indexes = [
+            models.Index(fields=["target", "fact"], name="itemrelation_target_idx")
+        ]
+
+    source = models.ForeignKey(
+        "item.Item",
+        on_delete=models.CASCADE,
+        related_name="outbound_relations",
+        help_text="The Item which has the object Fact value.",
+    )
+
+    fact = models.ForeignKey(
+        "fact.Fact",
+        on_delete=models.CASCADE,
+        related_name="item_relations",
+        help_text="The object Fact.",
+    )
+
+    target = models.ForeignKey(
+        "item.Item",
+        on_delete=models.CASCADE,
+        related_name="inbound_relations",
+        help_text="The Item the object Fact value points to.",
+    )
+
+    def __str__(self):
+        return "%s -> %s (%s)" % (self.source_id, self.target_id, self.fact_id)
+
+
+class ItemLocationQuerySet(models.QuerySet):
+    def in_bounds(self, west, south, east, north):
+        """
+        Return the ItemLocations with a geometry overlapping
+        the bounding box, answered by the GiST index
+        """
+        bbox = Polygon.from_bbox((west, south, east, north))
+        bbox.srid = 4326
+        return self.filter(geometry__bboverlaps=bbox)
+
+    def within_radius(self, longitude, latitude, meters):
+        """
+        Return the ItemLocations with a point within meters of the given
+        point. The bounding box of the circle is checked first so the GiST
+        index is used, then the exact distance on the sphere.
+        """
+        dlat = meters / 111320
+        dlon = meters / (111320 * max(math.cos(math.radians(latitude)), 0.01))
+        bbox = Polygon.from_bbox(
+            (longitude - dlon, latitude - dlat, longitude + dlon, latitude + dlat)
+        )
+        bbox.srid = 4326
+        return self.filter(
+            point__bboverlaps=bbox,
+            point__distance_lte=(Point(longitude, latitude, srid=4326), D(m=meters)),
+        )
+
+    def clusters(self, cell_size):
+        """
+        Group the points in a grid with cells of cell_size degrees.
+        Returns dicts with the number of points and the center
+        (the centroid of the points) of each nonempty cell.
+        """
+        return (
+            self.annotate(cell=SnapToGrid("point", cell_size))
+            .values("cell")
+            .annotate(count=models.Count("pk"), center=Centroid(Collect("point")))
+            .values("count", "center")
+            .order_by()
+        )
+
+
+class ItemLocation(models.Model):
+    """
+    An ItemLocation is a copy of a point or area Fact value of an Item,
+    with GiST indexed geometries for map queries in a Category. It is
+    maintained by Item.refresh_fact_values().
+    """
+
+    class Meta:
+        unique_together = [("item", "fact")]
+
+    item = models.ForeignKey(
+        "item.Item",
+        on_delete=models.CASCADE,
+        related_name="locations",
+        help_text="The Item this location belongs to.",
+    )
+
+    fact = models.ForeignKey(
+        "fact.Fact",
+        on_delete=models.CASCADE,
+        related_name="item_locations",
+        help_text="The point or area Fact.",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.CASCADE,
+        related_name="+",
+        help_text="The Category of the Item (denormalized from the Item).",
+    )
+
+    geometry = GeometryField(
+        srid=4326, help_text="The point or area in WGS84 (srid 4326)."
+    )
+
+    point = PointField(
+        srid=4326,
+        help_text="The point, or a point on the surface of the area, used for markers and distances.",
+    )
+
+    objects = ItemLocationQuerySet.as_manager()
+
+    def __str__(self):
+        return "%s %s" % (self.item_id, self.fact_id)
+
+
 # register Item model with django-eav2
 eav.register(Item, ItemEavConfig)
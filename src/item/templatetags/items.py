@@ -1,10 +1,9 @@
 import logging
 
 from django import template
+from django.db.models import prefetch_related_objects
 
 from item.models import Item
-from fact.models import Fact
-from eav.models import Value
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 register = template.Library()
@@ -13,15 +12,33 @@ register = template.Library()
 @register.simple_tag(takes_context=True)
 def get_related_items(context):
     """
-    Template tag to return a list of querysets with the related items
+    Template tag to return a list of lists with the Items which point to
+    this Item with an object Fact, one list per Fact. The ItemRelations are
+    read in one query, and rating summaries and EAV values are added to
+    all the related Items at once for the item list template.
     """
-    result = []
-    for related_fact in Fact.objects.filter(object_category=context["category"]):
-        result.append(
-            Item.objects.filter(
-                uuid__in=Value.objects.filter(
-                    generic_value_id=context["item"].uuid, attribute=related_fact
-                ).values_list("entity_id", flat=True)
-            )
-        )
+    user = context["request"].user
+    actor = user.actor if user.is_authenticated else None
+    item = context["item"]
+    if not hasattr(item, "related_items"):
+        Item.add_related_items([item])
+    result = list(item.related_items["inbound"].values())
+    items = [related for items in result for related in items]
+    prefetch_related_objects(items, "category__facts", "category__ratings")
+    Item.add_eav_values(items)
+    Item.add_rating_summaries(items, actor=actor)
     return result
+
+
+@register.simple_tag(takes_context=True)
+def order_url(context, slug, descending=False):
+    """
+    Template tag to return the query string of the current page sorted by
+    the Fact with the slug, keeping the other parameters like the Fact
+    filters and contexts. The page is dropped so the sorted list starts
+    on the first page.
+    """
+    params = context["request"].GET.copy()
+    params["order"] = "-" + slug if descending else slug
+    params.pop("page", None)
+    return "?" + params.urlencode()
@@ -1,12 +1,20 @@
 import factory
 import random
 
+from django.contrib.gis.geos import Point
+from django.test import override_settings
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from eav.models import EnumGroup, EnumValue
 
 from category.tests import CategoryViewTestCase
 from category.models import Category
+from fact.models import Fact
 
 from .factories import ItemFactory
+from .facts import parse_fact_value
+from .models import Item
 
 
 class ItemViewTestCase(CategoryViewTestCase):
@@ -85,6 +93,121 @@ class ItemListViewTest(ItemViewTestCase):
             ):
                 self.assertNotContains(response, "<td>%s</td>" % item.name)
 
+    def test_item_list_query_count(self):
+        """ Assert that the number of queries does not grow with the number of items """
+        self.client.force_login(self.team2_member)
+        # warm up caches like ContentType lookups
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.list_url)
+        for i in range(5):
+            ItemFactory(category=self.item.category)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(before), len(after))
+
+    def test_item_list_eav_values(self):
+        """ Assert that the Fact values are shown without a query per Item and Fact """
+        for name in ["Colour", "Size"]:
+            Fact.objects.create(
+                category=self.item.category,
+                name=name,
+                slug=name.lower(),
+                datatype="text",
+            )
+        shapes = EnumGroup.objects.create(name="Shapes")
+        round_shape = EnumValue.objects.create(value="roundshape")
+        shapes.values.add(round_shape)
+        Fact.objects.create(
+            category=self.item.category,
+            name="Shape",
+            slug="shape",
+            datatype="enum",
+            enum_group=shapes,
+        )
+        for item in self.item.category.items.all():
+            item.eav.colour = "colour of %s" % item.slug
+            item.eav.size = "size of %s" % item.slug
+            item.eav.shape = round_shape
+            item.save()
+
+        self.client.force_login(self.team2_member)
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.list_url)
+        item = ItemFactory(category=self.item.category)
+        item.eav.colour = "colour of %s" % item.slug
+        item.eav.shape = round_shape
+        item.save()
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(before), len(after))
+        for item in self.item.category.items.all():
+            self.assertContains(response, "colour of %s" % item.slug)
+        self.assertContains(response, "roundshape")
+
+    def test_item_list_fact_filter_order(self):
+        """ Assert that Items can be filtered and sorted by Fact values """
+        Fact.objects.create(
+            category=self.item.category, name="Size", slug="size", datatype="int"
+        )
+        items = list(self.item.category.items.all())
+        for size, item in enumerate(items):
+            item.eav.size = size
+            item.save()
+        self.assertEqual(
+            self.item.category.items.get(pk=items[1].pk).fact_values, {"size": 1}
+        )
+
+        self.client.force_login(self.team2_member)
+        response = self.client.get(self.list_url, {"f_size": "1"})
+        self.assertEqual(list(response.context["item_list"]), [items[1]])
+        response = self.client.get(self.list_url, {"f_size": "large"})
+        self.assertEqual(list(response.context["item_list"]), [])
+        response = self.client.get(self.list_url, {"order": "-size"})
+        self.assertEqual(list(response.context["item_list"]), items[::-1])
+
+        # the sort links keep the filters
+        response = self.client.get(self.list_url, {"f_size": "1", "order": "size"})
+        self.assertContains(response, 'href="?f_size=1&amp;order=-size"')
+
+    def test_item_list_fact_filter_reserved_slug(self):
+        """ Assert that a Fact with the slug of another parameter doesn't filter on it """
+        Fact.objects.create(
+            category=self.item.category, name="Page", slug="page", datatype="int"
+        )
+        self.client.force_login(self.team2_member)
+        response = self.client.get(self.list_url, {"page": "1"})
+        self.assertEqual(
+            len(response.context["item_list"]), self.item.category.items.count()
+        )
+
+    def test_parse_fact_value(self):
+        """ Assert that invalid filter values are rejected """
+        self.assertEqual(parse_fact_value("float", "1.5"), 1.5)
+        for value in ["nan", "inf", "-Infinity"]:
+            with self.assertRaises(ValueError):
+                parse_fact_value("float", value)
+        with self.assertRaises(ValueError):
+            parse_fact_value("point", "1,2")
+
+    def test_fact_values_follow_fact(self):
+        """ Assert that fact_values are renamed and removed with the Fact """
+        fact = Fact.objects.create(
+            category=self.item.category, name="Size", slug="size", datatype="int"
+        )
+        self.item.eav.size = 3
+        self.item.save()
+        fact.slug = "bigness"
+        fact.save()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.fact_values, {"bigness": 3})
+        fact.value_set.all().delete()
+        fact.delete()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.fact_values, {})
+
     def test_item_list_nonmember(self):
         """ Assert that non-members can not list items """
         self.client.force_login(self.team3_member)
@@ -107,6 +230,31 @@ class ItemDetailViewTest(ItemViewTestCase):
                 status_code=200,
             )
 
+    def test_item_related_items(self):
+        """ Assert that Items pointing to each other with object Facts are found in one query """
+        other_category = self.item.category.team.categories.exclude(
+            pk=self.item.category.pk
+        ).first()
+        fact = Fact.objects.create(
+            category=other_category,
+            object_category=self.item.category,
+            name="Related",
+            slug="related",
+            datatype="object",
+        )
+        source = other_category.items.first()
+        source.eav.related = self.item
+        source.save()
+
+        with self.assertNumQueries(1):
+            target, source = Item.add_related_items([self.item, source])
+        self.assertEqual(target.related_items["inbound"], {fact: [source]})
+        self.assertEqual(source.related_items["outbound"], {fact: [target]})
+
+        self.client.force_login(self.team2_member)
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, source.name)
+
     def test_item_detail_nonmember(self):
         """ Assert that item details denied for a non-member """
         self.client.force_login(self.team1_member)
@@ -114,9 +262,123 @@ class ItemDetailViewTest(ItemViewTestCase):
         self.assertEqual(response.status_code, 403)
 
 
+class ItemAutocompleteViewTest(ItemViewTestCase):
+    """ Test ItemAutocompleteView """
+
+    def setUp(self):
+        """ Add the autocomplete url """
+        super().setUp()
+        self.autocomplete_url = reverse(
+            "team:category:item:autocomplete",
+            kwargs={
+                "team_slug": self.item.team.slug,
+                "category_slug": self.item.category.slug,
+            },
+        )
+
+    def test_item_autocomplete_member(self):
+        """ Assert that matching Items are returned as JSON """
+        self.client.force_login(self.team2_member)
+        response = self.client.get(self.autocomplete_url, {"q": self.item.name[:10]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn(
+            {"id": str(self.item.pk), "text": self.item.name}, data["results"]
+        )
+        self.assertFalse(data["more"])
+
+    def test_item_autocomplete_nonmember(self):
+        """ Assert that non-members can not search Items """
+        self.client.force_login(self.team1_member)
+        response = self.client.get(self.autocomplete_url)
+        self.assertEqual(response.status_code, 403)
+
+
+class ItemMapViewTest(ItemViewTestCase):
+    """ Test ItemMapView """
+
+    def setUp(self):
+        """ Give the Item a location """
+        super().setUp()
+        Fact.objects.create(
+            category=self.item.category,
+            name="Location",
+            slug="location",
+            datatype="point",
+        )
+        self.item.eav.location = Point(12.5683, 55.6761, srid=4326)
+        self.item.save()
+        self.map_url = reverse(
+            "team:category:item:map",
+            kwargs={
+                "team_slug": self.item.team.slug,
+                "category_slug": self.item.category.slug,
+            },
+        )
+        self.client.force_login(self.team2_member)
+
+    def test_item_map_markers(self):
+        """ Assert that Items inside the bounds are returned as markers """
+        response = self.client.get(self.map_url, {"bbox": "12,55,13,56", "zoom": 10})
+        self.assertEqual(response.status_code, 200)
+        features = response.json()["features"]
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]["properties"]["name"], self.item.name)
+        self.assertEqual(features[0]["geometry"]["coordinates"], [12.5683, 55.6761])
+
+        response = self.client.get(self.map_url, {"bbox": "0,0,1,1", "zoom": 10})
+        self.assertEqual(response.json()["features"], [])
+
+    @override_settings(ITEM_MAP_MAX_MARKERS=0)
+    def test_item_map_clusters(self):
+        """ Assert that clusters are returned when there are too many Items """
+        response = self.client.get(self.map_url, {"bbox": "12,55,13,56", "zoom": 5})
+        features = response.json()["features"]
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]["properties"], {"count": 1})
+
+    def test_item_map_radius(self):
+        """ Assert that Items within the radius are found """
+        query = {"lat": 55.68, "lon": 12.57, "radius": 1000}
+        response = self.client.get(self.map_url, query)
+        self.assertEqual(len(response.json()["features"]), 1)
+        query["radius"] = 100
+        response = self.client.get(self.map_url, query)
+        self.assertEqual(len(response.json()["features"]), 0)
+
+    def test_item_map_invalid(self):
+        """ Assert that invalid queries are rejected """
+        response = self.client.get(self.map_url, {"bbox": "12,55"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.map_url, {"bbox": "nan,0,1,1"})
+        self.assertEqual(response.status_code, 400)
+        query = {"lat": 55.68, "lon": 12.57, "radius": "inf"}
+        response = self.client.get(self.map_url, query)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.map_url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_item_map_nonmember(self):
+        """ Assert that non-members can not see the map """
+        self.client.force_login(self.team1_member)
+        response = self.client.get(self.map_url, {"bbox": "12,55,13,56"})
+        self.assertEqual(response.status_code, 403)
+
+
 class ItemCreateViewTest(ItemViewTestCase):
     """ Test ItemCreateView """
 
+    def test_item_create_form_facts(self):
+        """ Assert that the cached Facts of the item form are refreshed when a Fact is added """
+        self.client.force_login(self.team2_member)
+        response = self.client.get(self.create_url)
+        self.assertNotContains(response, "Colour")
+        Fact.objects.create(
+            category=self.item.category, name="Colour", slug="colour", datatype="text"
+        )
+        response = self.client.get(self.create_url)
+        self.assertContains(response, "Colour")
+
     def test_item_create_unauthenticated(self):
         """ Assert that unauthenticated users can not create Items """
         # try creating without login
@@ -4,6 +4,8 @@ from socialrating.generic_fk_urls import generic_fk_urls
 
 from .views import (
     ItemListView,
+    ItemAutocompleteView,
+    ItemMapView,
     ItemCreateView,
     ItemDetailView,
     ItemSettingsView,
@@ -16,6 +18,8 @@ app_name = "item"
 urlpatterns = [
     path("", ItemListView.as_view(), name="list"),
     path("create/", ItemCreateView.as_view(), name="create"),
+    path("autocomplete/", ItemAutocompleteView.as_view(), name="autocomplete"),
+    path("map/", ItemMapView.as_view(), name="map"),
     path(
         "<slug:item_slug>/",
         include(
@@ -1,12 +1,16 @@
+import math
+
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.contrib import messages
 from django.shortcuts import redirect, reverse
+from django.conf import settings
+from django.http import JsonResponse
 
 from utils.mixins import SRViewMixin, SRListViewMixin
 
-from .models import Item
+from .models import Item, ItemLocation
 from .forms import ItemForm
 from .mixins import ItemFormMixin
 
@@ -17,6 +21,165 @@ class ItemListView(SRListViewMixin, ListView):
     template_name = "item_list.html"
     permission_required = "item.view_item"
 
+    def get_queryset(self):
+        """
+        Include counts and the Category Facts and Ratings for the template.
+        Filter on Fact values given like ?f_colour=red, and sort by
+        a Fact given like ?order=colour or ?order=-colour.
+        """
+        queryset = super().get_queryset().for_list()
+        facts = {fact.slug: fact for fact in self.category.facts.all()}
+        queryset = queryset.filter_facts(facts.values(), self.request.GET)
+        order = self.request.GET.get("order", "")
+        if order.lstrip("-") in facts:
+            queryset = queryset.order_by_fact(
+                facts[order.lstrip("-")], descending=order.startswith("-")
+            )
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        """
+        Add the rating summaries and EAV values to the Items on the current
+        page, so the template tags don't need to query for each Item, Rating
+        and Fact.
+        """
+        context = super().get_context_data(**kwargs)
+        Item.add_eav_values(context["object_list"])
+        Item.add_rating_summaries(
+            context["object_list"],
+            actor=self.request.user.actor
+            if self.request.user.is_authenticated
+            else None,
+        )
+        return context
+
+
+class ItemAutocompleteView(SRListViewMixin, ListView):
+    """
+    Return a page of Items in the Category with a name matching ?q= as
+    JSON, for the object Fact selects in the item form
+    """
+
+    model = Item
+    paginate_by = 20
+    permission_required = "item.view_item"
+
+    def get_queryset(self):
+        queryset = super().get_queryset().order_by("name")
+        query = self.request.GET.get("q", "").strip()
+        if query:
+            queryset = queryset.filter(name__icontains=query)
+        return queryset
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse(
+            {
+                "results": [
+                    {"id": str(item.pk), "text": item.name}
+                    for item in context["object_list"]
+                ],
+                "more": context["page_obj"].has_next(),
+            }
+        )
+
+
+def parse_map_float(string):
+    """
+    Convert a number from the map query string to a float. Raises ValueError
+    for invalid values, including nan and inf which GEOS and PostGIS can't use.
+    """
+    value = float(string)
+    if not math.isfinite(value):
+        raise ValueError("Invalid number %s" % string)
+    return value
+
+
+class ItemMapView(SRListViewMixin, ListView):
+    """
+    Return the locations of the Items in the Category as GeoJSON, for the
+    map bounds given like ?bbox=<west>,<south>,<east>,<north>&zoom=<zoom>
+    or within a radius given like ?lat=<lat>&lon=<lon>&radius=<meters>.
+    Add ?fact=<slug> to only use one point or area Fact. Single Items are
+    returned when there are few enough of them (ITEM_MAP_MAX_MARKERS),
+    otherwise clusters with the number of Items in each grid cell.
+    """
+
+    model = Item
+    permission_required = "item.view_item"
+
+    def get(self, request, *args, **kwargs):
+        try:
+            locations, zoom = self.get_locations()
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        if zoom >= 18 or locations.count() <= settings.ITEM_MAP_MAX_MARKERS:
+            features = self.get_markers(locations)
+        else:
+            features = self.get_clusters(locations, zoom)
+        return JsonResponse({"type": "FeatureCollection", "features": features})
+
+    def get_locations(self):
+        """
+        Return the ItemLocations matching the query string,
+        and the zoom level. Raises ValueError for invalid parameters.
+        """
+        locations = ItemLocation.objects.filter(
+            category=self.category, item__in=self.get_queryset()
+        )
+        if "fact" in self.request.GET:
+            locations = locations.filter(fact__slug=self.request.GET["fact"])
+
+        zoom = min(max(int(self.request.GET.get("zoom", 0)), 0), 20)
+        if "bbox" in self.request.GET:
+            bbox = [parse_map_float(x) for x in self.request.GET["bbox"].split(",")]
+            if len(bbox) != 4:
+                raise ValueError("bbox must be west,south,east,north")
+            locations = locations.in_bounds(*bbox)
+        elif all(key in self.request.GET for key in ["lat", "lon", "radius"]):
+            locations = locations.within_radius(
+                parse_map_float(self.request.GET["lon"]),
+                parse_map_float(self.request.GET["lat"]),
+                parse_map_float(self.request.GET["radius"]),
+            )
+        else:
+            raise ValueError("Either bbox or lat, lon and radius are required")
+        return locations, zoom
+
+    def get_markers(self, locations):
+        return [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [location.point.x, location.point.y],
+                },
+                "properties": {
+                    "name": location.item.name,
+                    "url": location.item.get_absolute_url(),
+                    "fact": location.fact.slug,
+                },
+            }
+            for location in locations.select_related(
+                "item__category__team", "fact"
+            ).order_by("item__name")[: settings.ITEM_MAP_MAX_MARKERS]
+        ]
+
+    def get_clusters(self, locations, zoom):
+        # the size in degrees of a grid cell at this zoom level
+        cell_size = 360 / 2 ** zoom / settings.ITEM_MAP_CLUSTER_GRID
+        return [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [cluster["center"].x, cluster["center"].y],
+                },
+                "properties": {"count": cluster["count"]},
+            }
+            for cluster in locations.clusters(cell_size)
+        ]
+
 
 class ItemCreateView(SRViewMixin, ItemFormMixin, CreateView):
     """
@@ -66,6 +229,13 @@ class ItemDetailView(SRViewMixin, DetailView):
     slug_url_kwarg = "item_slug"
     permission_required = "item.view_item"
 
+    def get_context_data(self, **kwargs):
+        """
+        Load all the EAV values for the item card in one query
+        """
+        Item.add_eav_values([self.object])
+        return super().get_context_data(**kwargs)
+
 
 class ItemSettingsView(SRViewMixin, DetailView):
     model = Item
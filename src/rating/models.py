@@ -1,7 +1,5 @@
 from django.db import models
-from django.urls import reverse_lazy
 from django.core.exceptions import ValidationError
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 
@@ -54,6 +52,15 @@ class Rating(UUIDBaseModel):
     filterfield = "category"
     filtervalue = "category"
     breadcrumb_list_name = "Ratings"
+    team_field = "category__team"
+
+    # - All team members may see a Rating
+    # - Only team admins may change or delete a Rating
+    team_permissions = {
+        "view_rating": ["member"],
+        "change_rating": ["admin"],
+        "delete_rating": ["admin"],
+    }
 
     @property
     def team(self):
@@ -71,25 +78,7 @@ class Rating(UUIDBaseModel):
         }
 
     object_url_namespace = "team:category:rating"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may see a vote
-        - Only the Review author may change the Vote
-        - Only team admins and the Review author may delete a Vote
-        """
-        assign_perm("rating.view_rating", self.team.group, self)
-        assign_perm("rating.change_rating", self.team.admingroup, self)
-        assign_perm("rating.delete_rating", self.team.admingroup, self)
-
-    def save(self, **kwargs):
-        super().save(**kwargs)
-        self.grant_permissions()
+    url_select_related = "category__team"
 
     def clean(self):
         if self.max_rating < 2 or self.max_rating > 100:
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_team_and_category(apps, schema_editor):
+    """
+    Set the denormalized team and category for all Reviews, one Category at a time
+    """
+    Category = apps.get_model("category", "Category")
+    Review = apps.get_model("review", "Review")
+    for category in Category.objects.all():
+        Review.objects.filter(item__category=category).update(
+            team_id=category.team_id, category=category
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("team", "0003_auto_20191213_0944"),
+        ("review", "0003_auto_20191213_0944"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="review",
+            name="category",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Category this Review belongs to (denormalized from the Item).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="team",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Team this Review belongs to (denormalized from the Item).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+        migrations.RunPython(populate_team_and_category, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="review",
+            name="category",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Category this Review belongs to (denormalized from the Item).",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="review",
+            name="team",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Team this Review belongs to (denormalized from the Item).",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+    ]
@@ -1,6 +1,4 @@
 from django.db import models
-from django.urls import reverse_lazy
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 
@@ -32,6 +30,22 @@ class Review(UUIDBaseModel):
         help_text="The Item this Review applies to",
     )
 
+    team = models.ForeignKey(
+        "team.Team",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        help_text="The Team this Review belongs to (denormalized from the Item).",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        help_text="The Category this Review belongs to (denormalized from the Item).",
+    )
+
     context = models.ForeignKey(
         "context.Context",
         on_delete=models.CASCADE,
@@ -52,22 +66,43 @@ class Review(UUIDBaseModel):
     filterfield = "item"
     filtervalue = "item"
     breadcrumb_list_name = "Reviews"
+    owner_field = "actor"
+
+    # keep the review_count on the Item, Category and Team up to date
+    counter_caches = [
+        ("item", "review_count"),
+        ("category", "review_count"),
+        ("team", "review_count"),
+    ]
+
+    # - All team members may see a Review
+    # - Only the Review author may change the Review
+    # - Only team admins and the Review author may delete a Review
+    # - Only the Review author may add Attachments and Votes
+    team_permissions = {
+        "view_review": ["member"],
+        "change_review": ["owner"],
+        "delete_review": ["owner", "admin"],
+        "add_attachment": ["owner"],
+        "add_vote": ["owner"],
+    }
 
     @property
     def breadcrumb_detail_name(self):
         return self.headline[0:50]
 
-    @property
-    def team(self):
-        return self.item.category.team
-
-    @property
-    def category(self):
-        return self.item.category
-
     def __str__(self):
         return self.headline
 
+    def save(self, **kwargs):
+        """
+        Set the denormalized team and category from the Item
+        """
+        if self._state.adding or self.category_id is None:
+            self.team_id = self.item.category.team_id
+            self.category_id = self.item.category_id
+        super().save(**kwargs)
+
     @property
     def detail_url_kwargs(self):
         return {
@@ -78,31 +113,16 @@ class Review(UUIDBaseModel):
         }
 
     object_url_namespace = "team:category:item:review"
+    url_select_related = "item__category__team"
 
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
+    def delete(self, **kwargs):
         """
-        - All team members may see a review
-        - Only the Review author may change the Review
-        - Only team admins and the Review author may delete a Review
+        Delete the Votes one by one before deleting the Review,
+        so the VoteAggregates are updated for each Vote.
         """
-        assign_perm("review.view_review", self.team.group, self)
-        assign_perm("review.change_review", self.actor.user, self)
-        assign_perm("review.delete_review", self.actor.user, self)
-        assign_perm("review.delete_review", self.team.admingroup, self)
-        assign_perm("review.add_attachment", self.actor.user, self)
-        assign_perm("review.add_vote", self.actor.user, self)
-
-    def save(self, **kwargs):
-        """
-        Save Review and grant permissions
-        """
-        super().save(**kwargs)
-        self.grant_permissions()
+        for vote in self.votes.all():
+            vote.delete()
+        return super().delete(**kwargs)
 
     def ratings_missing_votes(self):
         return self.category.ratings.all().exclude(
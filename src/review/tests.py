@@ -4,8 +4,14 @@ import random
 from django.urls import reverse
 
 from item.tests import ItemViewTestCase
+from comment.models import Comment
 from item.models import Item
+from team.models import Team
+from utils.counters import rebuild_counters
+from utils.mixins import SlugObjectsMixin
+from vote.models import Vote
 from .factories import ReviewFactory
+from .models import Review
 
 
 class ReviewViewTestCase(ItemViewTestCase):
@@ -125,6 +131,49 @@ class ReviewDetailViewTest(ReviewViewTestCase):
         response = self.client.get(self.detail_url)
         self.assertEqual(response.status_code, 403)
 
+    def test_review_url_objects(self):
+        """ Assert that the objects in the review url are found with one query """
+        kwargs = {
+            "team_slug": self.review.team.slug,
+            "category_slug": self.review.item.category.slug,
+            "item_slug": self.review.item.slug,
+            "review_uuid": self.review.uuid,
+        }
+        with self.assertNumQueries(1):
+            objects = SlugObjectsMixin().get_url_objects(kwargs)
+        self.assertEqual(list(objects), ["team", "category", "item", "review"])
+        self.assertEqual(objects["review"], self.review)
+        self.assertEqual(objects["team"], self.review.team)
+
+    def test_review_team_and_category(self):
+        """ Assert that the denormalized team and category are set """
+        self.assertEqual(self.review.team, self.item.category.team)
+        self.assertEqual(self.review.category, self.item.category)
+        self.assertIn(self.review, self.item.category.team.reviews)
+        comment = Comment.objects.create(
+            comment_object=self.review, actor=self.review.actor, subject="1", body="1"
+        )
+        self.assertEqual(comment.team, self.review.team)
+        self.assertEqual(comment.category, self.review.category)
+
+    def test_review_url_cached(self):
+        """ Assert that the review url is only built once """
+        review = Review.objects.get(pk=self.review.pk)
+        self.assertEqual(review.get_absolute_url(), self.detail_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(review.get_absolute_url(), self.detail_url)
+
+    def test_review_gfk_object_id(self):
+        """ Assert that the GFK object_id is stored as an uuid """
+        comment = Comment.objects.create(
+            comment_object=self.review, actor=self.review.actor, subject="1", body="1"
+        )
+        comment = Comment.objects.get(pk=comment.pk)
+        self.assertEqual(comment.object_id, self.review.pk)
+        self.assertEqual(comment.comment_object, self.review)
+        self.assertIn(comment, self.review.comments.all())
+        self.assertTrue(self.review.events.filter(object_id=self.review.pk).exists())
+
 
 class ReviewCreateViewTest(ReviewViewTestCase):
     """ Test ReviewCreateView """
@@ -280,3 +329,144 @@ class ReviewDeleteViewTest(ReviewViewTestCase):
         self.assertNotContains(response, self.review.headline)
         # do we have the success message?
         self.assertContains(response, "Review has been deleted")
+
+
+class ReviewCommentCountTest(ReviewViewTestCase):
+    """ Test the recursive comment counts """
+
+    def test_review_comment_count(self):
+        """ Assert that comments on comments are counted, in one query per list """
+        actor = self.review.actor
+        comment = Comment.objects.create(
+            comment_object=self.review, actor=actor, subject="1", body="1"
+        )
+        Comment.objects.create(
+            comment_object=self.review,
+            reply_to=comment,
+            actor=actor,
+            subject="2",
+            body="2",
+        )
+        nested = Comment.objects.create(
+            comment_object=comment, actor=actor, subject="3", body="3"
+        )
+        Comment.objects.create(
+            comment_object=nested, actor=actor, subject="4", body="4"
+        )
+
+        reviews = list(self.item.reviews.all())
+        with self.assertNumQueries(2):
+            reviews = Review.add_tree_counts(reviews)
+        for review in reviews:
+            expected = 4 if review == self.review else 0
+            self.assertEqual(review.get_comment_count(), expected)
+            self.assertEqual(review.get_attachment_count(), 0)
+        self.assertEqual(Review.objects.get(pk=self.review.pk).get_comment_count(), 4)
+
+    def test_review_comment_tree(self):
+        """ Assert that a conversation is returned in display order with reply counts """
+        actor = self.review.actor
+        first = Comment.objects.create(
+            comment_object=self.review, actor=actor, subject="1", body="1"
+        )
+        second = Comment.objects.create(
+            comment_object=self.review, actor=actor, subject="2", body="2"
+        )
+        reply = Comment.objects.create(
+            comment_object=self.review,
+            reply_to=first,
+            actor=actor,
+            subject="1.1",
+            body="1.1",
+        )
+        nested = Comment.objects.create(
+            comment_object=self.review,
+            reply_to=reply,
+            actor=actor,
+            subject="1.1.1",
+            body="1.1.1",
+        )
+
+        with self.assertNumQueries(1):
+            comments = list(
+                Comment.objects.conversation(self.review).with_reply_counts()
+            )
+        self.assertEqual(comments, [first, reply, nested, second])
+        self.assertEqual([c.reply_count for c in comments], [2, 1, 0, 0])
+        self.assertEqual([c.depth for c in comments], [0, 1, 2, 0])
+
+        roots = Comment.build_tree(comments)
+        self.assertEqual(roots, [first, second])
+        self.assertEqual(roots[0].get_replies(), [reply])
+        self.assertEqual(list(first.get_descendants()), [reply, nested])
+
+
+class ReviewCounterCacheTest(ReviewViewTestCase):
+    """ Test the counter cache fields """
+
+    def assertCounters(self, review_count, comment_count):
+        """ Compare the counters on the Item, Category and Team with the real counts """
+        item = Item.objects.get(pk=self.item.pk)
+        self.assertEqual(item.review_count, review_count)
+        self.assertEqual(item.review_count, item.reviews.count())
+        self.assertEqual(item.comment_count, comment_count)
+        self.assertEqual(item.comment_count, item.comments.count())
+        category = item.category
+        self.assertEqual(
+            category.review_count, Review.objects.filter(category=category).count()
+        )
+        self.assertEqual(
+            category.vote_count, Vote.objects.filter(category=category).count()
+        )
+        team = category.team
+        self.assertEqual(team.review_count, team.reviews.count())
+        self.assertEqual(team.vote_count, team.votes.count())
+        self.assertEqual(team.comment_count, Comment.objects.filter(team=team).count())
+
+    def test_review_counters(self):
+        """ Assert that the counters follow creates, deletes and cascades """
+        review_count = self.item.reviews.count()
+        self.assertCounters(review_count, 0)
+
+        Comment.objects.create(
+            comment_object=self.item, actor=self.review.actor, subject="1", body="1"
+        )
+        self.assertCounters(review_count, 1)
+
+        self.review.delete()
+        self.assertCounters(review_count - 1, 1)
+
+        # the Reviews and Comments of a deleted Item are deleted by a cascade
+        category = self.item.category
+        self.item.delete()
+        category.refresh_from_db()
+        self.assertEqual(
+            category.review_count, Review.objects.filter(category=category).count()
+        )
+        self.assertEqual(
+            category.comment_count, Comment.objects.filter(category=category).count()
+        )
+
+    def test_review_counters_stale_save(self):
+        """ Assert that saving an Item loaded before a new Review keeps the counter """
+        review_count = self.item.reviews.count()
+        item = Item.objects.get(pk=self.item.pk)
+        Review.objects.create(
+            item=self.item,
+            actor=self.review.actor,
+            context=self.review.context,
+            headline="stale",
+        )
+        item.name = "renamed"
+        item.save()
+        item.refresh_from_db()
+        self.assertEqual(item.name, "renamed")
+        self.assertEqual(item.review_count, review_count + 1)
+
+    def test_review_rebuild_counters(self):
+        """ Assert that rebuild_counters() fixes broken counters """
+        review_count = self.item.reviews.count()
+        Item.objects.update(review_count=0, comment_count=42)
+        Team.objects.update(review_count=0, vote_count=0)
+        rebuild_counters()
+        self.assertCounters(review_count, 0)
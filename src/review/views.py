@@ -178,16 +178,15 @@ class ReviewUpdateView(SRViewMixin, UpdateView):
         - TODO: Add tags field to the form
         """
         form = super().get_form(form_class)
+        # get the existing votes for this review in one query
+        votes = {vote.rating_id: vote for vote in self.object.votes.all()}
         for rating in self.item.category.ratings.all():
             # make a list of choices
             choices = []
             for choice in range(1, rating.max_rating + 1):
                 choices.append((choice, choice))
 
-            try:
-                vote = Vote.objects.get(review=self.get_object(), rating=rating)
-            except Vote.DoesNotExist:
-                vote = None
+            vote = votes.get(rating.pk)
 
             # add the TypedChoiceField
             form.fields["%s_vote" % rating.slug] = forms.TypedChoiceField(
@@ -227,36 +226,28 @@ class ReviewUpdateView(SRViewMixin, UpdateView):
         if form.has_changed():
             review = form.save()
 
+            # get the existing votes for this review in one query
+            votes = {vote.rating_id: vote for vote in review.votes.all()}
+
             # loop over ratings available for this item,
             # creating or updating a Vote for each as needed
             for rating in self.item.category.ratings.all():
                 votefield = "%s_vote" % rating.slug
                 commentfield = "%s_comment" % rating.slug
                 if votefield in form.fields and form.cleaned_data[votefield]:
-                    # does this vote already in database?
-                    if Vote.objects.filter(
-                        review=review,
-                        rating=rating,
-                        vote=form.cleaned_data[votefield],
-                        comment=form.cleaned_data[commentfield]
-                        if commentfield in form.cleaned_data
-                        else "",
-                    ).exists():
-                        # this vote already exists in the database, no need to save it again
-                        # TODO: when does this happen?
-                        continue
-
-                    # we either need to create a new Vote or update an existing
-                    vote, created = Vote.objects.update_or_create(
-                        review=review,
-                        rating=rating,
-                        defaults={
-                            "vote": form.cleaned_data[votefield],
-                            "comment": form.cleaned_data[commentfield]
-                            if commentfield in form.cleaned_data
-                            else "",
-                        },
-                    )
+                    value = form.cleaned_data[votefield]
+                    comment = form.cleaned_data.get(commentfield, "")
+                    vote = votes.get(rating.pk)
+                    if vote is None:
+                        # this is a new vote
+                        Vote.objects.create(
+                            review=review, rating=rating, vote=value, comment=comment
+                        )
+                    elif vote.vote != value or vote.comment != comment:
+                        # update the existing vote, unchanged votes are not saved again
+                        vote.vote = value
+                        vote.comment = comment
+                        vote.save()
 
         # all done
         messages.success(
@@ -60,8 +60,44 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "crum.CurrentRequestUserMiddleware",
+    "event.writer.EventBufferMiddleware",
 ]
 
+# write buffered audit log Events in a background thread instead of
+# at the end of each request, see event.writer
+EVENT_WRITER_BACKGROUND = False
+
+# the Event table is partitioned by month, see event.partitions. The
+# archive-events command creates partitions this many months ahead, and
+# archives partitions older than EVENT_RETENTION_MONTHS to gzipped csv
+# files in EVENT_ARCHIVE_DIR before dropping them. Set EVENT_ARCHIVE_DIR
+# to None to drop old partitions without archiving them.
+EVENT_PARTITION_MONTHS_AHEAD = 3
+EVENT_RETENTION_MONTHS = 24
+EVENT_ARCHIVE_DIR = os.path.join(BASE_DIR, "event_archive")
+
+# how AttachmentFileView serves files, see attachment.serving. Use
+# "attachment.serving.XAccelRedirectBackend" to let nginx do the transfer
+# from the internal location ATTACHMENT_ACCEL_REDIRECT_PREFIX (an alias
+# for MEDIA_ROOT), or "attachment.serving.XSendfileBackend" for X-Sendfile
+ATTACHMENT_FILE_BACKEND = "attachment.serving.DjangoFileBackend"
+ATTACHMENT_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
+# thumbnails of image Attachments are made in these sizes (the max width
+# and height in pixels) as JPEG and WebP, see attachment.thumbnails.
+# ?thumbnail=<size> picks a size, the default size is used for ?thumbnail
+ATTACHMENT_THUMBNAIL_SIZES = {"small": 150, "medium": 400, "large": 1024}
+ATTACHMENT_THUMBNAIL_DEFAULT_SIZE = "medium"
+ATTACHMENT_THUMBNAIL_MAX_AGE = 60 * 60 * 24 * 365
+ATTACHMENT_THUMBNAILS_ON_UPLOAD = True
+
+# the item map GeoJSON endpoint returns single Items when there are at
+# most ITEM_MAP_MAX_MARKERS in the requested bounds, otherwise it returns
+# clusters from a grid of ITEM_MAP_CLUSTER_GRID x ITEM_MAP_CLUSTER_GRID
+# cells per 256 pixel map tile at the requested zoom level
+ITEM_MAP_MAX_MARKERS = 500
+ITEM_MAP_CLUSTER_GRID = 4
+
 ROOT_URLCONF = "socialrating.urls"
 
 TEMPLATES = [
@@ -88,6 +124,7 @@ LOGIN_REDIRECT_URL = "/"
 AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
     "guardian.backends.ObjectPermissionBackend",
+    "utils.permissions.TeamPermissionBackend",
 )
 # ANONYMOUS_USER_NAME = "AnonymousUser"
 
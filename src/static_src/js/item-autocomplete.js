@@ -0,0 +1,55 @@
+// Autocomplete for the object Fact selects in the item form.
+// The select only contains the selected Item, a search field above it
+// fetches matching Items from the autocomplete view in pages of 20.
+document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("select[data-autocomplete-url]").forEach(function (select) {
+        var search = document.createElement("input");
+        search.type = "search";
+        search.className = "form-control mb-1";
+        search.placeholder = "Search...";
+        select.parentNode.insertBefore(search, select);
+
+        var more = document.createElement("button");
+        more.type = "button";
+        more.className = "btn btn-sm btn-link d-none";
+        more.textContent = "More results";
+        select.parentNode.insertBefore(more, select.nextSibling);
+
+        var page = 1;
+        var timer = null;
+
+        function load(append) {
+            var url = select.dataset.autocompleteUrl + "?q=" + encodeURIComponent(search.value) + "&page=" + page;
+            fetch(url, {credentials: "same-origin"}).then(function (response) {
+                return response.json();
+            }).then(function (data) {
+                if (!append) {
+                    // keep the empty choice and the selected Item
+                    Array.from(select.options).forEach(function (option) {
+                        if (option.value && !option.selected) {
+                            select.removeChild(option);
+                        }
+                    });
+                }
+                data.results.forEach(function (result) {
+                    if (!select.querySelector('option[value="' + result.id + '"]')) {
+                        select.appendChild(new Option(result.text, result.id));
+                    }
+                });
+                more.classList.toggle("d-none", !data.more);
+            });
+        }
+
+        search.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                page = 1;
+                load(false);
+            }, 300);
+        });
+        more.addEventListener("click", function () {
+            page += 1;
+            load(true);
+        });
+    });
+});
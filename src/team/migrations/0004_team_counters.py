@@ -0,0 +1,68 @@
+# Generated by Django 2.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_team_counters(apps, schema_editor):
+    populate_counters(
+        apps,
+        "team",
+        "team",
+        [
+            ("attachment_count", "attachment.Attachment", "team"),
+            ("comment_count", "comment.Comment", "team"),
+            ("review_count", "review.Review", "team"),
+            ("vote_count", "vote.Vote", "team"),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team", "0003_auto_20191213_0944"),
+        ("review", "0004_review_team_category"),
+        ("vote", "0004_vote_team_category"),
+        ("comment", "0005_comment_team_category"),
+        ("attachment", "0004_attachment_team_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="attachment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Attachments in this Team.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments in this Team.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Reviews in this Team.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="vote_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="The number of Votes in this Team."
+            ),
+        ),
+        migrations.RunPython(populate_team_counters, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,11 @@
 import logging
 
 from django.db import models
-from django.urls import reverse_lazy
 from django.contrib.auth.models import Group
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 from actor.models import Actor
+from utils.permissions import bulk_assign_perms
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 
@@ -60,6 +59,22 @@ class Team(UUIDBaseModel):
         help_text="The current members of this Team",
     )
 
+    review_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Reviews in this Team."
+    )
+
+    vote_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Votes in this Team."
+    )
+
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Comments in this Team."
+    )
+
+    attachment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Attachments in this Team."
+    )
+
     breadcrumb_list_name = "Teams"
 
     def __str__(self):
@@ -71,10 +86,8 @@ class Team(UUIDBaseModel):
 
     object_url_namespace = "team"
 
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
+    def get_team_and_category_ids(self):
+        return self.pk, None
 
     def grant_permissions(self):
         """
@@ -84,11 +97,16 @@ class Team(UUIDBaseModel):
         - Admins may create a new Category
         - Admins may create a new Context
         """
-        assign_perm("team.view_team", self.group, self)
-        assign_perm("team.change_team", self.admingroup, self)
-        assign_perm("team.delete_team", self.admingroup, self)
-        assign_perm("team.add_category", self.admingroup, self)
-        assign_perm("team.add_context", self.admingroup, self)
+        bulk_assign_perms(
+            self,
+            [
+                ("team.view_team", self.group),
+                ("team.change_team", self.admingroup),
+                ("team.delete_team", self.admingroup),
+                ("team.add_category", self.admingroup),
+                ("team.add_context", self.admingroup),
+            ],
+        )
 
     def create_django_groups(self):
         # create group
@@ -141,7 +159,7 @@ class Team(UUIDBaseModel):
         """
         from review.models import Review
 
-        return Review.objects.filter(item__category__team=self)
+        return Review.objects.filter(team=self)
 
     @property
     def attachments(self):
@@ -150,7 +168,7 @@ class Team(UUIDBaseModel):
         """
         from attachment.models import Attachment
 
-        return Attachment.objects.filter(review__item__category__team=self)
+        return Attachment.objects.filter(team=self)
 
     @property
     def facts(self):
@@ -177,7 +195,7 @@ class Team(UUIDBaseModel):
         """
         from vote.models import Vote
 
-        return Vote.objects.filter(rating__category__team=self)
+        return Vote.objects.filter(team=self)
 
 
 class Membership(UUIDBaseModel):
@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth.models import Group
+from guardian.models import GroupObjectPermission
 
 from actor.factories import UserFactory
 from team.models import Team, Membership
@@ -153,6 +154,24 @@ class TeamCreateViewTest(TeamViewTestCase):
         self.assertTrue(self.team3.group in self.team3.founder.user.groups.all())
         self.assertTrue(self.team3.admingroup in self.team3.founder.user.groups.all())
 
+    def test_team_permissions(self):
+        """ Assert that Team permissions are granted on create and not again on update """
+        perms = GroupObjectPermission.objects.filter(object_pk=str(self.team1.pk))
+        self.assertEqual(
+            set(perms.values_list("group", "permission__codename")),
+            {
+                (self.team1.group.pk, "view_team"),
+                (self.team1.admingroup.pk, "change_team"),
+                (self.team1.admingroup.pk, "delete_team"),
+                (self.team1.admingroup.pk, "add_category"),
+                (self.team1.admingroup.pk, "add_context"),
+            },
+        )
+        before = set(perms.values_list("pk", flat=True))
+        self.team1.description = "An updated test team 1"
+        self.team1.save()
+        self.assertEqual(set(perms.values_list("pk", flat=True)), before)
+
 
 class TeamDetailViewTest(TeamViewTestCase):
     """ Test TeamDetailView """
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.8 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+from utils.counters import populate_counters
+
+
+def populate_thread_counters(apps, schema_editor):
+    populate_counters(
+        apps, "thread", "thread", [("comment_count", "comment.Comment", None),],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("thread", "0003_auto_20191213_0944"),
+        ("comment", "0005_comment_team_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="thread",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of Comments in this Thread.",
+            ),
+        ),
+        migrations.RunPython(populate_thread_counters, migrations.RunPython.noop),
+    ]
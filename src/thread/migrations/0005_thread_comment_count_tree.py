@@ -0,0 +1,27 @@
+# Generated by Django 2.2.8 on 2026-10-18 16:00
+
+from django.db import migrations
+
+from utils.counters import populate_counters
+
+
+def populate_thread_counters(apps, schema_editor):
+    """
+    comment_count now counts all Comments in the Thread, including
+    Comments on Comments, using the denormalized thread field
+    """
+    populate_counters(
+        apps, "thread", "thread", [("comment_count", "comment.Comment", "thread")]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("thread", "0004_thread_comment_count"),
+        ("comment", "0006_comment_forum_thread"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_thread_counters, migrations.RunPython.noop)
+    ]
@@ -1,6 +1,4 @@
 from django.db import models
-from django.urls import reverse_lazy
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 
@@ -42,9 +40,28 @@ class Thread(UUIDBaseModel):
         help_text="Check to lock this Thread to prevent new Comments from being posted to it.",
     )
 
+    comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of Comments in this Thread."
+    )
+
     filterfield = "forum"
     filtervalue = "forum"
     breadcrumb_list_name = "Threads"
+    owner_field = "actor"
+    team_field = "forum__team"
+
+    # keep the thread_count on the Forum up to date
+    counter_caches = [("forum", "thread_count")]
+
+    # - All team members may view a Thread
+    # - Admins and OP may update and delete a Thread
+    # - All team members may create new Comments in the Thread
+    team_permissions = {
+        "view_thread": ["member"],
+        "change_thread": ["owner", "admin"],
+        "delete_thread": ["owner", "admin"],
+        "add_comment": ["member"],
+    }
     slug_field = "subject"
 
     def __str__(self):
@@ -63,34 +80,35 @@ class Thread(UUIDBaseModel):
         }
 
     object_url_namespace = "team:forum:thread"
-
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
-        )
-
-    def grant_permissions(self):
-        """
-        - All team members may view a Thread
-        - Admins and OP may update a Thread
-        - Admins and OP may delete a Thread
-        - All team members may create new Comments in the Thread
-        """
-        assign_perm("thread.view_thread", self.team.group, self)
-        assign_perm("thread.change_thread", self.team.admingroup, self)
-        assign_perm("thread.change_thread", self.actor.user, self)
-        assign_perm("thread.delete_thread", self.team.admingroup, self)
-        assign_perm("thread.delete_thread", self.actor.user, self)
-        assign_perm("thread.add_comment", self.team.group, self)
+    url_select_related = "forum__team"
 
     def save(self, **kwargs):
         """
-        Set slug, save the Thread, and grant permissions.
+        Set slug and save the Thread.
         """
         self.slug = self.get_slug(prefix=str(self.created.isoformat())[0:10] + "-")
         super().save(**kwargs)
-        self.grant_permissions()
 
     @property
     def team(self):
         return self.forum.team
+
+    @classmethod
+    def add_latest_comments(cls, threads):
+        """
+        Set latest_comment on each Thread in a list with one query,
+        for list pages. Returns the list.
+        """
+        from comment.models import Comment
+
+        threads = list(threads)
+        comments = (
+            Comment.objects.filter(thread__in=threads)
+            .order_by("thread", "-created")
+            .distinct("thread")
+            .select_related("actor__user")
+        )
+        latest = {comment.thread_id: comment for comment in comments}
+        for thread in threads:
+            thread.latest_comment = latest.get(thread.pk)
+        return threads
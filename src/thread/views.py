@@ -5,7 +5,6 @@ from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.detail import DetailView
 from django.contrib import messages
 from django.shortcuts import redirect, reverse
-from guardian.mixins import PermissionListMixin
 
 from utils.mixins import SRViewMixin
 
@@ -14,12 +13,25 @@ from .models import Thread
 logger = logging.getLogger("socialrating.%s" % __name__)
 
 
-class ThreadListView(SRViewMixin, PermissionListMixin, ListView):
+class ThreadListView(SRViewMixin, ListView):
     model = Thread
     paginate_by = 100
     template_name = "thread_list.html"
     permission_required = "thread.view_thread"
 
+    def get_context_data(self, **kwargs):
+        """
+        Add the latest Comment and the attachment counts for the Threads on
+        this page. The comment counts are counter cache fields on the Thread.
+        """
+        context = super().get_context_data(**kwargs)
+        threads = Thread.add_latest_comments(context["thread_list"])
+        attachment_counts = Thread.get_attachment_counts(threads)
+        for thread in threads:
+            thread.tree_attachment_count = attachment_counts[thread.uuid]
+        context["thread_list"] = threads
+        return context
+
 
 class ThreadCreateView(SRViewMixin, CreateView):
     model = Thread
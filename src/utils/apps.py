@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class UtilsConfig(AppConfig):
     name = "utils"
+
+    def ready(self):
+        from .counters import connect_counter_signals
+
+        connect_counter_signals()
@@ -0,0 +1,209 @@
+"""
+Counter cache fields.
+
+Models which are counted declare a counter_caches list of
+(relation, counter field) tuples, where relation is the name of a
+ForeignKey or GenericForeignKey on the model. When an object is created
+the counter field on each related object is incremented, and when it is
+deleted (also by a cascade) it is decremented. Related models without the
+counter field are skipped, so a GFK only updates counters on the models
+which have one.
+
+The updates are single UPDATE ... SET counter = counter + 1 queries made in
+the same transaction as the INSERT or DELETE. The counter fields are left
+out when an existing object is saved (see UUIDBaseModel.save()), so saving
+an object loaded before an increment doesn't write the old count back. The
+rebuild-counters management command recalculates all counters from scratch.
+"""
+import functools
+import logging
+
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+def has_counter(model, counter):
+    """
+    Return True if the model has the counter field
+    """
+    try:
+        model._meta.get_field(counter)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def get_counter_relations(model):
+    """
+    Return a list of (relation field, target models, counter field) tuples
+    for the counter caches declared on the model. The targets of a GFK are
+    all models with the counter field, except the ones counted by a
+    ForeignKey already, so nothing is counted twice. Cached per model.
+    """
+    relations = []
+    fk_targets = set()
+    for relation, counter in getattr(model, "counter_caches", []):
+        field = model._meta.get_field(relation)
+        if not isinstance(field, GenericForeignKey):
+            relations.append((field, [field.related_model], counter))
+            fk_targets.add((field.related_model, counter))
+    for relation, counter in getattr(model, "counter_caches", []):
+        field = model._meta.get_field(relation)
+        if isinstance(field, GenericForeignKey):
+            targets = [
+                target
+                for target in apps.get_models()
+                if has_counter(target, counter) and (target, counter) not in fk_targets
+            ]
+            relations.append((field, targets, counter))
+    return relations
+
+
+def get_counter_targets(obj):
+    """
+    Return a list of (model, pk, counter field) tuples
+    for the counter caches this object counts towards
+    """
+    targets = []
+    for field, target_models, counter in get_counter_relations(type(obj)):
+        if isinstance(field, GenericForeignKey):
+            content_type_id = getattr(obj, obj._meta.get_field(field.ct_field).attname)
+            if content_type_id is None:
+                continue
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            pk = getattr(obj, field.fk_field)
+        else:
+            model = field.related_model
+            pk = getattr(obj, field.attname)
+        if pk is None or model not in target_models:
+            continue
+        targets.append((model, pk, counter))
+    return targets
+
+
+def update_counters(obj, delta):
+    """
+    Add delta to the counter cache fields this object counts towards
+    """
+    targets = get_counter_targets(obj)
+    if not targets:
+        return
+    with transaction.atomic():
+        for model, pk, counter in targets:
+            model.objects.filter(pk=pk).update(**{counter: models.F(counter) + delta})
+
+
+def decrement_counters(sender, instance, **kwargs):
+    """
+    post_delete receiver, runs inside the transaction of the delete,
+    also for objects deleted by a cascade
+    """
+    update_counters(instance, -1)
+
+
+def connect_counter_signals():
+    """
+    Connect the post_delete receiver for all models with counter caches.
+    Called from UtilsConfig.ready()
+    """
+    for model in apps.get_models():
+        if getattr(model, "counter_caches", None):
+            post_delete.connect(
+                decrement_counters,
+                sender=model,
+                dispatch_uid="decrement_counters_%s" % model._meta.label_lower,
+            )
+
+
+def get_counter_sources():
+    """
+    Return a list of (counted model, relation field, target model, counter field)
+    tuples for all counter caches in the project
+    """
+    sources = []
+    for model in apps.get_models():
+        for field, targets, counter in get_counter_relations(model):
+            for target in targets:
+                sources.append((model, field, target, counter))
+    return sources
+
+
+@functools.lru_cache(maxsize=None)
+def get_counter_fields(model):
+    """
+    Return a frozenset of the names of the counter cache fields on the model
+    which are kept up to date by other models. Cached per model.
+    """
+    return frozenset(
+        counter for _, _, target, counter in get_counter_sources() if target is model
+    )
+
+
+def rebuild_counters():
+    """
+    Recalculate all counter cache fields with one UPDATE per counter.
+    Returns a list of (target model, counter field, updated rows) tuples.
+    """
+    from .models import count_subquery
+
+    result = []
+    for model, field, target, counter in get_counter_sources():
+        if isinstance(field, GenericForeignKey):
+            queryset = model.objects.filter(
+                **{
+                    field.ct_field: ContentType.objects.get_for_model(target),
+                    field.fk_field: models.OuterRef("pk"),
+                }
+            )
+            group = field.fk_field
+        else:
+            queryset = model.objects.filter(**{field.name: models.OuterRef("pk")})
+            group = field.name
+        with transaction.atomic():
+            updated = target.objects.update(
+                **{counter: count_subquery(queryset, group)}
+            )
+        logger.debug("rebuilt %s.%s for %s rows" % (target.__name__, counter, updated))
+        result.append((target, counter, updated))
+    return result
+
+
+def populate_counters(apps, app_label, model_name, counters):
+    """
+    Set counter cache fields on all objects of a model in a data migration.
+    counters is a list of (counter field, counted model label, relation)
+    tuples, where relation is the name of a ForeignKey on the counted model,
+    or None to count a GFK with content_type and object_id fields.
+    """
+    from .models import count_subquery
+
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Model = apps.get_model(app_label, model_name)
+    content_type = ContentType.objects.filter(
+        app_label=app_label, model=model_name
+    ).first()
+    for counter, counted_label, relation in counters:
+        Counted = apps.get_model(counted_label)
+        if relation:
+            queryset = Counted.objects.filter(**{relation: models.OuterRef("pk")})
+        elif content_type:
+            object_id = models.OuterRef("pk")
+            if not isinstance(Counted._meta.get_field("object_id"), models.UUIDField):
+                # before the object_id fields were converted to uuid
+                object_id = Cast(object_id, models.CharField())
+            queryset = Counted.objects.filter(
+                content_type=content_type, object_id=object_id
+            )
+            relation = "object_id"
+        else:
+            # no content type means nothing can point to the model yet
+            continue
+        Model.objects.update(**{counter: count_subquery(queryset, relation)})
@@ -0,0 +1,66 @@
+"""
+Helpers for the migrations which add the denormalized team and category
+fields to Reviews, Votes, Comments, Attachments and Events.
+"""
+
+# how to find the Team and Category ids for the objects a GFK can point to,
+# as "app_label.model": (team lookup, category lookup)
+TEAM_AND_CATEGORY_LOOKUPS = {
+    "team.team": ("pk", None),
+    "team.membership": ("team", None),
+    "context.context": ("team", None),
+    "forum.forum": ("team", None),
+    "thread.thread": ("forum__team", None),
+    "category.category": ("team", "pk"),
+    "fact.fact": ("category__team", "category"),
+    "rating.rating": ("category__team", "category"),
+    "item.item": ("category__team", "category"),
+    "review.review": ("team", "category"),
+    "vote.vote": ("team", "category"),
+    "comment.comment": ("team", "category"),
+    "attachment.attachment": ("team", "category"),
+}
+
+
+def populate_gfk_team_and_category(apps, app_label, model_name):
+    """
+    Set team and category on all objects of the GFK model from the objects
+    they point to. Objects pointing to other objects of the same model (like
+    comments on comments) are done level by level until nothing changes.
+    """
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Model = apps.get_model(app_label, model_name)
+    own_ct = ContentType.objects.filter(app_label=app_label, model=model_name).first()
+
+    while True:
+        updated = 0
+        rows = Model.objects.filter(team__isnull=True)
+        for ct_id in set(rows.values_list("content_type_id", flat=True)):
+            ct = ContentType.objects.get(pk=ct_id)
+            label = "%s.%s" % (ct.app_label, ct.model)
+            if label not in TEAM_AND_CATEGORY_LOOKUPS:
+                continue
+            team_lookup, category_lookup = TEAM_AND_CATEGORY_LOOKUPS[label]
+            object_ids = set(
+                rows.filter(content_type_id=ct_id).values_list("object_id", flat=True)
+            )
+            targets = apps.get_model(ct.app_label, ct.model).objects.filter(
+                pk__in=object_ids
+            )
+            if own_ct and ct_id == own_ct.pk:
+                # only objects which have been done already
+                targets = targets.filter(team__isnull=False)
+            # group the object ids by team and category so we can update in bulk
+            groups = {}
+            for values in targets.values_list(
+                "pk", team_lookup, category_lookup or team_lookup
+            ):
+                key = (values[1], values[2] if category_lookup else None)
+                groups.setdefault(key, []).append(str(values[0]))
+            groups.pop((None, None), None)
+            for (team_id, category_id), pks in groups.items():
+                updated += rows.filter(content_type_id=ct_id, object_id__in=pks).update(
+                    team_id=team_id, category_id=category_id
+                )
+        if not updated:
+            return
@@ -0,0 +1,95 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from event.models import Event
+from event.partitions import (
+    add_months,
+    archive_partition,
+    archive_rows_before,
+    create_partitions,
+    get_partitions,
+    is_partitioned,
+    month_start,
+)
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+class Command(BaseCommand):
+    args = "none"
+    help = "Create Event partitions for the coming months, and archive and drop Events older than the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.EVENT_RETENTION_MONTHS,
+            help="Keep Events for this many months (default %s)"
+            % settings.EVENT_RETENTION_MONTHS,
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=settings.EVENT_ARCHIVE_DIR,
+            help="Write archived Events to gzipped csv files in this directory (default %s)"
+            % settings.EVENT_ARCHIVE_DIR,
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Drop old Events without archiving them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show what would be archived, don't change anything",
+        )
+
+    def handle(self, *args, **options):
+        table = Event._meta.db_table
+        this_month = month_start(timezone.now())
+        cutoff = add_months(this_month, -options["retention_months"])
+        archive_dir = None if options["no_archive"] else options["archive_dir"]
+        if archive_dir and not options["dry_run"]:
+            os.makedirs(archive_dir, exist_ok=True)
+
+        with connection.cursor() as cursor:
+            partitioned = is_partitioned(cursor, table)
+            if partitioned and not options["dry_run"]:
+                with transaction.atomic():
+                    created = create_partitions(
+                        cursor,
+                        table,
+                        this_month,
+                        add_months(this_month, settings.EVENT_PARTITION_MONTHS_AHEAD),
+                    )
+                logger.info("Created %s new Event partitions" % created)
+
+            # drop the whole monthly partitions before the cutoff
+            old_partitions = [
+                name
+                for month, name in get_partitions(cursor, table)
+                if add_months(month, 1) <= cutoff
+            ]
+            for name in old_partitions:
+                if options["dry_run"]:
+                    logger.info("Would archive and drop partition %s" % name)
+                    continue
+                with transaction.atomic():
+                    path = archive_partition(cursor, table, name, archive_dir)
+                logger.info("Archived partition %s to %s" % (name, path))
+
+            # and any old Events outside the monthly partitions
+            if not options["dry_run"]:
+                with transaction.atomic():
+                    deleted = archive_rows_before(cursor, table, cutoff, archive_dir)
+                logger.info("Archived %s Events from before %s" % (deleted, cutoff))
+        if not partitioned:
+            logger.warning(
+                "The %s table is not partitioned, old Events were deleted row by row"
+                % table
+            )
@@ -0,0 +1,35 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from attachment.models import Attachment
+from attachment.thumbnails import (
+    THUMBNAIL_ERRORS,
+    THUMBNAIL_MIMETYPES,
+    generate_thumbnails,
+)
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+class Command(BaseCommand):
+    args = "none"
+    help = "Make the missing thumbnails for all image Attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Make all thumbnails again, also the ones which already exist",
+        )
+
+    def handle(self, *args, **options):
+        attachments = Attachment.objects.filter(mimetype__in=THUMBNAIL_MIMETYPES)
+        made = failed = 0
+        for attachment in attachments.iterator():
+            try:
+                made += len(generate_thumbnails(attachment, overwrite=options["force"]))
+            except THUMBNAIL_ERRORS:
+                logger.exception("Unable to make thumbnails for %s" % attachment)
+                failed += 1
+        logger.info("Made %s thumbnails, %s Attachments failed" % (made, failed))
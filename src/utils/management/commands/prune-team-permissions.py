@@ -0,0 +1,125 @@
+import logging
+
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+class Command(BaseCommand):
+    args = "none"
+    help = "Delete guardian object permissions which are already granted by team membership or ownership rules"
+
+    batch_size = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the redundant permissions, don't delete them",
+        )
+
+    def handle(self, *args, **options):
+        team_groups = Group.objects.filter(
+            Q(team__isnull=False) | Q(adminteam__isnull=False)
+        )
+        for model in apps.get_models():
+            rules = getattr(model, "team_permissions", None)
+            if not rules:
+                continue
+            content_type = ContentType.objects.get_for_model(model)
+
+            # group permissions for the member and admin groups of the team
+            # the object belongs to are covered by the member/admin rules,
+            # grants to the groups of other teams are kept
+            group_perms = GroupObjectPermission.objects.filter(
+                content_type=content_type,
+                group__in=team_groups,
+                permission__codename__in=[
+                    codename
+                    for codename, roles in rules.items()
+                    if {"member", "admin"} & set(roles)
+                ],
+            ).values_list("pk", "object_pk", "group_id", "permission__codename")
+            count = 0
+            batch = []
+            for row in group_perms.iterator():
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    count += self.prune_group_batch(
+                        model, rules, batch, options["dry_run"]
+                    )
+                    batch = []
+            if batch:
+                count += self.prune_group_batch(model, rules, batch, options["dry_run"])
+            logger.info("%s: %s redundant group permissions" % (model.__name__, count))
+
+            # user permissions for the owner are covered by the owner rules
+            owner_codenames = [
+                codename for codename, roles in rules.items() if "owner" in roles
+            ]
+            if not owner_codenames or not hasattr(model, "owner_field"):
+                continue
+            user_perms = UserObjectPermission.objects.filter(
+                content_type=content_type, permission__codename__in=owner_codenames
+            ).values_list("pk", "object_pk", "user_id")
+            count = 0
+            batch = []
+            for row in user_perms.iterator():
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    count += self.prune_owner_batch(model, batch, options["dry_run"])
+                    batch = []
+            if batch:
+                count += self.prune_owner_batch(model, batch, options["dry_run"])
+            logger.info("%s: %s redundant owner permissions" % (model.__name__, count))
+
+    def prune_group_batch(self, model, rules, batch, dry_run):
+        """
+        Delete the group permissions in the batch which belong to the member
+        group (for codenames with a member rule) or the admin group (for
+        codenames with an admin rule) of the team of the object, return the
+        number of permissions found.
+        """
+        team_field = getattr(model, "team_field", "team")
+        team_groups = {
+            str(pk): (group_id, admingroup_id)
+            for pk, group_id, admingroup_id in model.objects.filter(
+                pk__in=[object_pk for _, object_pk, _, _ in batch]
+            ).values_list("pk", team_field + "__group", team_field + "__admingroup")
+        }
+        redundant = []
+        for pk, object_pk, group_id, codename in batch:
+            if object_pk not in team_groups:
+                continue
+            member_group_id, admin_group_id = team_groups[object_pk]
+            roles = rules[codename]
+            if ("member" in roles and group_id == member_group_id) or (
+                "admin" in roles and group_id == admin_group_id
+            ):
+                redundant.append(pk)
+        if not dry_run:
+            GroupObjectPermission.objects.filter(pk__in=redundant).delete()
+        return len(redundant)
+
+    def prune_owner_batch(self, model, batch, dry_run):
+        """
+        Delete the user permissions in the batch which belong to the owner
+        of the object, return the number of permissions found.
+        """
+        owners = set(
+            (str(pk), user_id)
+            for pk, user_id in model.objects.filter(
+                pk__in=[object_pk for _, object_pk, _ in batch]
+            ).values_list("pk", model.owner_field + "__user")
+        )
+        redundant = [
+            pk for pk, object_pk, user_id in batch if (object_pk, user_id) in owners
+        ]
+        if not dry_run:
+            UserObjectPermission.objects.filter(pk__in=redundant).delete()
+        return len(redundant)
@@ -0,0 +1,18 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from utils.counters import rebuild_counters
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+class Command(BaseCommand):
+    args = "none"
+    help = "Recalculate all counter cache fields (review_count, comment_count etc.) from scratch"
+
+    def handle(self, *args, **options):
+        for model, counter, updated in rebuild_counters():
+            logger.info(
+                "%s.%s: rebuilt for %s objects" % (model.__name__, counter, updated)
+            )
@@ -1,12 +1,12 @@
 import logging
 
 import django.views.generic
-from django.shortcuts import get_object_or_404, reverse
+from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
-from guardian.core import ObjectPermissionChecker
 from guardian.mixins import PermissionRequiredMixin
+from guardian.shortcuts import get_objects_for_user
 
 from team.models import Team
 from category.models import Category
@@ -21,6 +21,12 @@ from vote.models import Vote
 from comment.models import Comment
 from event.models import Event
 from attachment.models import Attachment
+from .permissions import (
+    TeamPermissionChecker,
+    get_permission_related,
+    get_team_role_perms,
+)
+from .urlcache import cached_reverse
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 
@@ -31,230 +37,123 @@ class SlugObjectsMixin:
     Also adds breadcrumbs based on the objects we have and the view we are in.
     """
 
+    # the objects we can find from url kwargs, in hierarchy order, as
+    # name: (model, url kwarg, lookup field, name of the parent object).
+    # The name is also the name of the FK field to the object on its child.
+    url_objects = {
+        "team": (Team, "team_slug", "slug", None),
+        "context": (Context, "context_slug", "slug", "team"),
+        "category": (Category, "category_slug", "slug", "team"),
+        "fact": (Fact, "fact_slug", "slug", "category"),
+        "rating": (Rating, "rating_slug", "slug", "category"),
+        "item": (Item, "item_slug", "slug", "category"),
+        "review": (Review, "review_uuid", "uuid", "item"),
+        "vote": (Vote, "vote_uuid", "uuid", "review"),
+        "forum": (Forum, "forum_slug", "slug", "team"),
+        "thread": (Thread, "thread_slug", "slug", "forum"),
+    }
+
+    # GFK objects outside the normal hierarchy, as
+    # name: (model, url kwarg, name of the GFK field)
+    url_gfk_objects = {
+        "comment": (Comment, "comment_uuid", "comment_object"),
+        "attachment": (Attachment, "attachment_uuid", "attachment_object"),
+        "event": (Event, "event_uuid", "event_object"),
+    }
+
+    def get_url_objects(self, kwargs):
+        """
+        Find the objects in the url hierarchy with one query per branch
+        (like team/category/item/review/vote or team/forum/thread), getting
+        the parent objects with select_related(). Returns a dict of
+        objects in hierarchy order.
+        """
+        names = [
+            name
+            for name, (_, kwarg, _, _) in self.url_objects.items()
+            if kwarg in kwargs
+        ]
+        parents = {self.url_objects[name][3] for name in names}
+        found = {}
+        # query the deepest object of each branch
+        for leaf in [name for name in names if name not in parents]:
+            # the path from the leaf up to the team
+            path = [leaf]
+            while self.url_objects[path[-1]][3]:
+                path.append(self.url_objects[path[-1]][3])
+            filters = {}
+            for i, name in enumerate(path):
+                _, kwarg, lookup, _ = self.url_objects[name]
+                filters["__".join(path[1 : i + 1] + [lookup])] = kwargs[kwarg]
+            queryset = self.url_objects[leaf][0].objects.all()
+            if len(path) > 1:
+                queryset = queryset.select_related("__".join(path[1:]))
+            obj = get_object_or_404(queryset, **filters)
+            # walk up the FKs to find the parent objects
+            for i, name in enumerate(path):
+                found.setdefault(name, obj)
+                if i < len(path) - 1:
+                    obj = getattr(obj, path[i + 1])
+        return {name: found[name] for name in names}
+
+    def get_url_gfk_objects(self, kwargs, gfk_object):
+        """
+        Find the GFK objects (comment, attachment, event) from the url kwargs,
+        each one belongs to the object before it. Returns a dict of objects.
+        """
+        found = {}
+        for name, (model, kwarg, gfk_field) in self.url_gfk_objects.items():
+            if kwarg not in kwargs:
+                continue
+            obj = get_object_or_404(
+                model,
+                uuid=kwargs[kwarg],
+                object_id=gfk_object.pk,
+                content_type=ContentType.objects.get_for_model(gfk_object),
+            )
+            # we already have the GFK object, no need to look it up again
+            setattr(obj, gfk_field, gfk_object)
+            found[name] = obj
+            gfk_object = obj
+        return found
+
     def setup(self, *args, **kwargs):
         # super setup() so we have self.request available
         super().setup(*args, **kwargs)
 
         # add a checker we can use to cache permissions for objects
-        self.checker = ObjectPermissionChecker(self.request.user)
+        self.checker = TeamPermissionChecker(self.request.user)
 
         # start out with an almost empty context_data dict
         self.context_data = {"checker": self.checker}
 
         # do we have a team?
         if "team_slug" in kwargs:
-            self.team = get_object_or_404(Team, slug=kwargs["team_slug"])
-            self.checker.prefetch_perms([self.team])
-            if not self.checker.has_perm("team.view_team", self.team):
-                raise PermissionDenied
-            self.url_namespace_prefixes = ["team"]
-            self.add_breadcrumbs(self.team)
-            self.url_kwargs = {"team_slug": self.team.slug}
-            self.object_kwargs = {"team": self.team}
-            self.context_data["team"] = self.team
-            self.context_data["team_perms"] = self.checker.get_perms(self.team)
-            self.gfk_object = self.team
-
-            # do we have a context?
-            if "context_slug" in kwargs:
-                self.context = get_object_or_404(
-                    Context, team=self.team, slug=self.kwargs["context_slug"]
-                )
-                self.checker.prefetch_perms([self.context])
-                if not self.checker.has_perm("context.view_context", self.context):
-                    raise PermissionDenied
-                self.url_namespace_prefixes.append("context")
-                self.add_breadcrumbs(self.context)
-                self.url_kwargs["context_slug"] = self.context.slug
-                self.context_data["context"] = self.context
-                self.context_data["context_perms"] = self.checker.get_perms(
-                    self.context
-                )
-                self.gfk_object = self.context
+            objects = self.get_url_objects(kwargs)
+            objects.update(self.get_url_gfk_objects(kwargs, list(objects.values())[-1]))
 
-            # do we have a category?
-            if "category_slug" in kwargs:
-                self.category = get_object_or_404(
-                    Category, team=self.team, slug=self.kwargs["category_slug"]
-                )
-                self.checker.prefetch_perms([self.category])
-                if not self.checker.has_perm("category.view_category", self.category):
-                    raise PermissionDenied
-                self.url_namespace_prefixes.append("category")
-                self.add_breadcrumbs(self.category)
-                self.url_kwargs["category_slug"] = self.category.slug
-                self.context_data["category"] = self.category
-                self.context_data["category_perms"] = self.checker.get_perms(
-                    self.category
-                )
-                self.gfk_object = self.category
-
-                # do we have a fact?
-                if "fact_slug" in kwargs:
-                    self.fact = get_object_or_404(
-                        Fact, category=self.category, slug=self.kwargs["fact_slug"]
-                    )
-                    self.checker.prefetch_perms([self.fact])
-                    if not self.checker.has_perm("fact.view_fact", self.fact):
-                        raise PermissionDenied
-                    self.url_namespace_prefixes.append("fact")
-                    self.add_breadcrumbs(self.fact)
-                    self.context_data["fact"] = self.fact
-                    self.context_data["fact_perms"] = self.checker.get_perms(self.fact)
-                    self.gfk_object = self.fact
-
-                # do we have a rating?
-                elif "rating_slug" in kwargs:
-                    self.rating = get_object_or_404(
-                        Rating, category=self.category, slug=self.kwargs["rating_slug"]
-                    )
-                    self.checker.prefetch_perms([self.rating])
-                    if not self.checker.has_perm("rating.view_rating", self.rating):
-                        raise PermissionDenied
-                    self.url_namespace_prefixes.append("rating")
-                    self.add_breadcrumbs(self.rating)
-                    self.context_data["rating"] = self.rating
-                    self.context_data["rating_perms"] = self.checker.get_perms(
-                        self.rating
-                    )
-                    self.gfk_object = self.rating
-
-                # do we have an item?
-                elif "item_slug" in kwargs:
-                    self.item = get_object_or_404(
-                        Item, category=self.category, slug=self.kwargs["item_slug"]
-                    )
-                    self.checker.prefetch_perms([self.item])
-                    if not self.checker.has_perm("item.view_item", self.item):
-                        raise PermissionDenied
-                    self.url_namespace_prefixes.append("item")
-                    self.add_breadcrumbs(self.item)
-                    self.url_kwargs["item_slug"] = self.item.slug
-                    self.context_data["item"] = self.item
-                    self.context_data["item_perms"] = self.checker.get_perms(self.item)
-                    self.gfk_object = self.item
-
-                    # do we have a review?
-                    if "review_uuid" in kwargs:
-                        self.review = get_object_or_404(
-                            Review, item=self.item, uuid=self.kwargs["review_uuid"]
-                        )
-                        self.checker.prefetch_perms([self.review])
-                        if not self.checker.has_perm("review.view_review", self.review):
-                            raise PermissionDenied
-                        self.url_namespace_prefixes.append("review")
-                        self.add_breadcrumbs(self.review)
-                        self.url_kwargs["review_uuid"] = self.review.uuid
-                        self.context_data["review"] = self.review
-                        self.context_data["review_perms"] = self.checker.get_perms(
-                            self.review
-                        )
-                        self.gfk_object = self.review
-
-                        # do we have a vote?
-                        if "vote_uuid" in kwargs:
-                            # get the vote
-                            self.vote = get_object_or_404(
-                                Vote, review=self.review, uuid=self.kwargs["vote_uuid"]
-                            )
-                            self.checker.prefetch_perms([self.vote])
-                            if not self.checker.has_perm("vote.view_vote", self.vote):
-                                raise PermissionDenied
-                            self.url_namespace_prefixes.append("vote")
-                            self.add_breadcrumbs(self.vote)
-                            self.url_kwargs["vote_uuid"] = self.vote.uuid
-                            self.context_data["vote"] = self.vote
-                            self.context_data["vote_perms"] = self.checker.get_perms(
-                                self.vote
-                            )
-                            self.gfk_object = self.vote
-
-            # do we have a forum?
-            if "forum_slug" in kwargs:
-                self.forum = get_object_or_404(
-                    Forum, team=self.team, slug=self.kwargs["forum_slug"]
-                )
-                self.checker.prefetch_perms([self.forum])
-                if not self.checker.has_perm("forum.view_forum", self.forum):
+            # get permissions for all the objects at once
+            self.checker.prefetch_mixed_perms(objects.values())
+
+            self.object_kwargs = {"team": objects["team"]}
+            for name, obj in objects.items():
+                if not self.checker.has_perm(
+                    "%s.view_%s" % (obj._meta.app_label, obj._meta.model_name), obj
+                ):
                     raise PermissionDenied
-                self.url_namespace_prefixes.append("forum")
-                self.add_breadcrumbs(self.forum)
-                self.url_kwargs["forum_slug"] = self.forum.slug
-                self.context_data["forum"] = self.forum
-                self.context_data["forum_perms"] = self.checker.get_perms(self.forum)
-                self.gfk_object = self.forum
-
-                # do we have a thread?
-                if "thread_slug" in kwargs:
-                    self.thread = get_object_or_404(
-                        Thread, forum=self.forum, slug=self.kwargs["thread_slug"]
-                    )
-                    self.checker.prefetch_perms([self.thread])
-                    if not self.checker.has_perm("thread.view_thread", self.thread):
-                        raise PermissionDenied
-                    self.url_namespace_prefixes.append("thread")
-                    self.add_breadcrumbs(self.thread)
-                    self.url_kwargs["thread_slug"] = self.thread.slug
-                    self.context_data["thread"] = self.thread
-                    self.context_data["thread_perms"] = self.checker.get_perms(
-                        self.thread
-                    )
-                    self.gfk_object = self.thread
-
-        # do we have a comment? (GFK object outside normal hierachy)
-        if "comment_uuid" in kwargs:
-            self.comment = get_object_or_404(
-                Comment,
-                uuid=self.kwargs["comment_uuid"],
-                object_id=self.gfk_object.pk,
-                content_type=ContentType.objects.get_for_model(self.gfk_object),
-            )
-            self.checker.prefetch_perms([self.comment])
-            if not self.checker.has_perm("comment.view_comment", self.comment):
-                raise PermissionDenied
-            self.url_namespace_prefixes.append("comment")
-            self.add_breadcrumbs(self.comment)
-            self.url_kwargs["comment_uuid"] = self.comment.uuid
-            self.context_data["comment"] = self.comment
-            self.context_data["comment_perms"] = self.checker.get_perms(self.comment)
-            self.gfk_object = self.comment
-
-        # do we have an attachment? (GFK object outside normal hierachy)
-        if "attachment_uuid" in kwargs:
-            self.attachment = get_object_or_404(
-                Attachment,
-                uuid=self.kwargs["attachment_uuid"],
-                object_id=self.gfk_object.pk,
-                content_type=ContentType.objects.get_for_model(self.gfk_object),
-            )
-            self.checker.prefetch_perms([self.attachment])
-            if not self.checker.has_perm("attachment.view_attachment", self.attachment):
-                raise PermissionDenied
-            self.url_namespace_prefixes.append("attachment")
-            self.add_breadcrumbs(self.attachment)
-            self.url_kwargs["attachment_uuid"] = self.attachment.uuid
-            self.context_data["attachment"] = self.attachment
-            self.context_data["attachment_perms"] = self.checker.get_perms(
-                self.attachment
-            )
-            self.gfk_object = self.attachment
-
-        # do we have an event? (GFK object outside normal hierachy)
-        if "event_uuid" in kwargs:
-            self.event = get_object_or_404(
-                Event,
-                uuid=self.kwargs["event_uuid"],
-                object_id=self.gfk_object.pk,
-                content_type=ContentType.objects.get_for_model(self.gfk_object),
-            )
-            self.checker.prefetch_perms([self.event])
-            if not self.checker.has_perm("event.view_event", self.event):
-                raise PermissionDenied
-            self.url_namespace_prefixes.append("event")
-            self.add_breadcrumbs(self.event)
-            self.url_kwargs["event_uuid"] = self.event.uuid
-            self.context_data["event"] = self.event
-            self.context_data["event_perms"] = self.checker.get_perms(self.event)
+                setattr(self, name, obj)
+                self.url_namespace_prefixes.append(name)
+                self.add_breadcrumbs(obj)
+                if name in self.url_objects:
+                    _, kwarg, lookup, _ = self.url_objects[name]
+                    self.url_kwargs[kwarg] = getattr(obj, lookup)
+                else:
+                    self.url_kwargs[self.url_gfk_objects[name][1]] = obj.uuid
+                self.context_data[name] = obj
+                self.context_data["%s_perms" % name] = self.checker.get_perms(obj)
+                # events have no comments or attachments
+                if name != "event":
+                    self.gfk_object = obj
 
         # finally add any missing action breadcrumbs,
         # but if this is a CreateView add a link to the ListView first
@@ -308,7 +207,7 @@ class BreadCrumbMixin:
         self.breadcrumbs.append(
             (
                 obj.__class__.breadcrumb_list_name,
-                reverse(
+                cached_reverse(
                     ":".join(self.url_namespace_prefixes + ["list"]),
                     kwargs=self.url_kwargs,
                 ),
@@ -349,7 +248,7 @@ class BreadCrumbMixin:
         self.breadcrumbs.append(
             (
                 self.model.breadcrumb_list_name,
-                reverse(
+                cached_reverse(
                     viewname=":".join(
                         self.request.resolver_match.namespaces + ["list"]
                     ),
@@ -370,7 +269,7 @@ class BreadCrumbMixin:
             self.breadcrumbs.append(
                 (
                     "Settings",
-                    reverse(
+                    cached_reverse(
                         viewname=":".join(
                             self.request.resolver_match.namespaces + ["settings"]
                         ),
@@ -395,8 +294,8 @@ class FilterQSMixin:
 
     Also filter for context if we have one.
 
-    Finally check permissions for all objects and remove the ones with no permission from
-    the queryset before returning.
+    Finally filter the queryset so only objects the user has view permission for
+    remain, and prefetch permissions for the objects on the current page.
     """
 
     def get_queryset(self):
@@ -413,6 +312,15 @@ class FilterQSMixin:
         if kwargs:
             queryset = queryset.filter(**kwargs)
 
+        # load the objects the team permission rules and the urls walk
+        # through, so checking permissions and linking to each object
+        # makes no queries
+        related = get_permission_related(queryset.model)
+        if getattr(queryset.model, "url_select_related", None):
+            related.append(queryset.model.url_select_related)
+        if related:
+            queryset = queryset.select_related(*related)
+
         # filter for context(s)?
         contexts = self.request.GET.getlist("context")
         self.context_data["filtercontexts"] = contexts
@@ -426,18 +334,35 @@ class FilterQSMixin:
         else:
             print("not filtering for any contexts")
 
-        # prefetch permissions for the full queryset
-        self.checker.prefetch_perms(queryset)
-        view_perm = (
-            f"{queryset.model._meta.model_name}.view_{queryset.model._meta.model_name}"
+        # no need to filter further if team membership grants view permission,
+        # the queryset is already limited to objects in this team
+        view_perm = f"view_{queryset.model._meta.model_name}"
+        if view_perm in get_team_role_perms(
+            self.request.user, getattr(self, "team", None), queryset.model
+        ):
+            return queryset
+
+        # remove any objects the user doesn't have permission to see,
+        # guardian does this in SQL so we only ever load the objects we show
+        return get_objects_for_user(
+            self.request.user,
+            f"{queryset.model._meta.app_label}.{view_perm}",
+            klass=queryset,
+            accept_global_perms=False,
         )
-        removelist = []
-        for obj in queryset:
-            if not self.checker.has_perm(view_perm, obj):
-                removelist.append(obj.pk)
 
-        # remove any objects the user doesn't have permission to see
-        return queryset.exclude(pk__in=removelist)
+    def get_context_data(self, **kwargs):
+        """
+        Prefetch permissions for the objects on the current page only
+        """
+        context = super().get_context_data(**kwargs)
+        object_list = context.get("object_list")
+        if object_list is not None:
+            # evaluate the queryset so the template reuses the same objects
+            objects = list(object_list)
+            if objects:
+                self.checker.prefetch_perms(objects)
+        return context
 
 
 class SRViewMixin(
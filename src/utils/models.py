@@ -2,7 +2,8 @@ import uuid
 import logging
 import threading
 
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.fields import GenericRelation
 from django.utils import timezone
@@ -14,11 +15,31 @@ from taggit.managers import TaggableManager
 from taggit.models import GenericUUIDTaggedItemBase, TaggedItemBase
 
 from event.models import Event
+from event.writer import record_event
+from .counters import get_counter_fields, update_counters
+from .urlcache import cached_reverse
 
 logger = logging.getLogger("socialrating.%s" % __name__)
 request_local = threading.local()
 
 
+def count_subquery(queryset, field):
+    """
+    Return a Subquery expression counting the rows in queryset,
+    which must be filtered on an OuterRef. Returns 0 instead of NULL.
+    """
+    return Coalesce(
+        models.Subquery(
+            queryset.order_by()
+            .values(field)
+            .annotate(count=models.Count("*"))
+            .values("count")[:1],
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+
+
 class CleanedModel(models.Model):
     """
     Always validate before saving, even if the save doesn't
@@ -138,34 +159,129 @@ class GFKModel(TimestampedModel):
             content_type=ContentType.objects.get_for_model(self), object_id=self.uuid
         )
 
-    def get_comment_count(self, obj=None):
+    def get_comment_tree(self):
+        """
+        Return the Comments on this object with their replies
+        built into a tree, fetched with one query
+        """
+        from comment.models import Comment
+
+        return Comment.build_tree(
+            Comment.objects.conversation(self).select_related("actor__user")
+        )
+
+    # the comment tree of an object is every Comment with a GFK to the object,
+    # plus every Comment with a GFK to one of those Comments, and so on.
+    # Replies (reply_to) have the same GFK as the Comment they reply to.
+    comment_tree_sql = """
+        WITH RECURSIVE comment_tree(uuid, root_id) AS (
+            SELECT uuid, object_id FROM {comment_table}
+            WHERE content_type_id = %s AND object_id = ANY(%s)
+        UNION ALL
+            SELECT c.uuid, comment_tree.root_id FROM {comment_table} c
+            JOIN comment_tree ON c.content_type_id = %s
+            AND c.object_id = comment_tree.uuid
+        )
+    """
+
+    comment_count_sql = """
+        SELECT root_id, COUNT(*) FROM comment_tree GROUP BY root_id
+    """
+
+    attachment_count_sql = """
+        SELECT root_id, COUNT(*) FROM (
+            SELECT object_id AS root_id FROM {attachment_table}
+            WHERE content_type_id = %s AND object_id = ANY(%s)
+        UNION ALL
+            SELECT comment_tree.root_id FROM {attachment_table} a
+            JOIN comment_tree ON a.content_type_id = %s
+            AND a.object_id = comment_tree.uuid
+        ) AS tree_attachments GROUP BY root_id
+    """
+
+    @classmethod
+    def get_tree_counts(cls, objects, sql, extra_params=False):
+        """
+        Run one of the comment tree count queries for the objects,
+        return a dict of counts keyed by object uuid.
+        """
+        from comment.models import Comment
+        from attachment.models import Attachment
+
+        object_ids = [obj.uuid for obj in objects]
+        if not object_ids:
+            return {}
+        object_ct = ContentType.objects.get_for_model(cls).pk
+        comment_ct = ContentType.objects.get_for_model(Comment).pk
+        params = [object_ct, object_ids, comment_ct]
+        if extra_params:
+            params += [object_ct, object_ids, comment_ct]
+        sql = (cls.comment_tree_sql + sql).format(
+            comment_table=Comment._meta.db_table,
+            attachment_table=Attachment._meta.db_table,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            counts = dict(cursor.fetchall())
+        return {obj.uuid: counts.get(obj.uuid, 0) for obj in objects}
+
+    @classmethod
+    def get_comment_counts(cls, objects):
+        """
+        Return a dict with the number of comments (recursively)
+        for each of the objects, using one recursive query
+        """
+        return cls.get_tree_counts(objects, cls.comment_count_sql)
+
+    @classmethod
+    def get_attachment_counts(cls, objects):
+        """
+        Return a dict with the number of attachments on each of the objects
+        and their comments (recursively), using one recursive query
+        """
+        return cls.get_tree_counts(objects, cls.attachment_count_sql, extra_params=True)
+
+    @classmethod
+    def add_tree_counts(cls, objects):
+        """
+        Set the comment and attachment counts on a list of objects
+        in two queries, for list pages. Returns the list.
+        """
+        objects = list(objects)
+        comment_counts = cls.get_comment_counts(objects)
+        attachment_counts = cls.get_attachment_counts(objects)
+        for obj in objects:
+            obj.tree_comment_count = comment_counts[obj.uuid]
+            obj.tree_attachment_count = attachment_counts[obj.uuid]
+        return objects
+
+    def get_comment_count(self):
         """
         Return the number of comments on the object (recursively)
         """
-        if not obj:
-            obj = self
-        count = obj.comments.count()
-        if count:
-            for comment in obj.comments.all():
-                count += self.get_comment_count(comment)
-        return count
+        if not hasattr(self, "tree_comment_count"):
+            self.tree_comment_count = self.get_comment_counts([self])[self.uuid]
+        return self.tree_comment_count
 
-    def get_comment_attachment_count(self, obj=None):
+    def get_attachment_count(self):
         """
-        Return the number of attachments on comments on the object (recursively)
+        Return the number of attachments on the object
+        and on comments on the object (recursively)
         """
-        if not obj:
-            obj = self
-        count = obj.attachments.count()
-        if obj.comments.exists():
-            for comment in obj.comments.all():
-                count += self.get_attachment_count(comment)
-        return count
+        if not hasattr(self, "tree_attachment_count"):
+            self.tree_attachment_count = self.get_attachment_counts([self])[self.uuid]
+        return self.tree_attachment_count
+
+    def get_comment_attachment_count(self):
+        """
+        Same as get_attachment_count(), kept for compatibility
+        """
+        return self.get_attachment_count()
 
 
 class EventModel(GFKModel):
     """
-    Create an Event object before saving or deleting
+    Record an Event when saving or deleting, see event.writer
     """
 
     class Meta(GFKModel.Meta):
@@ -175,50 +291,38 @@ class EventModel(GFKModel):
     def request(self):
         return getattr(request_local, "request", None)
 
-    def save(self, **kwargs):
+    def get_event_actor(self):
         """
-        We override save() to add an Event before creating or updating the object.
+        Return the Actor for the current user, or for the anonymous user
         """
-        # get request from TLS if possible
+        # get user from TLS if possible
         user = get_current_user()
         if user:
-            actor = user.actor
+            return user.actor
         else:
             from actor.models import User
 
-            actor = User.get_anonymous().actor
+            return User.get_anonymous().actor
 
-        # add event
-        Event.objects.create(
-            event_type=Event.CREATE if self._state.adding else Event.UPDATE,
-            actor=actor,
-            content_type=ContentType.objects.get_for_model(self),
-            object_id=self.uuid,
-        )
+    def save(self, **kwargs):
+        """
+        We override save() to record an Event for creating or updating the object.
+        """
+        event_type = Event.CREATE if self._state.adding else Event.UPDATE
         # call GFKModel.save()
         super().save(**kwargs)
+        # add event
+        record_event(event_type, self, self.get_event_actor())
 
     def delete(self, **kwargs):
         """
-        We override delete() to add an Event before deleting the object.
+        We override delete() to record an Event for deleting the object.
         """
-        # get user
-        user = get_current_user()
-        if user:
-            actor = user.actor
-        else:
-            from actor.models import User
-
-            actor = User.get_anonymous().actor
-
-        # add event
-        Event.objects.create(
-            event_type=Event.CREATE if self._state.adding else Event.UPDATE,
-            actor=actor,
-            content_type=ContentType.objects.get_for_model(self),
-            object_id=self.uuid,
-        )
+        # remember the uuid, delete() clears it
+        uuid = self.uuid
         super().delete(**kwargs)
+        # add event
+        record_event(Event.DELETE, self, self.get_event_actor(), object_id=uuid)
 
 
 class UUIDTaggedItem(GenericUUIDTaggedItemBase, TaggedItemBase):
@@ -264,11 +368,100 @@ class UUIDBaseModel(TaggedModel):
     """
     object_url_namespace = ""
 
+    """
+    The relations detail_url_kwargs walks through (like "item__category__team"),
+    list views load them with select_related() so urls need no queries
+    """
+    url_select_related = None
+
     """
     A default breadcrumb text for listviews, override as needed
     """
     breadcrumb_list_name = "objects"
 
+    """
+    A list of (relation, counter field) tuples for the counter caches this
+    model counts towards, see utils.counters
+    """
+    counter_caches = []
+
+    def save(self, **kwargs):
+        """
+        Increment the counter caches when a new object is saved,
+        and forget memoized urls after saving, a slug might have changed.
+        Existing objects are saved without their own counter cache fields,
+        which are only changed with F() updates, so a save doesn't undo
+        increments made since the object was loaded.
+        """
+        if not self._state.adding and not kwargs.get("update_fields"):
+            counters = get_counter_fields(type(self))
+            if counters:
+                skip = counters | self.get_deferred_fields()
+                kwargs["update_fields"] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in skip
+                ]
+        if self._state.adding and self.counter_caches:
+            with transaction.atomic():
+                super().save(**kwargs)
+                update_counters(self, 1)
+        else:
+            super().save(**kwargs)
+        self.url_cache.clear()
+
+    @property
+    def url_cache(self):
+        """
+        A dict of urls for this object memoized by get_url()
+        """
+        if "_url_cache" not in self.__dict__:
+            self._url_cache = {}
+        return self._url_cache
+
+    def get_url(self, urlname):
+        """
+        Return the url for the view urlname (like "detail" or "update") in the
+        object_url_namespace of this object. The url is memoized on the object
+        and reversed with cached_reverse().
+        """
+        if urlname not in self.url_cache:
+            self.url_cache[urlname] = cached_reverse(
+                "%s:%s" % (self.object_url_namespace, urlname),
+                kwargs=self.detail_url_kwargs,
+            )
+        return self.url_cache[urlname]
+
+    def get_absolute_url(self):
+        return self.get_url("detail")
+
+    def get_team_and_category_ids(self):
+        """
+        Return a tuple of the ids of the Team and Category this object
+        belongs to, either can be None. Used to fill the denormalized team and
+        category fields on Reviews, Votes, Comments, Attachments and Events.
+        """
+        if hasattr(self, "team_id"):
+            team_id = self.team_id
+        else:
+            team = getattr(self, "team", None)
+            team_id = team.pk if team else None
+        if hasattr(self, "category_id"):
+            category_id = self.category_id
+        else:
+            category = getattr(self, "category", None)
+            category_id = category.pk if category else None
+        return team_id, category_id
+
+    def grant_permissions(self):
+        """
+        Grant explicit guardian object permissions for this object.
+        Most permissions follow from Team membership by the rules in the
+        models team_permissions dict (see utils.permissions), so by default
+        there is nothing to grant. Override in models which need more.
+        """
+        pass
+
     @property
     def object_name(self):
         return self._meta.object_name
@@ -0,0 +1,248 @@
+"""
+Most object permissions in SocialRating follow from Team membership and
+ownership, so instead of writing guardian rows for every object we resolve
+them by rule. A model declares its rules in a team_permissions dict which maps
+a permission codename to a list of roles:
+
+- "member": all members of the Team the object belongs to
+- "admin": admin members of the Team the object belongs to
+- "owner": the User of the Actor found by following the models owner_field
+
+The Team of an object is found by following the models team_field, which
+defaults to "team". Both paths are followed to the last foreign key id only,
+so with the parent objects loaded (see SRListViewMixin) no queries are made
+per object.
+
+Explicit guardian object permissions still work and are combined with these.
+"""
+
+import logging
+from itertools import chain
+
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from guardian.core import ObjectPermissionChecker
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+def get_user_group_ids(user):
+    """
+    Return a set of the Group ids for the User, cached on the User object
+    """
+    if not hasattr(user, "_team_permission_group_ids"):
+        user._team_permission_group_ids = set(user.groups.values_list("pk", flat=True))
+    return user._team_permission_group_ids
+
+
+def get_user_actor_ids(user):
+    """
+    Return a set of the Actor ids for the User, cached on the User object
+    """
+    if not hasattr(user, "_team_permission_actor_ids"):
+        from actor.models import Actor
+
+        user._team_permission_actor_ids = set(
+            Actor.objects.filter(user=user).values_list("pk", flat=True)
+        )
+    return user._team_permission_actor_ids
+
+
+def get_user_team_roles(user):
+    """
+    Return a dict of Team id to the set of roles ("member" and/or "admin")
+    the User has in the Team, for all the Teams of the User. Cached on the
+    User object, so it is only queried once per request.
+    """
+    if not hasattr(user, "_team_permission_roles"):
+        from team.models import Team
+
+        group_ids = get_user_group_ids(user)
+        roles = {}
+        teams = Team.objects.filter(
+            Q(group_id__in=group_ids) | Q(admingroup_id__in=group_ids)
+        ).values_list("pk", "group_id", "admingroup_id")
+        for team_id, group_id, admingroup_id in teams:
+            roles[team_id] = set()
+            if group_id in group_ids:
+                roles[team_id].add("member")
+            if admingroup_id in group_ids:
+                roles[team_id].add("admin")
+        user._team_permission_roles = roles
+    return user._team_permission_roles
+
+
+def get_team_roles(user, team_id):
+    """
+    Return a set of the roles ("member" and/or "admin") the User has in the Team
+    """
+    if not user.is_authenticated or not user.is_active or team_id is None:
+        return set()
+    return set(get_user_team_roles(user).get(team_id, ()))
+
+
+def get_related_id(obj, path):
+    """
+    Follow a path like "review__actor" from the object and return the id
+    of the last foreign key, without loading the last object itself.
+    """
+    *path, field = path.split("__")
+    for name in path:
+        obj = getattr(obj, name)
+    return getattr(obj, "%s_id" % field)
+
+
+def get_permission_related(model):
+    """
+    Return a list of the related objects get_team_perms() walks through for
+    objects of the model (like "review" for owner_field "review__actor"),
+    to be loaded with select_related() on list pages
+    """
+    paths = [getattr(model, "team_field", "team"), getattr(model, "owner_field", "")]
+    return sorted({path.rsplit("__", 1)[0] for path in paths if "__" in path})
+
+
+def get_team_perms(user, obj):
+    """
+    Return a set of the permission codenames the User has for the object
+    based on the rules in the models team_permissions dict.
+    """
+    rules = getattr(obj, "team_permissions", None)
+    if not rules or not user.is_authenticated or not user.is_active:
+        return set()
+
+    roles = get_team_roles(
+        user, get_related_id(obj, getattr(obj, "team_field", "team"))
+    )
+    if hasattr(obj, "owner_field") and any("owner" in r for r in rules.values()):
+        if get_related_id(obj, obj.owner_field) in get_user_actor_ids(user):
+            roles.add("owner")
+
+    return {codename for codename, allowed in rules.items() if roles & set(allowed)}
+
+
+def get_team_role_perms(user, team, model):
+    """
+    Return a set of the permission codenames the User has for all objects of
+    the model in the Team based on team roles alone, so no objects are needed.
+    Used to decide if a queryset needs to be filtered by permissions at all.
+    """
+    rules = getattr(model, "team_permissions", None)
+    if not rules or team is None:
+        return set()
+    roles = get_team_roles(user, team.pk)
+    return {codename for codename, allowed in rules.items() if roles & set(allowed)}
+
+
+def bulk_assign_perms(obj, grants):
+    """
+    Grant explicit guardian object permissions for the object with one bulk
+    insert per permission table, instead of one get_or_create per permission
+    like assign_perm() does. grants is a list of (perm, User or Group) tuples
+    where perm is "app_label.codename" or just "codename". Existing
+    permissions are left alone.
+    """
+    content_type = ContentType.objects.get_for_model(obj)
+    permissions = dict(
+        Permission.objects.filter(
+            content_type=content_type,
+            codename__in=[perm.split(".")[-1] for perm, _ in grants],
+        ).values_list("codename", "pk")
+    )
+    group_perms = []
+    user_perms = []
+    for perm, grantee in grants:
+        kwargs = {
+            "permission_id": permissions[perm.split(".")[-1]],
+            "content_type": content_type,
+            "object_pk": str(obj.pk),
+        }
+        if isinstance(grantee, Group):
+            group_perms.append(GroupObjectPermission(group=grantee, **kwargs))
+        else:
+            user_perms.append(UserObjectPermission(user=grantee, **kwargs))
+    if group_perms:
+        GroupObjectPermission.objects.bulk_create(group_perms, ignore_conflicts=True)
+    if user_perms:
+        UserObjectPermission.objects.bulk_create(user_perms, ignore_conflicts=True)
+
+
+class TeamPermissionBackend:
+    """
+    An authentication backend which only does object permissions,
+    resolved from team membership and ownership with get_team_perms().
+    """
+
+    def authenticate(self, request, **kwargs):
+        return None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if obj is None:
+            return set()
+        return get_team_perms(user_obj, obj)
+
+    def has_perm(self, user_obj, perm, obj=None):
+        if obj is None:
+            return False
+        if "." in perm:
+            app_label, perm = perm.split(".", 1)
+            if app_label != obj._meta.app_label:
+                return False
+        return perm in self.get_all_permissions(user_obj, obj)
+
+
+class TeamPermissionChecker(ObjectPermissionChecker):
+    """
+    A guardian ObjectPermissionChecker which also includes the
+    permissions granted by team membership and ownership.
+    """
+
+    def prefetch_mixed_perms(self, objects):
+        """
+        Prefetch permissions for objects of different models with one query
+        for user permissions and one for group permissions. Guardians
+        prefetch_perms() needs all objects to be of the same model.
+        """
+        objects = [
+            obj
+            for obj in objects
+            if self.get_local_cache_key(obj) not in self._obj_perms_cache
+        ]
+        if not objects or not self.user or not self.user.is_active:
+            return
+        if self.user.is_superuser:
+            for obj in objects:
+                self.prefetch_perms([obj])
+            return
+
+        objects_by_ct = {}
+        for obj in objects:
+            ct_id, pk = self.get_local_cache_key(obj)
+            objects_by_ct.setdefault(ct_id, []).append(pk)
+            self._obj_perms_cache[(ct_id, pk)] = []
+        filters = Q()
+        for ct_id, pks in objects_by_ct.items():
+            filters |= Q(content_type_id=ct_id, object_pk__in=pks)
+
+        fields = ["content_type_id", "object_pk", "permission__codename"]
+        perms = chain(
+            UserObjectPermission.objects.filter(filters, user=self.user).values_list(
+                *fields
+            ),
+            GroupObjectPermission.objects.filter(
+                filters, group__user=self.user
+            ).values_list(*fields),
+        )
+        for ct_id, pk, codename in perms:
+            self._obj_perms_cache[(ct_id, pk)].append(codename)
+
+    def get_perms(self, obj):
+        perms = super().get_perms(obj)
+        if not self.user or self.user.is_superuser:
+            return perms
+        team_perms = get_team_perms(self.user, obj)
+        if team_perms.issubset(perms):
+            return perms
+        return list(set(perms) | team_perms)
@@ -5,4 +5,11 @@ register = template.Library()
 
 @register.filter
 def get_eav_value(obj, attribute):
+    """
+    Return the value of the EAV attribute for the object. Use the values
+    loaded in bulk by Item.add_eav_values() if they are there, otherwise
+    ask django-eav2, which costs a few queries per call.
+    """
+    if hasattr(obj, "eav_values"):
+        return obj.eav_values.get(attribute)
     return getattr(obj.eav, attribute)
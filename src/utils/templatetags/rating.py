@@ -23,10 +23,11 @@ def get_latest_review(context, item):
     """
     Template tag to return latest Review by the current user for the Item
     """
-    if item.reviews.filter(actor=context.request.user.actor).exists():
-        return item.reviews.filter(actor=context.request.user.actor).latest("created")
-    else:
-        return None
+    return (
+        item.reviews.filter(actor=context.request.user.actor)
+        .order_by("-created")
+        .first()
+    )
 
 
 @register.simple_tag(takes_context=True)
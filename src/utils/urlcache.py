@@ -0,0 +1,22 @@
+import functools
+import logging
+
+from django.urls import get_script_prefix, reverse
+
+logger = logging.getLogger("socialrating.%s" % __name__)
+
+
+@functools.lru_cache(maxsize=10000)
+def _cached_reverse(viewname, kwargs, prefix):
+    return reverse(viewname, kwargs=dict(kwargs))
+
+
+def cached_reverse(viewname, kwargs=None):
+    """
+    A reverse() which caches the result for the process. The slugs and
+    uuids are part of the cache key, so when a slug changes the new url is
+    simply a new cache entry and no invalidation is needed.
+    """
+    return _cached_reverse(
+        viewname, tuple(sorted((kwargs or {}).items())), get_script_prefix()
+    )
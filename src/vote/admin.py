@@ -2,11 +2,23 @@ from django.contrib import admin
 from guardian.admin import GuardedModelAdmin
 
 from utils.admin import PermissionsAdminMixin
-from .models import Vote
+from .models import Vote, VoteAggregate
 
 
 class VoteAdmin(PermissionsAdminMixin, GuardedModelAdmin):
     pass
 
 
+class VoteAggregateAdmin(admin.ModelAdmin):
+    list_display = [
+        "item",
+        "rating",
+        "vote_sum",
+        "vote_count",
+        "latest_vote_sum",
+        "latest_vote_count",
+    ]
+
+
 admin.site.register(Vote, VoteAdmin)
+admin.site.register(VoteAggregate, VoteAggregateAdmin)
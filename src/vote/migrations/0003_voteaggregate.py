@@ -0,0 +1,104 @@
+# Generated by Django 2.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_vote_aggregates(apps, schema_editor):
+    """
+    Build a VoteAggregate for every Item and Rating which has Votes
+    """
+    Vote = apps.get_model("vote", "Vote")
+    VoteAggregate = apps.get_model("vote", "VoteAggregate")
+    pairs = (
+        Vote.objects.order_by().values_list("review__item_id", "rating_id").distinct()
+    )
+    for item_id, rating_id in pairs:
+        votes = Vote.objects.filter(review__item_id=item_id, rating_id=rating_id)
+        latest_votes = list(
+            votes.order_by("review__actor", "-created")
+            .distinct("review__actor")
+            .values_list("vote", flat=True)
+        )
+        VoteAggregate.objects.create(
+            item_id=item_id,
+            rating_id=rating_id,
+            vote_sum=sum(votes.values_list("vote", flat=True)),
+            vote_count=votes.count(),
+            latest_vote_sum=sum(latest_votes),
+            latest_vote_count=len(latest_votes),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("item", "0003_auto_20191213_0944"),
+        ("rating", "0003_auto_20191213_0944"),
+        ("vote", "0002_auto_20191213_0944"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VoteAggregate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "vote_sum",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The sum of all Votes for this Item and Rating.",
+                    ),
+                ),
+                (
+                    "vote_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of Votes for this Item and Rating.",
+                    ),
+                ),
+                (
+                    "latest_vote_sum",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The sum of the latest Vote from each Actor for this Item and Rating.",
+                    ),
+                ),
+                (
+                    "latest_vote_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="The number of Actors who voted for this Item and Rating.",
+                    ),
+                ),
+                (
+                    "item",
+                    models.ForeignKey(
+                        help_text="The Item this VoteAggregate applies to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vote_aggregates",
+                        to="item.Item",
+                    ),
+                ),
+                (
+                    "rating",
+                    models.ForeignKey(
+                        help_text="The Rating this VoteAggregate applies to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vote_aggregates",
+                        to="rating.Rating",
+                    ),
+                ),
+            ],
+            options={"unique_together": {("item", "rating")}},
+        ),
+        migrations.RunPython(populate_vote_aggregates, migrations.RunPython.noop),
+    ]
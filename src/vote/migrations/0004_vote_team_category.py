@@ -0,0 +1,76 @@
+# Generated by Django 2.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_team_and_category(apps, schema_editor):
+    """
+    Set the denormalized team and category for all Votes, one Category at a time
+    """
+    Category = apps.get_model("category", "Category")
+    Vote = apps.get_model("vote", "Vote")
+    for category in Category.objects.all():
+        Vote.objects.filter(review__item__category=category).update(
+            team_id=category.team_id, category=category
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0004_auto_20191213_0944"),
+        ("team", "0003_auto_20191213_0944"),
+        ("review", "0004_review_team_category"),
+        ("vote", "0003_voteaggregate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vote",
+            name="category",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Category this Vote belongs to (denormalized from the Review).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AddField(
+            model_name="vote",
+            name="team",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Team this Vote belongs to (denormalized from the Review).",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+        migrations.RunPython(populate_team_and_category, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="vote",
+            name="category",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Category this Vote belongs to (denormalized from the Review).",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="category.Category",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="vote",
+            name="team",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="The Team this Vote belongs to (denormalized from the Review).",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="team.Team",
+            ),
+        ),
+    ]
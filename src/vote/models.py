@@ -1,11 +1,52 @@
-from django.db import models
-from django.urls import reverse_lazy
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
-from guardian.shortcuts import assign_perm
 
 from utils.models import UUIDBaseModel
 
 
+class VoteQuerySet(models.QuerySet):
+    def latest_per_actor(self):
+        """
+        Return only the latest Vote from each Actor for each Item and Rating.
+        Uses DISTINCT ON so PostgreSQL does it in a single query.
+        """
+        return self.order_by(
+            "review__item", "rating", "review__actor", "-created"
+        ).distinct("review__item", "rating", "review__actor")
+
+    def get_totals(self, only_latest=True):
+        """
+        Return a dict with (item_id, rating_id) tuples as keys and
+        (sum, count) tuples as values for the Votes in this queryset.
+        By default only the latest Vote from each Actor is considered.
+        Everything happens in a single query.
+        """
+        votes = self
+        if only_latest:
+            votes = self.model.objects.filter(
+                uuid__in=self.latest_per_actor().values("uuid")
+            )
+        rows = (
+            votes.order_by()
+            .values("review__item", "rating")
+            .annotate(vote_sum=models.Sum("vote"), vote_count=models.Count("uuid"))
+        )
+        return {
+            (row["review__item"], row["rating"]): (row["vote_sum"], row["vote_count"])
+            for row in rows
+        }
+
+    def get_averages(self, only_latest=True):
+        """
+        Return a dict with (item_id, rating_id) tuples as keys and
+        (rounded average, count) tuples as values, like get_totals()
+        """
+        return {
+            key: (round(total / count, 2), count)
+            for key, (total, count) in self.get_totals(only_latest).items()
+        }
+
+
 class Vote(UUIDBaseModel):
     """
     A Vote contains a reference to a Rating and a Review,
@@ -16,6 +57,8 @@ class Vote(UUIDBaseModel):
     class Meta(UUIDBaseModel.Meta):
         unique_together = [("review", "rating")]
 
+    objects = VoteQuerySet.as_manager()
+
     review = models.ForeignKey(
         "review.Review",
         on_delete=models.CASCADE,
@@ -34,6 +77,22 @@ class Vote(UUIDBaseModel):
         help_text="The actual numerical vote for this Rating."
     )
 
+    team = models.ForeignKey(
+        "team.Team",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        help_text="The Team this Vote belongs to (denormalized from the Review).",
+    )
+
+    category = models.ForeignKey(
+        "category.Category",
+        on_delete=models.CASCADE,
+        related_name="+",
+        editable=False,
+        help_text="The Category this Vote belongs to (denormalized from the Review).",
+    )
+
     comment = models.CharField(
         max_length=1000,
         help_text="An optional short comment related to this specific vote. 1000 character limit.",
@@ -44,40 +103,62 @@ class Vote(UUIDBaseModel):
     filterfield = "review"
     filtervalue = "review"
     breadcrumb_list_name = "Votes"
+    owner_field = "review__actor"
 
-    @property
-    def breadcrumb_detail_name(self):
-        return self.rating.name
+    # keep the vote_count on the Category and Team up to date
+    counter_caches = [("category", "vote_count"), ("team", "vote_count")]
 
-    @property
-    def team(self):
-        return self.review.item.category.team
+    # - All team members may see a Vote
+    # - Only the Review author may change the Vote
+    # - Only team admins and the Review author may delete a Vote
+    team_permissions = {
+        "view_vote": ["member"],
+        "change_vote": ["owner"],
+        "delete_vote": ["owner", "admin"],
+    }
 
     @property
-    def category(self):
-        return self.review.item.category
+    def breadcrumb_detail_name(self):
+        return self.rating.name
 
     @property
     def item(self):
         return self.review.item
 
-    def grant_permissions(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
         """
-        - All team members may see a vote
-        - Only the Review author may change the Vote
-        - Only team admins and the Review author may delete a Vote
+        Remember the vote value as loaded from the database so save() can
+        update the VoteAggregate with the difference without another query.
         """
-        assign_perm("vote.view_vote", self.team.group, self)
-        assign_perm("vote.change_vote", self.review.actor.user, self)
-        assign_perm("vote.delete_vote", self.review.actor.user, self)
-        assign_perm("vote.delete_vote", self.team.admingroup, self)
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_vote = instance.vote
+        return instance
 
     def save(self, **kwargs):
         """
-        Save Vote and grant permissions
+        Save Vote and update the VoteAggregate
         """
-        super().save(**kwargs)
-        self.grant_permissions()
+        adding = self._state.adding
+        if adding or self.category_id is None:
+            # set the denormalized team and category from the Review
+            self.team_id = self.review.team_id
+            self.category_id = self.review.category_id
+        with transaction.atomic():
+            super().save(**kwargs)
+            if adding:
+                VoteAggregate.add_vote(self)
+            else:
+                VoteAggregate.change_vote(self, getattr(self, "_loaded_vote", None))
+        self._loaded_vote = self.vote
+
+    def delete(self, **kwargs):
+        """
+        Delete Vote and update the VoteAggregate
+        """
+        with transaction.atomic():
+            VoteAggregate.remove_vote(self)
+            return super().delete(**kwargs)
 
     def clean(self):
         """
@@ -109,19 +190,175 @@ class Vote(UUIDBaseModel):
 
     @property
     def detail_url_kwargs(self):
-        return (
-            {
-                "team_slug": self.item.category.team.slug,
-                "category_slug": self.item.category.slug,
-                "item_slug": self.item.slug,
-                "review_uuid": self.review.uuid,
-                "vote_uuid": self.uuid,
-            },
-        )
+        return {
+            "team_slug": self.item.category.team.slug,
+            "category_slug": self.item.category.slug,
+            "item_slug": self.item.slug,
+            "review_uuid": self.review.uuid,
+            "vote_uuid": self.uuid,
+        }
 
     object_url_namespace = "team:category:item:review:vote"
+    url_select_related = "review__item__category__team"
+
+
+class VoteAggregate(models.Model):
+    """
+    A VoteAggregate holds the precomputed sums and counts of all Votes
+    for a Rating of an Item, so averages can be read without looking
+    at the Votes. The "latest" fields only consider the newest Vote from
+    each Actor. The numbers are maintained by Vote.save() and Vote.delete(),
+    use recalculate() to rebuild them from scratch.
+    """
+
+    class Meta:
+        unique_together = [("item", "rating")]
+
+    item = models.ForeignKey(
+        "item.Item",
+        on_delete=models.CASCADE,
+        related_name="vote_aggregates",
+        help_text="The Item this VoteAggregate applies to.",
+    )
+
+    rating = models.ForeignKey(
+        "rating.Rating",
+        on_delete=models.CASCADE,
+        related_name="vote_aggregates",
+        help_text="The Rating this VoteAggregate applies to.",
+    )
+
+    vote_sum = models.PositiveIntegerField(
+        default=0, help_text="The sum of all Votes for this Item and Rating."
+    )
+
+    vote_count = models.PositiveIntegerField(
+        default=0, help_text="The number of Votes for this Item and Rating."
+    )
+
+    latest_vote_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="The sum of the latest Vote from each Actor for this Item and Rating.",
+    )
+
+    latest_vote_count = models.PositiveIntegerField(
+        default=0, help_text="The number of Actors who voted for this Item and Rating.",
+    )
+
+    def __str__(self):
+        return "VoteAggregate for Rating %s for Item %s" % (self.rating, self.item)
+
+    def get_average(self, only_latest=True):
+        """
+        Return a tuple of (rounded average, number of votes) like
+        Item.get_average_vote() does, or (None, 0) if there are no votes.
+        """
+        if only_latest:
+            total, count = self.latest_vote_sum, self.latest_vote_count
+        else:
+            total, count = self.vote_sum, self.vote_count
+        if not count:
+            return (None, 0)
+        return (round(total / count, 2), count)
+
+    @classmethod
+    def get_locked(cls, item_id, rating_id):
+        """
+        Return the VoteAggregate for the Item and Rating, locked for update.
+        Must be called inside a transaction.
+        """
+        cls.objects.get_or_create(item_id=item_id, rating_id=rating_id)
+        return cls.objects.select_for_update().get(item_id=item_id, rating_id=rating_id)
 
-    def get_absolute_url(self):
-        return reverse_lazy(
-            self.object_url_namespace + ":detail", kwargs=self.detail_url_kwargs
+    @staticmethod
+    def get_actor_votes(vote):
+        """
+        Return a queryset of the other Votes for the same Item and Rating
+        made by the Actor who made this Vote, newest first.
+        """
+        return (
+            Vote.objects.filter(
+                review__item_id=vote.review.item_id,
+                review__actor_id=vote.review.actor_id,
+                rating_id=vote.rating_id,
+            )
+            .exclude(uuid=vote.uuid)
+            .order_by("-created")
         )
+
+    @classmethod
+    def add_vote(cls, vote):
+        """
+        Update the aggregate for a newly created Vote
+        """
+        aggregate = cls.get_locked(vote.review.item_id, vote.rating_id)
+        aggregate.vote_sum += vote.vote
+        aggregate.vote_count += 1
+
+        previous = cls.get_actor_votes(vote).first()
+        if not previous:
+            # the first Vote from this Actor
+            aggregate.latest_vote_sum += vote.vote
+            aggregate.latest_vote_count += 1
+        elif vote.created >= previous.created:
+            # this Vote replaces the previous latest Vote from this Actor
+            aggregate.latest_vote_sum += vote.vote - previous.vote
+        aggregate.save()
+
+    @classmethod
+    def change_vote(cls, vote, old_vote):
+        """
+        Update the aggregate for a Vote which changed value from old_vote
+        """
+        if old_vote is None:
+            # we don't know the old value, rebuild from scratch
+            cls.recalculate(vote.review.item_id, vote.rating_id)
+            return
+        if old_vote == vote.vote:
+            # nothing to do here
+            return
+
+        aggregate = cls.get_locked(vote.review.item_id, vote.rating_id)
+        aggregate.vote_sum += vote.vote - old_vote
+        previous = cls.get_actor_votes(vote).first()
+        if not previous or vote.created >= previous.created:
+            # this is the latest Vote from this Actor
+            aggregate.latest_vote_sum += vote.vote - old_vote
+        aggregate.save()
+
+    @classmethod
+    def remove_vote(cls, vote):
+        """
+        Update the aggregate for a Vote which is about to be deleted
+        """
+        old_vote = getattr(vote, "_loaded_vote", vote.vote)
+        aggregate = cls.get_locked(vote.review.item_id, vote.rating_id)
+        aggregate.vote_sum -= old_vote
+        aggregate.vote_count -= 1
+
+        previous = cls.get_actor_votes(vote).first()
+        if not previous:
+            # this was the only Vote from this Actor
+            aggregate.latest_vote_sum -= old_vote
+            aggregate.latest_vote_count -= 1
+        elif vote.created >= previous.created:
+            # the previous Vote from this Actor becomes the latest again
+            aggregate.latest_vote_sum += previous.vote - old_vote
+        aggregate.save()
+
+    @classmethod
+    def recalculate(cls, item_id, rating_id):
+        """
+        Rebuild the aggregate for an Item and Rating from the Votes
+        """
+        votes = Vote.objects.filter(review__item_id=item_id, rating_id=rating_id)
+        aggregate = cls.get_locked(item_id, rating_id)
+        key = (item_id, rating_id)
+        aggregate.vote_sum, aggregate.vote_count = votes.get_totals(
+            only_latest=False
+        ).get(key, (0, 0))
+        aggregate.latest_vote_sum, aggregate.latest_vote_count = votes.get_totals(
+            only_latest=True
+        ).get(key, (0, 0))
+        aggregate.save()
+        return aggregate
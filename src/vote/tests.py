@@ -1 +1,128 @@
-# Create your tests here.
+import random
+
+from rating.tests import RatingViewTestCase
+from utils.permissions import TeamPermissionChecker, get_permission_related
+from .models import Vote, VoteAggregate
+
+
+class VoteAggregateTestCase(RatingViewTestCase):
+    """ Test that VoteAggregate is kept up to date when Votes change """
+
+    def setUp(self):
+        """ The setUp method is run before each test """
+        # make sure to call RatingViewTestCase.setUp() so we have
+        # some items, reviews and ratings to work with
+        super().setUp()
+
+        # find an item which has reviews for the remembered rating
+        self.item = self.rating.category.items.filter(reviews__isnull=False).first()
+
+        # add a vote for the rating in every review of the item
+        for review in self.item.reviews.all():
+            Vote.objects.create(
+                review=review,
+                rating=self.rating,
+                vote=random.randint(1, self.rating.max_rating),
+            )
+
+    def get_expected_average(self, only_latest):
+        """ Calculate the average the slow way for comparison """
+        votes = Vote.objects.filter(review__item=self.item, rating=self.rating)
+        if only_latest:
+            latest = {}
+            for vote in votes.order_by("created"):
+                latest[vote.review.actor_id] = vote.vote
+            values = list(latest.values())
+        else:
+            values = list(votes.values_list("vote", flat=True))
+        if not values:
+            return (None, 0)
+        return (round(sum(values) / len(values), 2), len(values))
+
+    def assertAverages(self):
+        """ Compare the aggregated averages with the calculated ones """
+        for only_latest in [True, False]:
+            self.assertEqual(
+                self.item.get_average_vote(self.rating, only_latest=only_latest),
+                self.get_expected_average(only_latest),
+            )
+
+    def test_vote_aggregate_create(self):
+        """ Assert that the aggregate matches after creating Votes """
+        self.assertAverages()
+
+    def test_vote_aggregate_update(self):
+        """ Assert that the aggregate matches after updating a Vote """
+        vote = Vote.objects.filter(review__item=self.item, rating=self.rating).first()
+        vote.vote = self.rating.max_rating if vote.vote == 1 else 1
+        vote.save()
+        self.assertAverages()
+
+    def test_vote_aggregate_delete(self):
+        """ Assert that the aggregate matches after deleting Votes and Reviews """
+        Vote.objects.filter(
+            review__item=self.item, rating=self.rating
+        ).latest().delete()
+        self.assertAverages()
+        self.item.reviews.first().delete()
+        self.assertAverages()
+
+    def test_vote_aggregate_recalculate(self):
+        """ Assert that recalculate() gives the same result as the incremental updates """
+        before = VoteAggregate.objects.get(item=self.item, rating=self.rating)
+        after = VoteAggregate.recalculate(self.item.pk, self.rating.pk)
+        self.assertEqual(
+            (before.vote_sum, before.vote_count), (after.vote_sum, after.vote_count),
+        )
+        self.assertEqual(
+            (before.latest_vote_sum, before.latest_vote_count),
+            (after.latest_vote_sum, after.latest_vote_count),
+        )
+
+    def test_vote_totals_single_query(self):
+        """ Assert that the set-based averages match the aggregated ones """
+        votes = Vote.objects.filter(review__item__category=self.rating.category)
+        for only_latest in [True, False]:
+            with self.assertNumQueries(1):
+                averages = votes.get_averages(only_latest=only_latest)
+            self.assertEqual(
+                averages[(self.item.pk, self.rating.pk)],
+                self.get_expected_average(only_latest),
+            )
+            self.assertEqual(
+                self.rating.category.get_average_votes(only_latest=only_latest),
+                averages,
+            )
+
+        # all of them leave out ratings without votes
+        for vote in Vote.objects.filter(review__item=self.item, rating=self.rating):
+            vote.delete()
+        for only_latest in [True, False]:
+            averages = votes.get_averages(only_latest=only_latest)
+            self.assertNotIn((self.item.pk, self.rating.pk), averages)
+            self.assertNotIn(
+                self.rating.pk, self.item.get_average_votes(only_latest=only_latest)
+            )
+            self.assertEqual(
+                self.rating.category.get_average_votes(only_latest=only_latest),
+                averages,
+            )
+
+    def test_vote_permissions_no_queries(self):
+        """ Assert that checking permissions for a list of Votes makes no query per Vote """
+        votes = list(
+            Vote.objects.filter(review__item=self.item).select_related(
+                *get_permission_related(Vote)
+            )
+        )
+        owner = votes[0].review.actor.user
+        checker = TeamPermissionChecker(owner)
+        checker.prefetch_perms(votes)
+        # the team roles and actors of the user are queried once
+        checker.get_perms(votes[0])
+        with self.assertNumQueries(0):
+            perms = [checker.get_perms(vote) for vote in votes]
+        for vote, vote_perms in zip(votes, perms):
+            self.assertEqual(
+                "change_vote" in vote_perms, vote.review.actor_id == owner.actor.pk
+            )